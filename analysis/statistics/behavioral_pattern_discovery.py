@@ -22,6 +22,7 @@ Outputs (default saved under ./analysis/behavioral_patterns/):
 """
 
 import argparse
+import sys
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -30,6 +31,9 @@ import seaborn as sns
 from scipy import stats
 import zipfile, os, json
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+from io_utils import read_modeling_table  # noqa: E402
+
 sns.set(style="whitegrid")
 
 def run(csv_path, out_dir):
@@ -39,7 +43,7 @@ def run(csv_path, out_dir):
     fig_dir.mkdir(parents=True, exist_ok=True)
 
     # Load data
-    df = pd.read_csv(csv_path)
+    df = read_modeling_table(csv_path)
     required = {'participantId','task_id','tlx'}
     if not required.issubset(df.columns):
         raise ValueError(f"CSV must contain columns: {required}")
@@ -6,6 +6,7 @@ Reproducible script to run repeated-measures ANOVA and post-hoc tests on NASA-TL
 Saves results to specified output directory.
 """
 import argparse
+import sys
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -13,9 +14,12 @@ from statsmodels.stats.anova import AnovaRM
 from scipy import stats
 from statsmodels.stats.multitest import multipletests
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+from io_utils import read_modeling_table  # noqa: E402
+
 def run_anova(csv_path, out_dir):
     out_dir = Path(out_dir); out_dir.mkdir(parents=True, exist_ok=True)
-    df = pd.read_csv(csv_path)
+    df = read_modeling_table(csv_path)
     if not {'participantId','task_id','tlx'}.issubset(df.columns):
         raise ValueError("CSV must contain columns: participantId, task_id, tlx")
     task_map = {"task_1_form": "T1_form", "task_2_product": "T2_product", "task_3_travel": "T3_travel"}
@@ -13,6 +13,8 @@ Performs:
 """
 
 import os
+import sys
+from pathlib import Path
 import argparse
 import textwrap
 import pandas as pd
@@ -22,6 +24,9 @@ import seaborn as sns
 from statsmodels.stats.anova import AnovaRM
 from scipy.stats import ttest_rel
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+from io_utils import read_modeling_table  # noqa: E402
+
 # Default path to the modeling CSV (the file you uploaded)
 DEFAULT_CSV = "../../data/modeling_dataset.csv"
 
@@ -31,7 +36,7 @@ def ensure_dirs(out_dir):
 def load_data(csv_path):
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found at {csv_path}")
-    df = pd.read_csv(csv_path)
+    df = read_modeling_table(csv_path)
     return df
 
 def prepare_tlx_dataframe(df):
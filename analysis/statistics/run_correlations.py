@@ -12,6 +12,8 @@ Produces:
 """
 
 import os
+import sys
+from pathlib import Path
 import argparse
 import pandas as pd
 import numpy as np
@@ -19,6 +21,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import pearsonr
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "utils"))
+from io_utils import read_modeling_table  # noqa: E402
+
 DEFAULT_CSV = "../../data/modeling_dataset.csv"
 
 # Default feature list - adjust if your CSV uses slightly different names
@@ -47,7 +52,7 @@ def ensure_dirs(out_dir):
 def load_data(csv_path):
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found at {csv_path}")
-    df = pd.read_csv(csv_path)
+    df = read_modeling_table(csv_path)
     return df
 
 def detect_features(df, candidate_features):
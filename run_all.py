@@ -10,6 +10,7 @@ Steps:
  3. baselines.py                (majority + logistic under LOUO)
  4. hyperparameter_search.py    (optional; Leave-One-Group-Out grid search)
  5. train_louo_random_forest.py (train final RF and evaluate under LOUO)
+    oof_store.py                (out-of-fold probabilities of every model, reused from the store)
  6. shap_analysis.py            (compute and save SHAP plots / arrays)
  7. shap_clustering.py          (cluster SHAP vectors, save labels + PCA)
  8. feature_importance.py       (save RF importances + plot)
@@ -45,6 +46,7 @@ COMPUTE_SCRIPT = SRC_DIR / "data_preparation" / "compute_features.py"
 BASELINE_SCRIPT = SRC_DIR / "modeling" / "baselines.py"
 HYPER_SCRIPT = SRC_DIR / "modeling" / "hyperparameter_search.py"
 TRAIN_SCRIPT = SRC_DIR / "modeling" / "train_louo_random_forest.py"
+OOF_SCRIPT = SRC_DIR / "modeling" / "oof_store.py"
 SHAP_ANALYSIS = SRC_DIR / "interpretation" / "shap_analysis.py"
 SHAP_CLUSTER = SRC_DIR / "interpretation" / "shap_clustering.py"
 FI_SCRIPT = SRC_DIR / "interpretation" / "feature_importance.py"
@@ -53,6 +55,10 @@ FI_SCRIPT = SRC_DIR / "interpretation" / "feature_importance.py"
 MODELING_CSV = PROCESSED_DIR / "modeling_dataset.csv"
 GRID_OUT = MODELS_DIR / "rf_grid_search.joblib"
 MODEL_OUT = MODELS_DIR / "tuned_random_forest_model.joblib"
+MODEL_PARAMS = MODELS_DIR / "tuned_random_forest_model_params.json"  # written by TRAIN_SCRIPT
+MODEL_ARTIFACT = MODELS_DIR / "tuned_random_forest_model.artifact"  # written by TRAIN_SCRIPT
+OOF_STORE = RESULTS_DIR / "oof_store"
+OOF_CSV = RESULTS_DIR / "modeling_dataset_with_oof_probs.csv"
 
 # -------------------------
 # Logging
@@ -149,7 +155,8 @@ def main(args):
             str(HYPER_SCRIPT),
             "--csv", str(MODELING_CSV),
             "--out", str(GRID_OUT),
-            "--n-jobs", str(args.n_jobs)
+            "--n-jobs", str(args.n_jobs),
+            "--mode", args.search_mode
         ]
         run_cmd(cmd)
     else:
@@ -162,10 +169,25 @@ def main(args):
         str(TRAIN_SCRIPT),
         "--csv", str(MODELING_CSV),
         "--model-out", str(MODEL_OUT),
-        "--results-outdir", str(RESULTS_DIR / "modeling")
+        "--results-outdir", str(RESULTS_DIR / "modeling"),
+        "--oof-store", str(OOF_STORE)
     ]
     if args.do_search:
-        cmd += ["--do-search", "--grid-out", str(GRID_OUT), "--n-jobs", str(args.n_jobs)]
+        cmd += ["--do-search", "--search-mode", args.search_mode, "--grid-out", str(GRID_OUT), "--n-jobs", str(args.n_jobs)]
+    run_cmd(cmd)
+
+    # 5b) Out-of-fold probabilities; the RF uses the params step 5 trained with,
+    # so its entry is the one step 5 just stored
+    logging.info("STEP 5b: Out-of-fold probabilities for all configured models")
+    cmd = [
+        py,
+        str(OOF_SCRIPT),
+        "--csv", str(MODELING_CSV),
+        "--store", str(OOF_STORE),
+        "--out", str(OOF_CSV),
+        "--rf-params", str(MODEL_PARAMS),
+        "--n-jobs", str(args.n_jobs)
+    ]
     run_cmd(cmd)
 
     # 6) SHAP analysis
@@ -173,7 +195,7 @@ def main(args):
     cmd = [
         py,
         str(SHAP_ANALYSIS),
-        "--model", str(MODEL_OUT),
+        "--model", str(MODEL_ARTIFACT),
         "--csv", str(MODELING_CSV),
         "--outdir", str(INTERP_RESULTS_DIR)
     ]
@@ -196,7 +218,7 @@ def main(args):
     cmd = [
         py,
         str(FI_SCRIPT),
-        "--model", str(MODEL_OUT),
+        "--model", str(MODEL_ARTIFACT),
         "--csv", str(MODELING_CSV),
         "--outdir", str(INTERP_RESULTS_DIR)
     ]
@@ -216,6 +238,7 @@ if __name__ == "__main__":
     parser.add_argument("--n-participants", type=int, default=25, help="Number of participants to create")
     parser.add_argument("--do-search", action="store_true", help="Run grouped hyperparameter search before training")
     parser.add_argument("--n-jobs", type=int, default=1, help="Parallel jobs for grid search")
+    parser.add_argument("--search-mode", choices=["grid", "halving", "warm_start"], default="grid", help="Exhaustive grid, successive halving over tree counts, or grid with warm-started forests")
     parser.add_argument("--skip-generate", dest="skip_generate", action="store_true", help="Skip data generation")
     parser.add_argument("--skip-compute", dest="skip_compute", action="store_true", help="Skip feature computation step")
     parser.add_argument("--skip-baselines", dest="skip_baselines", action="store_true", help="Skip baseline evaluation")
@@ -9,20 +9,57 @@ Otherwise, the script computes features from events.
 
 Outputs:
  - ./data/processed/modeling_dataset.csv
+ - ./data/processed/modeling_dataset.csv.cache/ (typed columnar cache, see io_utils)
 
 Usage:
     python compute_features.py --raw-dir ../../data/raw --out-csv ../../data/processed/modeling_dataset.csv
+    python compute_features.py --raw-dir ../../data/raw --stream --chunk-rows 5000 --verify
+    python compute_features.py --raw-dir ../../data/raw --manifest ../../data/processed/feature_manifest.json
 """
 
 import argparse
-import json
+import hashlib
+import io
+import itertools
 import os
+import sys
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-import numpy as np
+import feature_registry
+import mouse_kinematics
 import pandas as pd
-from load_data import load_all_raw, to_dataframe  # relative import in package usage
+import session
+import session_arrays
+from feature_manifest import (
+    MANIFEST_VERSION,
+    content_hash,
+    load_manifest,
+    lookup,
+    save_manifest,
+    source_hash,
+)
+from feature_registry import compute_registered
+from load_data import (  # relative import in package usage
+    TLX_PATTERNS,
+    iter_raw,
+    list_raw_files,
+    load_all_raw,
+    to_dataframe,
+)
+from mouse_kinematics import KINEMATIC_FEATURES, kinematic_features_from_arrays
+from session import Session
+from session_archive import iter_archived, iter_shard, list_archive_shards
+from session_arrays import SessionArrays
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import (  # noqa: E402
+    decode_json_bytes,
+    read_json,
+    write_modeling_cache,
+)
 
 REQUIRED_FEATURES = [
     "form_hesitation_index",
@@ -43,206 +80,214 @@ REQUIRED_FEATURES = [
     "mouse_entropy_avg",
 ]
 
+META_COLUMNS = ["participantId", "task_id", "tlx", "High_Load"]
+OUTPUT_COLUMNS = META_COLUMNS + REQUIRED_FEATURES
+
+DEFAULT_CHUNK_ROWS = 5000
+
+# Bump when the row building in this module changes; edits to the modules in
+# FEATURE_MODULES are picked up by their source hash (see `feature_code_key`).
+FEATURE_VERSION = 1
+FEATURE_MODULES = (feature_registry, mouse_kinematics, session_arrays, session)
+
+TLXKey = Tuple[Optional[str], str]  # (participantId, task)
+
 
-def compute_features_from_raw(obj: Dict[str, Any]) -> Dict[str, Any]:
+def compute_features_from_raw(
+    obj: Dict[str, Any],
+    arrays: Optional[SessionArrays] = None,
+    features: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
     """
     Compute engineered features from a single raw JSON object.
     If `computed_metrics` exists, return that block directly (perfect reconstruction).
-    Otherwise compute approximations from available fields.
+    Otherwise compute approximations from available fields, using the per-task
+    definitions of feature_registry.py.
+
+    Event streams (mouse path, idle periods, field focus, component switches) are
+    read from `arrays`; when omitted they come from `SessionArrays.for_session(obj)`,
+    and only if a requested feature needs them. `features` restricts the result
+    to a subset of REQUIRED_FEATURES.
     """
     if "computed_metrics" in obj and obj["computed_metrics"] is not None:
         # Use copy to avoid mutation issues
         cm = dict(obj["computed_metrics"])
+        if features is not None:
+            return {k: cm.get(k) for k in features}
         # ensure keys exist
         for k in REQUIRED_FEATURES:
             if k not in cm:
                 cm[k] = None
         return cm
 
-    task = obj.get("task") or obj.get("task_id")
+    if features is not None:
+        return compute_registered(obj, features=features, arrays=arrays)
     cm = {k: None for k in REQUIRED_FEATURES}
+    cm.update(compute_registered(obj, features=REQUIRED_FEATURES, arrays=arrays))
+    return cm
 
-    # Basic heuristics: safe fallbacks if some logs are missing
-    # Task 1: form metrics
-    if task and "form" in task:
-        # field_interactions => form_hesitation_index (sum focus_time_ms)
-        fields = obj.get("field_interactions") or []
-        cm["form_hesitation_index"] = float(
-            sum([fi.get("focus_time_ms", 0) for fi in fields])
-        )
-        # error rate approximated from summary or backspace counts
-        cm["form_error_rate"] = float(
-            obj.get("summary_metrics", {}).get("error_count", 0)
-        ) / max(1, (cm["form_hesitation_index"] or 1))
-        cm["form_efficiency"] = float(
-            obj.get("summary_metrics", {}).get("total_time_ms", 1)
-        ) / max(1, len(fields))
-        cm["zip_code_struggle"] = float(
-            obj.get("task_specific_metrics", {}).get("zip_code_corrections", 0)
-        )
-        # action density & mouse entropy
-        mouse_path = obj.get("mouse_path") or obj.get("mouse_data") or []
-        cm["action_density"] = float(len(mouse_path)) / max(
-            1, (obj.get("summary_metrics", {}).get("total_time_ms", 1000))
-        )
-        cm["mouse_entropy_avg"] = float(
-            np.std([p.get("x", 0) for p in mouse_path]) + 1e-6
-        )
-        # fill other defaults
-        cm["filter_optimization_score"] = None
-        cm["decision_uncertainty"] = None
-        cm["exploration_breadth"] = None
-        cm["planning_time_ratio"] = None
-        cm["multitasking_load"] = 0.0
-        cm["constraint_violation_rate"] = 0.0
-        cm["budget_management_stress"] = 0.0
-        cm["scheduling_difficulty"] = 0.0
-        cm["recovery_efficiency"] = (
-            obj.get("summary_metrics", {}).get("success", True) and 1.0 or 0.0
-        )
-        cm["idle_time_ratio"] = float(
-            sum([p.get("duration_ms", 0) for p in (obj.get("idle_periods") or [])])
-        ) / max(1, obj.get("summary_metrics", {}).get("total_time_ms", 1))
-        return cm
 
-    # Task 2: product metrics
-    if task and "product" in task:
-        prod = obj.get("product_exploration", {})
-        viewed = prod.get("products_viewed", [])
-        cm["exploration_breadth"] = float(len(viewed))
-        cm["decision_uncertainty"] = float(
-            obj.get("product_exploration", {}).get("rapid_hover_switches", 0)
-        )
-        cm["filter_optimization_score"] = (
-            float(
-                obj.get("filter_interactions", [{}])[0].get("value_after", 0)
-                and 0.8
-                or 0.6
-            )
-            if obj.get("filter_interactions")
-            else 0.8
-        )
-        cm["planning_time_ratio"] = (
-            float(obj.get("summary_metrics", {}).get("total_time_ms", 0))
-            and 0.02
-            or 0.0
-        )
-        mouse_path = obj.get("mouse_path") or []
-        cm["mouse_entropy_avg"] = float(
-            np.std([p.get("x", 0) for p in mouse_path]) + 1e-6
-        )
-        cm["action_density"] = float(len(mouse_path)) / max(
-            1, obj.get("summary_metrics", {}).get("total_time_ms", 1)
-        )
-        # default others
-        cm["form_hesitation_index"] = 0.0
-        cm["form_efficiency"] = 0.0
-        cm["zip_code_struggle"] = 0.0
-        cm["multitasking_load"] = float(
-            obj.get("component_switches") and len(obj.get("component_switches")) or 0.0
-        )
-        cm["constraint_violation_rate"] = float(
-            obj.get("constraint_violations")
-            and len(obj.get("constraint_violations"))
-            or 0.0
-        )
-        cm["budget_management_stress"] = float(
-            obj.get("budget", {}).get("overrun_events", 0)
-        )
-        cm["scheduling_difficulty"] = float(
-            obj.get("meetings", [{}])[0].get("drag_attempts", 0)
-        )
-        cm["recovery_efficiency"] = 1.0 - cm["decision_uncertainty"] / max(
-            1, (cm["exploration_breadth"] or 1)
-        )
-        cm["idle_time_ratio"] = float(
-            sum([p.get("duration_ms", 0) for p in (obj.get("idle_periods") or [])])
-        ) / max(1, obj.get("summary_metrics", {}).get("total_time_ms", 1))
-        return cm
+def feature_code_key() -> str:
+    """Key of the feature code a manifest row was computed with."""
+    return f"{FEATURE_VERSION}:{source_hash(FEATURE_MODULES)}"
 
-    # Task 3: travel metrics
-    if task and "travel" in task:
-        cm["multitasking_load"] = float(len(obj.get("component_switches", [])))
-        cm["constraint_violation_rate"] = float(
-            len(obj.get("constraint_violations", []))
-        ) / max(1, obj.get("summary_metrics", {}).get("total_time_ms", 1))
-        cm["budget_management_stress"] = float(
-            len(obj.get("budget", {}).get("updates", []))
-        ) / max(1, (obj.get("summary_metrics", {}).get("total_time_ms", 1) / 1000))
-        cm["scheduling_difficulty"] = float(
-            obj.get("meetings", [{}])[0].get("drag_attempts", 0)
-        )
-        cm["recovery_efficiency"] = (
-            float(obj.get("computed_metrics", {}).get("recovery_efficiency", 0.0))
-            if "computed_metrics" in obj
-            else 0.05
-        )
-        cm["action_density"] = float(len(obj.get("mouse_path", []))) / max(
-            1, obj.get("summary_metrics", {}).get("total_time_ms", 1)
-        )
-        cm["mouse_entropy_avg"] = float(
-            np.std([p.get("x", 0) for p in obj.get("mouse_path", [])]) + 1e-6
-        )
-        cm["idle_time_ratio"] = float(
-            sum([p.get("duration_ms", 0) for p in obj.get("idle_periods", [])])
-        ) / max(1, obj.get("summary_metrics", {}).get("total_time_ms", 1))
-        # fill form/product defaults
-        cm["form_hesitation_index"] = 0.0
-        cm["form_error_rate"] = 0.0
-        cm["form_efficiency"] = 0.0
-        cm["zip_code_struggle"] = 0.0
-        cm["filter_optimization_score"] = 0.0
-        cm["decision_uncertainty"] = (
-            float(obj.get("product_exploration", {}).get("rapid_hover_switches", 0))
-            if obj.get("product_exploration")
-            else 0.0
-        )
-        cm["exploration_breadth"] = (
-            float(len(obj.get("product_exploration", {}).get("products_viewed", [])))
-            if obj.get("product_exploration")
-            else 0.0
-        )
-        cm["planning_time_ratio"] = 0.0
-        return cm
 
-    # fallback - empty defaults
-    return {k: None for k in REQUIRED_FEATURES}
+def is_tlx_task(task: Optional[str]) -> bool:
+    return (task or "").lower().find("tlx") != -1
+
+
+def is_tlx_only(obj: Dict[str, Any]) -> bool:
+    """True for NASA-TLX questionnaire files, which carry no behavioral data."""
+    return is_tlx_task(obj.get("task"))
+
 
+def _raw_tlx(obj: Dict[str, Any]):
+    return obj.get("raw_tlx") or (
+        obj.get("tlx_scores") and obj["tlx_scores"].get("raw_tlx")
+    )
+
+
+def tlx_entry(obj: Dict[str, Any]) -> Optional[Tuple[TLXKey, float]]:
+    """Index entry `((participantId, task), raw_tlx)` of a TLX-only file.
+
+    The task is taken from `task_id` (the TLX file's own `task` is the
+    questionnaire name). Returns None for session files and for TLX files
+    without a score or task.
+    """
+    if not is_tlx_only(obj):
+        return None
+    tlx = _raw_tlx(obj)
+    task = obj.get("task_id")
+    if tlx is None or not task:
+        return None
+    return (obj.get("participantId"), task), float(tlx)
+
+
+def join_tlx(rows: List[Dict[str, Any]], tlx_index: Dict[TLXKey, float]):
+    """Fill `tlx` / `High_Load` of rows without an inline score from `tlx_index`.
+
+    One dict lookup per row. Inline scores take precedence over the index.
+
+    Returns
+    - dict: "matched" count, "rows_without_tlx" keys (sessions left without a
+      score) and "tlx_without_session" keys (index entries no row used)
+    """
+    used = set()
+    missing = []
+    matched = 0
+    for row in rows:
+        key = (row["participantId"], row["task_id"])
+        if key in tlx_index:
+            used.add(key)
+        if row["tlx"] is not None and row["tlx"] == row["tlx"]:  # not None / NaN
+            continue
+        tlx = tlx_index.get(key)
+        if tlx is None:
+            missing.append(key)
+            continue
+        row["tlx"] = tlx
+        row["High_Load"] = int(tlx > 60)
+        matched += 1
+    return {
+        "matched": matched,
+        "rows_without_tlx": missing,
+        "tlx_without_session": [k for k in tlx_index if k not in used],
+    }
+
+
+def print_tlx_report(report: Dict[str, Any], limit: int = 10):
+    """Print the outcome of `join_tlx`, listing up to `limit` unmatched keys per side."""
+    print(f"TLX join: {report['matched']} rows filled from TLX files")
+    for name, label in (
+        ("rows_without_tlx", "sessions without a TLX score"),
+        ("tlx_without_session", "TLX records without a session"),
+    ):
+        keys = report[name]
+        if keys:
+            more = f" (+{len(keys) - limit} more)" if len(keys) > limit else ""
+            print(f"Warning: {len(keys)} {label}: {keys[:limit]}{more}")
+
+
+def build_feature_row(
+    obj: Dict[str, Any], kinematics: bool = False
+) -> Optional[Dict[str, Any]]:
+    """Turn one raw session object (dict or `Session`) into a modeling row.
 
-def build_modeling_dataframe(raw_dir: str):
+    With `kinematics`, the KINEMATIC_FEATURES of mouse_kinematics.py are
+    appended after the required features.
+
+    Returns None for TLX-only files, which carry no behavioral data.
+    """
+    if is_tlx_only(obj):
+        return None
+    pid = obj.get("participantId")
+    task = obj.get("task") or obj.get("task_id")
+    tlx = _raw_tlx(obj)
+    arrays = SessionArrays.for_session(obj)
+    feats = compute_features_from_raw(obj, arrays)
+    row = {
+        "participantId": pid,
+        "task_id": task,
+        "tlx": (
+            float(tlx)
+            if tlx is not None
+            else (feats.get("raw_tlx") if "raw_tlx" in feats else None)
+        ),
+        "High_Load": int((float(tlx) if tlx is not None else 0) > 60),
+    }
+    for k in REQUIRED_FEATURES:
+        row[k] = feats.get(k)
+    if kinematics:
+        row.update(kinematic_features_from_arrays(arrays))
+    return row
+
+
+def iter_feature_rows(
+    raw_objects: Iterable[Dict[str, Any]],
+    kinematics: bool = False,
+    tlx_index: Optional[Dict[TLXKey, float]] = None,
+) -> Iterator[Dict]:
+    """Lazily map raw session objects to modeling rows, skipping TLX-only files.
+
+    When `tlx_index` is given, the TLX-only files passed over are recorded in
+    it (see `tlx_entry`), so the index is built in the same pass.
+    """
+    for obj in raw_objects:
+        if is_tlx_only(obj):
+            entry = tlx_entry(obj) if tlx_index is not None else None
+            if entry is not None:
+                tlx_index[entry[0]] = entry[1]
+            continue
+        yield build_feature_row(obj, kinematics=kinematics)
+
+
+def build_modeling_dataframe(
+    raw_dir: str, workers: int = 1, engine: str = "session", kinematics: bool = False
+):
     """Build the modeling DataFrame by computing features for all raw objects.
 
     Parameters
     - raw_dir: str -- directory with raw JSON files
+    - workers: int -- processes used to parse raw files (see `load_all_raw`)
+    - engine: str -- "session" (one session per call) or "batch" (vectorized,
+      see batch_features.py)
+    - kinematics: bool -- append mouse-kinematics features (computed per
+      session with either engine)
+
+    Scores from TLX-only files are joined to sessions lacking an inline score
+    (see `join_tlx`); unmatched keys are reported.
 
     Returns
     - pandas.DataFrame: modeling dataset with engineered features and metadata
     """
-    raw_objects = load_all_raw(raw_dir)
-    rows = []
-    for obj in raw_objects:
-        # Skip TLX-only files in this pass
-        if (obj.get("task") or "").lower().find("tlx") != -1:
-            continue
-        pid = obj.get("participantId")
-        task = obj.get("task") or obj.get("task_id")
-        tlx = obj.get("raw_tlx") or (
-            obj.get("tlx_scores") and obj["tlx_scores"].get("raw_tlx")
-        )
-        feats = compute_features_from_raw(obj)
-        row = {
-            "participantId": pid,
-            "task_id": task,
-            "tlx": (
-                float(tlx)
-                if tlx is not None
-                else (feats.get("raw_tlx") if "raw_tlx" in feats else None)
-            ),
-            "High_Load": int((float(tlx) if tlx is not None else 0) > 60),
-        }
-        for k in REQUIRED_FEATURES:
-            row[k] = feats.get(k)
-        rows.append(row)
+    raw_objects = load_all_raw(raw_dir, workers=workers, as_sessions=True)
+    if engine == "batch":
+        return _build_modeling_dataframe_batch(raw_objects, kinematics=kinematics)
+    tlx_index = {}
+    rows = list(
+        iter_feature_rows(raw_objects, kinematics=kinematics, tlx_index=tlx_index)
+    )
+    print_tlx_report(join_tlx(rows, tlx_index))
     df = pd.DataFrame(rows)
     # Some basic cleaning/sanity
     # Convert empty strings and np.nan appropriately
@@ -252,6 +297,270 @@ def build_modeling_dataframe(raw_dir: str):
     return df
 
 
+def _build_modeling_dataframe_batch(raw_objects, kinematics: bool = False):
+    """Batch-engine counterpart of the row loop in `build_modeling_dataframe`.
+
+    The batch engine covers REQUIRED_FEATURES only; with `kinematics` the
+    KINEMATIC_FEATURES are computed per session, as in `build_feature_row`.
+    """
+    from batch_features import compute_features_batch  # imports this module
+
+    objs = []
+    tlx_index = {}
+    for obj in raw_objects:
+        if not is_tlx_only(obj):
+            objs.append(obj)
+            continue
+        entry = tlx_entry(obj)
+        if entry is not None:
+            tlx_index[entry[0]] = entry[1]
+    meta = []
+    for obj in objs:
+        tlx = _raw_tlx(obj)
+        meta.append(
+            {
+                "participantId": obj.get("participantId"),
+                "task_id": obj.get("task") or obj.get("task_id"),
+                "tlx": float(tlx) if tlx is not None else None,
+                "High_Load": int((float(tlx) if tlx is not None else 0) > 60),
+            }
+        )
+    print_tlx_report(join_tlx(meta, tlx_index))
+    frames = [pd.DataFrame(meta, columns=META_COLUMNS), compute_features_batch(objs)]
+    if kinematics:
+        kin = [
+            kinematic_features_from_arrays(SessionArrays.for_session(obj))
+            for obj in objs
+        ]
+        frames.append(pd.DataFrame(kin, columns=KINEMATIC_FEATURES))
+    return pd.concat(frames, axis=1)
+
+
+def build_modeling_dataframe_incremental(
+    raw_dir: str, manifest_path: str, kinematics: bool = False
+):
+    """Build the modeling DataFrame, recomputing only new or changed raw files.
+
+    Rows for files whose fingerprint matches `manifest_path` are taken from the
+    manifest; everything else is parsed and featurized, and the manifest is
+    rewritten to reflect the current tree (deleted files drop out). The result
+    is identical to `build_modeling_dataframe` on the same tree.
+
+    A manifest written with different options (e.g. `kinematics`) or by other
+    feature code (see `feature_code_key`) is discarded.
+    TLX-only files keep their index entry in the manifest ("tlx"), so unchanged
+    ones join without being re-read.
+
+    Returns
+    - (pandas.DataFrame, dict): dataset and counts of reused / recomputed / removed files
+    """
+    options = {"kinematics": kinematics, "feature_code": feature_code_key()}
+    manifest = load_manifest(manifest_path)
+    old_files = manifest["files"] if manifest.get("options", options) == options else {}
+    new_files = {}
+    rows = []
+    tlx_index = {}
+    stats = {"reused": 0, "recomputed": 0, "removed": 0, "failed": 0}
+    for p in list_raw_files(raw_dir):
+        rel = os.path.relpath(p, raw_dir)
+        entry = lookup(old_files.get(rel), p)
+        if entry is not None and entry["row"] is None and "tlx" not in entry:
+            entry = None  # written before TLX entries were recorded
+        if entry is None:
+            try:
+                st = os.stat(p)
+                with open(p, "rb") as f:
+                    data = f.read()
+                obj = decode_json_bytes(data, p)
+                obj["_source_file"] = p
+                obj = Session.from_raw(obj)
+            except Exception as e:
+                print(f"Warning: failed reading {p}: {e}")
+                stats["failed"] += 1
+                continue
+            entry = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha1": hashlib.sha1(data).hexdigest(),
+                "row": build_feature_row(obj, kinematics=kinematics),
+            }
+            if entry["row"] is None:
+                tlx = tlx_entry(obj)
+                entry["tlx"] = tlx and [tlx[0][0], tlx[0][1], tlx[1]]
+            stats["recomputed"] += 1
+        else:
+            stats["reused"] += 1
+        new_files[rel] = entry
+        if entry["row"] is not None:
+            rows.append(entry["row"])
+        elif entry["tlx"]:
+            pid, task, tlx = entry["tlx"]
+            tlx_index[(pid, task)] = tlx
+    # packed archives are tracked per shard, with one row list per shard
+    for shard in list_archive_shards(raw_dir):
+        rel = os.path.relpath(shard, raw_dir)
+        entry = lookup(old_files.get(rel), shard)
+        if entry is not None and "tlx" not in entry:
+            entry = None
+        if entry is None:
+            st = os.stat(shard)
+            shard_index = {}
+            entry = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha1": content_hash(shard),
+                "rows": list(
+                    iter_feature_rows(
+                        map(Session.from_raw, iter_shard(shard)),
+                        kinematics=kinematics,
+                        tlx_index=shard_index,
+                    )
+                ),
+                "tlx": [[pid, task, tlx] for (pid, task), tlx in shard_index.items()],
+            }
+            stats["recomputed"] += 1
+        else:
+            stats["reused"] += 1
+        new_files[rel] = entry
+        rows.extend(entry["rows"])
+        for pid, task, tlx in entry["tlx"]:
+            tlx_index[(pid, task)] = tlx
+    stats["removed"] = len(set(old_files) - set(new_files))
+    save_manifest(
+        manifest_path,
+        {"version": MANIFEST_VERSION, "options": options, "files": new_files},
+    )
+
+    print_tlx_report(join_tlx(rows, tlx_index))
+    df = pd.DataFrame(rows)
+    for c in REQUIRED_FEATURES:
+        if c not in df.columns:
+            df[c] = None
+    return df, stats
+
+
+def build_tlx_index(
+    raw_dir: str, listing_cache: Optional[str] = None
+) -> Dict[TLXKey, float]:
+    """TLX index of a raw tree, reading only its questionnaire records.
+
+    Loose files are those matching TLX_PATTERNS (wherever they sit in the
+    tree); archived records are picked by the task in the shard index, so
+    session records are not read. Later records win, as in the in-memory build.
+    """
+    index = {}
+    loose = (
+        _read_raw_file(p)
+        for p in list_raw_files(raw_dir, include=TLX_PATTERNS, cache_path=listing_cache)
+    )
+    archived = iter_archived(raw_dir, where=lambda pid, task: is_tlx_task(task))
+    for obj in itertools.chain(loose, archived):
+        entry = obj and tlx_entry(obj)
+        if entry is not None:
+            index[entry[0]] = entry[1]
+    return index
+
+
+def _read_raw_file(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        return read_json(path)
+    except Exception as e:
+        print(f"Warning: failed reading {path}: {e}")
+        return None
+
+
+def write_modeling_csv_streaming(
+    raw_dir: str,
+    out_csv: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    kinematics: bool = False,
+) -> int:
+    """Stream raw sessions to the modeling CSV in fixed-size row chunks.
+
+    The TLX index is built first with one pass over the questionnaire files
+    only (see `build_tlx_index`); sessions are then parsed and featurized one
+    at a time and joined against it, and at most `chunk_rows` ready rows are
+    buffered before being appended to `out_csv`. Peak memory is bounded by
+    the chunk size and the (small) index rather than by the number of raw
+    files, and the output equals `build_modeling_dataframe` on the same tree
+    (check with `--stream --verify`).
+
+    TLX-only records in files not named like TLX_PATTERNS are still joined,
+    but only to sessions streamed after them; they are reported.
+
+    Returns
+    - int: number of rows written
+    """
+    columns = OUTPUT_COLUMNS + (KINEMATIC_FEATURES if kinematics else [])
+    tlx_index = build_tlx_index(raw_dir)
+    n_rows = 0
+    buf = []
+    used = set()
+    late = []  # TLX records found among the session files
+    report = {"matched": 0, "rows_without_tlx": []}
+    header = True
+
+    def flush():
+        nonlocal header
+        pd.DataFrame(buf, columns=columns).to_csv(
+            out_csv, mode="w" if header else "a", header=header, index=False
+        )
+        header = False
+        buf.clear()
+
+    for obj in iter_raw(
+        raw_dir,
+        as_sessions=True,
+        exclude=TLX_PATTERNS,
+        archive_where=lambda pid, task: not is_tlx_task(task),
+    ):
+        if is_tlx_only(obj):
+            entry = tlx_entry(obj)
+            if entry is not None:
+                tlx_index[entry[0]] = entry[1]
+                late.append(entry[0])
+            continue
+        row = build_feature_row(obj, kinematics=kinematics)
+        key = (row["participantId"], row["task_id"])
+        if key in tlx_index:
+            used.add(key)
+        if row["tlx"] is None:
+            tlx = tlx_index.get(key)
+            if tlx is None:
+                report["rows_without_tlx"].append(key)
+            else:
+                row["tlx"] = tlx
+                row["High_Load"] = int(tlx > 60)
+                report["matched"] += 1
+        buf.append(row)
+        n_rows += 1
+        if len(buf) >= chunk_rows:
+            flush()
+    if buf or header:
+        flush()
+    report["tlx_without_session"] = [k for k in tlx_index if k not in used]
+    print_tlx_report(report)
+    if late:
+        print(
+            f"Warning: {len(late)} TLX records outside TLX-named files "
+            f"(joined only to sessions after them): {late[:10]}"
+        )
+    return n_rows
+
+
+def verify_streaming_csv(raw_dir: str, out_csv: str, kinematics: bool = False) -> bool:
+    """True if the streamed CSV equals the in-memory build written as CSV."""
+    df = build_modeling_dataframe(raw_dir, kinematics=kinematics)
+    expected = pd.read_csv(io.StringIO(df.to_csv(index=False)))
+    got = pd.read_csv(out_csv)
+    try:
+        pd.testing.assert_frame_equal(got, expected)
+    except AssertionError as e:
+        print(f"Streaming output differs from the in-memory build:\n{e}")
+        return False
+    return True
+
+
 def main():
     """CLI entrypoint to build and save the modeling dataset CSV.
 
@@ -271,6 +580,50 @@ def main():
         default="../../data/processed/modeling_dataset.csv",
         help="Output CSV path",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for parsing raw JSONs (1 = serial, 0 = all CPUs)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["session", "batch"],
+        default="session",
+        help="Feature engine for the in-memory build (batch = vectorized across sessions)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Featurize sessions one at a time and write the CSV in row chunks (no columnar cache)",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=DEFAULT_CHUNK_ROWS,
+        help="Rows buffered per CSV write in --stream mode",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="With --stream, also build in memory and check both outputs are equal",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help="Fingerprint manifest; when given, only new or changed raw files are recomputed",
+    )
+    parser.add_argument(
+        "--kinematics",
+        action="store_true",
+        help="Append mouse-kinematics features (speed, curvature, direction entropy, ...)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not write the columnar cache next to the CSV",
+    )
     args = parser.parse_args()
 
     raw_dir = os.path.abspath(args.raw_dir)
@@ -278,12 +631,43 @@ def main():
     Path(os.path.dirname(out_csv)).mkdir(parents=True, exist_ok=True)
 
     print("Loading raw files from:", raw_dir)
-    df = build_modeling_dataframe(raw_dir)
-    # If tlx missing, try to fetch from TLX folder
-    # Basic fix: if idx missing tlx but nasa_tlx folder has values, join - left as exercise
+    if args.stream:
+        n_rows = write_modeling_csv_streaming(
+            raw_dir, out_csv, chunk_rows=args.chunk_rows, kinematics=args.kinematics
+        )
+        print("Saved processed modeling CSV to:", out_csv)
+        print("Rows:", n_rows)
+        if args.verify:
+            ok = verify_streaming_csv(raw_dir, out_csv, kinematics=args.kinematics)
+            print("Streaming output equals in-memory build:", ok)
+            if not ok:
+                sys.exit(1)
+        return
+
+    if args.manifest:
+        df, stats = build_modeling_dataframe_incremental(
+            raw_dir, os.path.abspath(args.manifest), kinematics=args.kinematics
+        )
+        print(
+            "Incremental rebuild: {reused} reused, {recomputed} recomputed, "
+            "{removed} removed, {failed} failed".format(**stats)
+        )
+    else:
+        df = build_modeling_dataframe(
+            raw_dir,
+            workers=args.workers,
+            engine=args.engine,
+            kinematics=args.kinematics,
+        )
     df.to_csv(out_csv, index=False)
     print("Saved processed modeling CSV to:", out_csv)
     print("Rows:", len(df))
+    if not args.no_cache:
+        # re-read so the cached dtypes are exactly what downstream read_csv sees
+        print(
+            "Saved columnar cache to:",
+            write_modeling_cache(pd.read_csv(out_csv), out_csv),
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+feature_manifest.py
+
+Per-file fingerprint manifest used by compute_features.py for incremental rebuilds.
+
+Each raw JSON file is recorded with its size, mtime and content hash together
+with the feature row computed from it. On the next run, files whose size and
+mtime are unchanged are trusted without being read; files whose stat changed
+are re-hashed and only re-parsed if the content actually differs.
+
+Manifest layout (JSON):
+    {
+      "version": 1,
+      "options": {"kinematics": bool, "feature_code": str},   # see compute_features
+      "files": {
+        "<path relative to raw dir>": {
+          "size": int, "mtime_ns": int, "sha1": str,
+          "row": {...} | null,       # null for TLX-only files
+          "tlx": [pid, task, raw_tlx] | null   # TLX-only files: their index entry
+        },
+        "<packed shard>": {"size": ..., "mtime_ns": ..., "sha1": ...,
+                           "rows": [...], "tlx": [[pid, task, raw_tlx], ...]}
+      }
+    }
+"""
+
+import hashlib
+import json
+import os
+from types import ModuleType
+from typing import Any, Dict, Iterable, Optional
+
+MANIFEST_VERSION = 1
+_HASH_BLOCK = 1 << 20
+
+
+def content_hash(path: str) -> str:
+    """Return the SHA-1 hex digest of a file's bytes."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_hash(modules: Iterable[ModuleType]) -> str:
+    """Return the SHA-1 hex digest over the source files of `modules`, in order."""
+    h = hashlib.sha1()
+    for module in modules:
+        h.update(content_hash(module.__file__).encode("ascii"))
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str, with_hash: bool = True) -> Dict[str, Any]:
+    """Return {'size', 'mtime_ns'[, 'sha1']} for `path`."""
+    st = os.stat(path)
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        fp["sha1"] = content_hash(path)
+    return fp
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Load a manifest, returning an empty one if missing or from another version."""
+    if not path or not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "files": {}}
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"Warning: ignoring manifest {path} with unknown version")
+        return {"version": MANIFEST_VERSION, "files": {}}
+    return manifest
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]):
+    """Write the manifest atomically (temp file + rename)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def lookup(entry: Optional[Dict[str, Any]], path: str) -> Optional[Dict[str, Any]]:
+    """Return the up-to-date manifest entry for `path`, or None if it must be recomputed.
+
+    A size/mtime match is accepted as-is. Otherwise the file is hashed and the
+    entry is still reused (with refreshed stat fields) when the content is unchanged.
+    """
+    if entry is None:
+        return None
+    fp = file_fingerprint(path, with_hash=False)
+    if fp["size"] == entry.get("size") and fp["mtime_ns"] == entry.get("mtime_ns"):
+        return entry
+    if fp["size"] != entry.get("size"):
+        return None
+    if content_hash(path) != entry.get("sha1"):
+        return None
+    return dict(entry, mtime_ns=fp["mtime_ns"])
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+feature_registry.py
+
+Declarative registry of the engineered features computed from raw sessions.
+
+Every feature is registered once per task kind ("form", "product", "travel")
+together with the names of the inputs it needs. Inputs are shared
+intermediates (summary block, total time, mouse-x std, idle total, ...) that
+are themselves declared with their own inputs. `compute_registered` resolves
+only what the requested features need, computes each intermediate once per
+session and returns the features in registration order. A feature with no
+definition for the session's task is None.
+
+A caller that needs a subset (e.g. a reduced production model) passes
+`features=[...]` and pays only for that subset; for instance, asking for
+`zip_code_struggle` alone never touches the event streams.
+
+Features read intermediates only, never the raw session, and are written to
+work on scalars and on float64 columns alike. This registry is therefore the
+single definition used by all three engines: `compute_registered` (one raw
+session), batch_features.py (columns, with stream intermediates from ragged
+buffers) and online_features.py (running aggregates). `plan(..., provided=...)`
+and `evaluate` are the entry points for engines that supply intermediates
+themselves; `python online_features.py --verify` checks that the engines agree.
+
+Usage:
+    python feature_registry.py --raw-dir ../../data/raw --features action_density idle_time_ratio
+"""
+
+import argparse
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+from session_arrays import SessionArrays
+
+TASK_KINDS = ("form", "product", "travel")
+
+
+class FeatureSpec(NamedTuple):
+    """One feature definition: `fn(*inputs)` for sessions of the given task kind."""
+
+    name: str
+    task: str
+    inputs: Tuple[str, ...]
+    fn: Callable
+
+
+FEATURE_NAMES: List[str] = []
+_FEATURES: Dict[str, Dict[str, FeatureSpec]] = {kind: {} for kind in TASK_KINDS}
+_INTERMEDIATES: Dict[str, Tuple[Tuple[str, ...], Callable]] = {}
+
+
+def task_kind(task: Optional[str]) -> Optional[str]:
+    """Task kind of a task name ("form" / "product" / "travel"), None if unknown."""
+    if not task:
+        return None
+    for kind in TASK_KINDS:
+        if kind in task:
+            return kind
+    return None
+
+
+def intermediate(name: str, inputs: Sequence[str] = ("obj",)):
+    """Decorator: register a shared intermediate computed from `inputs`."""
+
+    def wrap(fn):
+        _INTERMEDIATES[name] = (tuple(inputs), fn)
+        return fn
+
+    return wrap
+
+
+def feature(name: str, tasks: Sequence[str], inputs: Sequence[str] = ()):
+    """Decorator: register `fn(*inputs)` as the definition of `name` for `tasks`."""
+
+    def wrap(fn):
+        if name not in FEATURE_NAMES:
+            FEATURE_NAMES.append(name)
+        for kind in tasks:
+            _FEATURES[kind][name] = FeatureSpec(name, kind, tuple(inputs), fn)
+        return fn
+
+    return wrap
+
+
+def constant(name: str, value: Any, tasks: Sequence[str]):
+    """Register a fixed value of `name` for sessions of `tasks`."""
+    feature(name, tasks)(lambda: value)
+
+
+def _or(value, default):
+    """`value`, or `default` where it is missing (None; NaN in a batch column)."""
+    if isinstance(value, np.ndarray):
+        return np.where(np.isnan(value), default, value)
+    return default if value is None else value
+
+
+def _nonzero(value, default):
+    """`value or default`: zero falls back to `default`."""
+    if isinstance(value, np.ndarray):
+        return np.where(value == 0, default, value)
+    return value or default
+
+
+def _at_least_1(value):
+    """`max(1, value)`."""
+    if isinstance(value, np.ndarray):
+        return np.maximum(1, value)
+    return max(1, value)
+
+
+def _if(cond, then, other):
+    """`then if cond else other`, elementwise for batch columns."""
+    if isinstance(cond, np.ndarray):
+        return np.where(cond != 0, then, other)
+    return then if cond else other
+
+
+# ----------------------------------------------------------------------
+# Shared intermediates ("obj" is the raw session; "arrays" may be passed in).
+# Features only read intermediates, so an engine that has them from another
+# source (batch_features' ragged buffers, online_features' running state)
+# evaluates the same definitions.
+# ----------------------------------------------------------------------
+
+
+@intermediate("arrays")
+def _arrays(obj):
+    return SessionArrays.for_session(obj)
+
+
+@intermediate("summary")
+def _summary(obj):
+    return obj.get("summary_metrics", {})
+
+
+@intermediate("total_time_ms", ("summary",))
+def _total_time(summary):
+    return summary.get("total_time_ms")
+
+
+@intermediate("n_mouse", ("arrays",))
+def _n_mouse(arrays):
+    return float(len(arrays.mouse))
+
+
+@intermediate("mouse_entropy", ("arrays",))
+def _mouse_entropy(arrays):
+    return float(np.std(arrays.mouse_x) + 1e-6)
+
+
+@intermediate("idle_total", ("arrays",))
+def _idle_total(arrays):
+    return float(arrays.idle_duration.sum())
+
+
+@intermediate("focus_total", ("arrays",))
+def _focus_total(arrays):
+    return float(arrays.fields.sum())
+
+
+@intermediate("n_fields", ("arrays",))
+def _n_fields(arrays):
+    return float(len(arrays.fields))
+
+
+@intermediate("n_switches", ("arrays",))
+def _n_switches(arrays):
+    return float(len(arrays.switches))
+
+
+@intermediate("error_count", ("summary",))
+def _error_count(summary):
+    return float(summary.get("error_count", 0))
+
+
+@intermediate("succeeded", ("summary",))
+def _succeeded(summary):
+    return summary.get("success", True) and 1.0 or 0.0
+
+
+@intermediate("zip_code_corrections")
+def _zip_code_corrections(obj):
+    return float(obj.get("task_specific_metrics", {}).get("zip_code_corrections", 0))
+
+
+@intermediate("first_filter_set")
+def _first_filter_set(obj):
+    """1.0 / 0.0: whether the first filter change set a value; None without filters."""
+    filters = obj.get("filter_interactions")
+    if not filters:
+        return None
+    return filters[0].get("value_after", 0) and 1.0 or 0.0
+
+
+@intermediate("product_exploration")
+def _product_exploration(obj):
+    return obj.get("product_exploration") or {}
+
+
+@intermediate("rapid_hovers", ("product_exploration",))
+def _rapid_hovers(prod):
+    return float(prod.get("rapid_hover_switches", 0))
+
+
+@intermediate("n_products_viewed", ("product_exploration",))
+def _n_products_viewed(prod):
+    return float(len(prod.get("products_viewed", [])))
+
+
+@intermediate("n_violations")
+def _n_violations(obj):
+    return float(len(obj.get("constraint_violations") or []))
+
+
+@intermediate("budget_overruns")
+def _budget_overruns(obj):
+    return float(obj.get("budget", {}).get("overrun_events", 0))
+
+
+@intermediate("n_budget_updates")
+def _n_budget_updates(obj):
+    return float(len(obj.get("budget", {}).get("updates", [])))
+
+
+@intermediate("drag_attempts")
+def _drag_attempts(obj):
+    return float(obj.get("meetings", [{}])[0].get("drag_attempts", 0))
+
+
+@intermediate("logged_recovery")
+def _logged_recovery(obj):
+    """recovery_efficiency of an explicit null `computed_metrics` block, else None."""
+    if "computed_metrics" in obj:
+        cm = obj["computed_metrics"] or {}
+        return float(cm.get("recovery_efficiency", 0.0))
+    return None
+
+
+# ----------------------------------------------------------------------
+# Features (scalar or column arithmetic on intermediates only)
+# ----------------------------------------------------------------------
+
+
+@feature("form_hesitation_index", ["form"], ["focus_total"])
+def _form_hesitation(focus_total):
+    return focus_total
+
+
+constant("form_hesitation_index", 0.0, ["product", "travel"])
+
+
+@feature("form_error_rate", ["form"], ["error_count", "focus_total"])
+def _form_error_rate(errors, focus_total):
+    return errors / _at_least_1(_nonzero(focus_total, 1))
+
+
+constant("form_error_rate", 0.0, ["travel"])
+
+
+@feature("form_efficiency", ["form"], ["total_time_ms", "n_fields"])
+def _form_efficiency(total, n_fields):
+    return _or(total, 1) / _at_least_1(n_fields)
+
+
+constant("form_efficiency", 0.0, ["product", "travel"])
+
+
+@feature("zip_code_struggle", ["form"], ["zip_code_corrections"])
+def _zip_code_struggle(corrections):
+    return corrections
+
+
+constant("zip_code_struggle", 0.0, ["product", "travel"])
+
+
+@feature("filter_optimization_score", ["product"], ["first_filter_set"])
+def _filter_optimization(first_filter_set):
+    return _if(_or(first_filter_set, 1.0), 0.8, 0.6)
+
+
+constant("filter_optimization_score", 0.0, ["travel"])
+
+
+@feature("decision_uncertainty", ["product", "travel"], ["rapid_hovers"])
+def _decision_uncertainty(rapid_hovers):
+    return rapid_hovers
+
+
+@feature("exploration_breadth", ["product", "travel"], ["n_products_viewed"])
+def _exploration_breadth(n_viewed):
+    return n_viewed
+
+
+@feature("planning_time_ratio", ["product"], ["total_time_ms"])
+def _planning_time_ratio(total):
+    return _if(_or(total, 0), 0.02, 0.0)
+
+
+constant("planning_time_ratio", 0.0, ["travel"])
+
+
+@feature("multitasking_load", ["product", "travel"], ["n_switches"])
+def _multitasking_load(n_switches):
+    return n_switches
+
+
+constant("multitasking_load", 0.0, ["form"])
+
+
+@feature("constraint_violation_rate", ["product"], ["n_violations"])
+def _constraint_violations_product(n_violations):
+    return n_violations
+
+
+@feature("constraint_violation_rate", ["travel"], ["n_violations", "total_time_ms"])
+def _constraint_violations_travel(n_violations, total):
+    return n_violations / _at_least_1(_or(total, 1))
+
+
+constant("constraint_violation_rate", 0.0, ["form"])
+
+
+@feature("budget_management_stress", ["product"], ["budget_overruns"])
+def _budget_stress_product(overruns):
+    return overruns
+
+
+@feature("budget_management_stress", ["travel"], ["n_budget_updates", "total_time_ms"])
+def _budget_stress_travel(n_updates, total):
+    return n_updates / _at_least_1(_or(total, 1) / 1000)
+
+
+constant("budget_management_stress", 0.0, ["form"])
+
+
+@feature("scheduling_difficulty", ["product", "travel"], ["drag_attempts"])
+def _scheduling_difficulty(drag_attempts):
+    return drag_attempts
+
+
+constant("scheduling_difficulty", 0.0, ["form"])
+
+
+@feature("recovery_efficiency", ["form"], ["succeeded"])
+def _recovery_form(succeeded):
+    return succeeded
+
+
+@feature("recovery_efficiency", ["product"], ["rapid_hovers", "n_products_viewed"])
+def _recovery_product(rapid_hovers, n_viewed):
+    return 1.0 - rapid_hovers / _at_least_1(_nonzero(n_viewed, 1))
+
+
+@feature("recovery_efficiency", ["travel"], ["logged_recovery"])
+def _recovery_travel(logged_recovery):
+    # a non-null computed_metrics block is used as is before features run
+    return _or(logged_recovery, 0.05)
+
+
+@feature("action_density", ["form"], ["n_mouse", "total_time_ms"])
+def _action_density_form(n_mouse, total):
+    return n_mouse / _at_least_1(_or(total, 1000))
+
+
+@feature("action_density", ["product", "travel"], ["n_mouse", "total_time_ms"])
+def _action_density(n_mouse, total):
+    return n_mouse / _at_least_1(_or(total, 1))
+
+
+@feature("idle_time_ratio", TASK_KINDS, ["idle_total", "total_time_ms"])
+def _idle_time_ratio(idle_total, total):
+    return idle_total / _at_least_1(_or(total, 1))
+
+
+@feature("mouse_entropy_avg", TASK_KINDS, ["mouse_entropy"])
+def _mouse_entropy_avg(mouse_entropy):
+    return mouse_entropy
+
+
+# ----------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------
+
+
+@lru_cache(maxsize=None)
+def plan(kind: str, names: Tuple[str, ...], provided: FrozenSet[str] = frozenset()):
+    """Feature specs for `names` and the intermediates they need, in dependency order.
+
+    Intermediates in `provided` are supplied by the caller: they are listed but
+    their own inputs are not resolved.
+
+    Returns
+    - (list[FeatureSpec | None], tuple[str]): one spec per name (None when the
+      feature has no definition for `kind`) and the intermediate order
+    """
+    specs = [_FEATURES[kind].get(n) for n in names]
+    order: List[str] = []
+
+    def visit(name):
+        if name in order or name == "obj":
+            return
+        if name not in provided:
+            for dep in _INTERMEDIATES[name][0]:
+                visit(dep)
+        order.append(name)
+
+    for spec in specs:
+        for name in spec.inputs if spec else ():
+            visit(name)
+    return specs, tuple(order)
+
+
+def intermediate_fn(name: str) -> Tuple[Tuple[str, ...], Callable]:
+    """`(inputs, fn)` of a registered intermediate."""
+    return _INTERMEDIATES[name]
+
+
+def check_names(features: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    """`features` as a tuple (all registered features if None); unknown names raise."""
+    if features is None:
+        return tuple(FEATURE_NAMES)
+    unknown = [f for f in features if f not in FEATURE_NAMES]
+    if unknown:
+        raise ValueError(f"unknown features: {unknown}")
+    return tuple(features)
+
+
+def evaluate(
+    specs: Sequence[Optional[FeatureSpec]], names: Sequence[str], values: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Apply feature specs (from `plan`) to intermediate `values`.
+
+    Values may be scalars (one session) or float64 arrays (one row per session);
+    features without a definition are None.
+    """
+    return {
+        n: spec.fn(*(values[i] for i in spec.inputs)) if spec else None
+        for n, spec in zip(names, specs)
+    }
+
+
+def compute_registered(
+    obj: Dict[str, Any],
+    features: Optional[Sequence[str]] = None,
+    arrays: Optional[SessionArrays] = None,
+) -> Dict[str, Any]:
+    """Compute registered features for one raw session object.
+
+    Parameters
+    - obj: dict -- raw session object
+    - features: list[str] or None -- subset to compute (default: all, in registration order)
+    - arrays: SessionArrays or None -- event streams; loaded lazily from `obj`
+      (see `SessionArrays.for_session`) only if a requested feature needs them
+
+    Returns
+    - dict: feature name -> value (None when the feature does not apply to the task)
+    """
+    names = check_names(features)
+    kind = task_kind(obj.get("task") or obj.get("task_id"))
+    if kind is None:
+        return {n: None for n in names}
+    specs, order = plan(kind, names)
+    values = {"obj": obj}
+    for name in order:
+        if name == "arrays" and arrays is not None:
+            values[name] = arrays
+            continue
+        inputs, fn = _INTERMEDIATES[name]
+        values[name] = fn(*(values[i] for i in inputs))
+    return evaluate(specs, names, values)
+
+
+def main():
+    """CLI: compute a feature subset for every session of a raw tree."""
+    from load_data import iter_raw
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw-dir", type=str, default="../../data/raw")
+    parser.add_argument("--features", nargs="+", default=None)
+    args = parser.parse_args()
+
+    for obj in iter_raw(args.raw_dir):
+        if (obj.get("task") or "").lower().find("tlx") != -1:
+            continue
+        row = compute_registered(obj, features=args.features)
+        print(obj.get("participantId"), obj.get("task") or obj.get("task_id"), row)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,71 +4,246 @@ load_data.py
 
 Utilities to load raw JSON logs from data/raw.
 Provides functions to:
- - load all raw jsons into a list/dict
+ - load all raw jsons into a list/dict (optionally with a process pool)
+ - read packed session archives (see session_archive.py) found under the raw dir
  - create a simple DataFrame view
  - read per-task files
 
 Usage:
     python load_data.py --raw-dir ../../data/raw --list
+    python load_data.py --raw-dir ../../data/raw --workers 8
+    python load_data.py --raw-dir ../../data/raw --listing-cache ../../data/raw_listing.json
+    python load_data.py --raw-dir ../../data/raw --benchmark-compression
 """
 
 import argparse
-import json
+import gzip
 import os
-from pathlib import Path
-from typing import Any, Dict, List
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
+from session import Session
+from session_archive import iter_archived
 
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import JSON_PATTERNS, discover_files, read_json  # noqa: E402
 
-def list_raw_files(raw_dir: str):
-    raw_dir = Path(raw_dir)
-    files = []
-    for root, _, filenames in os.walk(raw_dir):
-        for f in filenames:
-            if f.endswith(".json"):
-                files.append(os.path.join(root, f))
-    return sorted(files)
+DEFAULT_CHUNK_SIZE = 256
+RAW_PATTERNS = JSON_PATTERNS  # plain, gzip and zstd JSON
+# NASA-TLX questionnaire files carry "tlx" in their file name
+TLX_PATTERNS = tuple(p.replace("*", "*tlx*", 1) for p in RAW_PATTERNS)
+
+
+def list_raw_files(
+    raw_dir: str,
+    exclude=(),
+    cache_path: Optional[str] = None,
+    include=RAW_PATTERNS,
+):
+    """Sorted raw session files (`.json`, `.json.gz`, `.json.zst`) under `raw_dir`.
+
+    `include`, `exclude` and `cache_path` are passed to `io_utils.discover_files`
+    (e.g. exclude=("*_tlx.json",) to skip questionnaire files, or
+    include=TLX_PATTERNS to list only them).
+    """
+    return discover_files(
+        raw_dir, include=include, exclude=exclude, cache_path=cache_path
+    )
 
 
 def load_json_file(path: str) -> Dict:
     """Load a single JSON file and return the parsed object.
 
     Parameters
-    - path: str -- path to a JSON file
+    - path: str -- path to a JSON file (`.json.gz` / `.json.zst` are decompressed
+      while parsing)
 
     Returns
     - dict: parsed JSON content
     """
 
-    with open(path, "r") as f:
-        return json.load(f)
+    return read_json(path)
+
+
+def benchmark_compressed_input(raw_dir: str, repeat: int = 3) -> pd.DataFrame:
+    """Compare load throughput of the plain JSON corpus with gzip / zstd copies.
+
+    The `.json` files under `raw_dir` are recompressed into a temporary
+    directory; each variant is loaded `repeat` times and the best run is kept.
+    zstd is skipped when the optional `zstandard` package is missing.
+
+    Returns
+    - pandas.DataFrame: one row per format with disk size, time and throughput
+    """
+    import tempfile
+    import time
+
+    from io_utils import zstandard
+
+    files = [p for p in list_raw_files(raw_dir) if p.endswith(".json")]
+    raw_bytes = sum(os.path.getsize(p) for p in files)
+    writers = {"gzip": (".gz", lambda b: gzip.compress(b, compresslevel=6))}
+    if zstandard is not None:
+        cctx = zstandard.ZstdCompressor(level=3)
+        writers["zstd"] = (".zst", cctx.compress)
+    else:
+        print("Warning: zstandard not installed; skipping .json.zst")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = {"plain": files}
+        for name, (suffix, compress) in writers.items():
+            out = []
+            for i, p in enumerate(files):
+                dst = os.path.join(tmp, f"{i:07d}.json{suffix}")
+                with open(p, "rb") as src, open(dst, "wb") as f:
+                    f.write(compress(src.read()))
+                out.append(dst)
+            variants[name] = out
+        for name, paths in variants.items():
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                for p in paths:
+                    load_json_file(p)
+                best = min(best, time.perf_counter() - t0)
+            disk = sum(os.path.getsize(p) for p in paths)
+            rows.append(
+                {
+                    "format": name,
+                    "files": len(paths),
+                    "disk_mb": disk / 1e6,
+                    "ratio": raw_bytes / max(1, disk),
+                    "seconds": best,
+                    "files_per_s": len(paths) / best if best else float("nan"),
+                    "json_mb_per_s": raw_bytes / 1e6 / best if best else float("nan"),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def _load_one(path: str, as_session: bool = False):
+    obj = load_json_file(path)
+    obj["_source_file"] = path
+    return Session.from_raw(obj) if as_session else obj
+
+
+def _load_batch(
+    paths: List[str], as_sessions: bool = False
+) -> List[Tuple[str, Optional[Dict], Optional[str]]]:
+    """Worker task: parse a batch of JSON files (optionally into `Session`s).
+
+    Errors are returned as strings (not raised) so that one bad file does not
+    abort the batch and so the parent can report them in file order.
+    """
+    out = []
+    for p in paths:
+        try:
+            out.append((p, _load_one(p, as_sessions), None))
+        except Exception as e:
+            out.append((p, None, str(e)))
+    return out
+
+
+def _chunk(items: List[str], size: int) -> List[List[str]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
 
 
-def load_all_raw(raw_dir: str) -> List[Dict]:
+def load_all_raw(
+    raw_dir: str,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    include_archives: bool = True,
+    as_sessions: bool = False,
+    listing_cache: Optional[str] = None,
+    exclude=(),
+    files: Optional[List[str]] = None,
+) -> List[Dict]:
     """Load all JSON files found under `raw_dir`.
 
     Parameters
     - raw_dir: str -- root directory to recurse for JSON files
+    - workers: int -- number of worker processes; 1 loads serially, 0 uses all CPUs
+    - chunk_size: int -- files per batch handed to a worker
+    - include_archives: bool -- also read packed session archives under `raw_dir`
+    - as_sessions: bool -- return compact `Session` records instead of dicts
+      (converted inside the workers)
+    - listing_cache: str or None -- persisted file listing (see `list_raw_files`)
+    - exclude: tuple[str] -- file name patterns not loaded (see `list_raw_files`)
+    - files: list[str] or None -- precomputed `list_raw_files` result to load
+      instead of listing `raw_dir` again
 
     Returns
-    - list[dict]: list of parsed JSON objects, each annotated with `_source_file` path
+    - list[dict | Session]: parsed JSON objects, each annotated with `_source_file` path.
+      The list (and any warnings) follow the sorted file order regardless of `workers`;
+      archived sessions follow the loose files, in shard order.
     """
-    files = list_raw_files(raw_dir)
+    if files is None:
+        files = list_raw_files(raw_dir, exclude=exclude, cache_path=listing_cache)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(files) <= chunk_size:
+        results = _load_batch(files, as_sessions)
+    else:
+        # executor.map yields batches in submission order, so the merged
+        # output is identical to the serial path
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = [
+                r
+                for batch in ex.map(
+                    partial(_load_batch, as_sessions=as_sessions),
+                    _chunk(files, max(1, chunk_size)),
+                )
+                for r in batch
+            ]
+
     data = []
-    for p in files:
+    for p, item, err in results:
+        if err is not None:
+            print(f"Warning: failed reading {p}: {err}")
+            continue
+        data.append(item)
+    if include_archives:
+        archived = iter_archived(raw_dir)
+        data.extend(map(Session.from_raw, archived) if as_sessions else archived)
+    return data
+
+
+def iter_raw(
+    raw_dir: str,
+    include_archives: bool = True,
+    as_sessions: bool = False,
+    listing_cache: Optional[str] = None,
+    exclude=(),
+    archive_where=None,
+) -> Iterator[Dict]:
+    """Yield raw JSON objects under `raw_dir` one at a time, in sorted file order.
+
+    Same objects and warnings as `load_all_raw`, but only the current file is
+    held in memory, so memory use does not grow with the size of the corpus.
+    `archive_where(participantId, task)` selects archived records by their
+    index key (see `session_archive.iter_shard`).
+    """
+    for p in list_raw_files(raw_dir, exclude=exclude, cache_path=listing_cache):
         try:
-            item = load_json_file(p)
-            item["_source_file"] = p
-            data.append(item)
+            item = _load_one(p, as_sessions)
         except Exception as e:
             print(f"Warning: failed reading {p}: {e}")
-    return data
+            continue
+        yield item
+    if include_archives:
+        archived = iter_archived(raw_dir, where=archive_where)
+        yield from map(Session.from_raw, archived) if as_sessions else archived
 
 
 def to_dataframe(raw_objects: List[Dict]) -> pd.DataFrame:
     """
-    Convert list of raw objects into a DataFrame with columns:
+    Convert list of raw objects (dicts or `Session`s) into a DataFrame with columns:
     participantId, task (or task_id), raw_tlx (if present), computed_metrics (dict) and source file.
     """
     rows = []
@@ -99,11 +274,51 @@ def main():
         default=None,
         help="Optionally write a summary CSV listing all raw files",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for parsing (1 = serial, 0 = all CPUs)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Files per worker batch",
+    )
+    parser.add_argument(
+        "--exclude",
+        nargs="+",
+        default=(),
+        help="File name patterns to skip when listing and loading (e.g. '*_tlx.json')",
+    )
+    parser.add_argument(
+        "--listing-cache",
+        type=str,
+        default=None,
+        help="Persisted file listing; unchanged directories are not rescanned",
+    )
+    parser.add_argument(
+        "--benchmark-compression",
+        action="store_true",
+        help="Compare load throughput of plain, gzip and zstd copies of the corpus",
+    )
     args = parser.parse_args()
 
-    files = list_raw_files(args.raw_dir)
+    if args.benchmark_compression:
+        print(benchmark_compressed_input(args.raw_dir).to_string(index=False))
+        return
+
+    files = list_raw_files(
+        args.raw_dir, exclude=args.exclude, cache_path=args.listing_cache
+    )
     print(f"Found {len(files)} json files under {args.raw_dir}")
-    data = load_all_raw(args.raw_dir)
+    data = load_all_raw(
+        args.raw_dir,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        files=files,
+    )
     df = to_dataframe(data)
     print(df.head(10).to_string(index=False))
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+mouse_kinematics.py
+
+Kinematic features of a mouse path, computed with vectorized NumPy over the
+(x, y, t) arrays of `SessionArrays`:
+
+ - mouse_speed_mean / mouse_speed_max       px per ms between consecutive samples
+ - mouse_accel_mean                         mean |d speed / dt|
+ - mouse_curvature_mean                     mean |turning angle| (rad) between segments
+ - mouse_straightness                       net displacement / path length
+ - mouse_pause_count                        gaps longer than `pause_ms`
+ - mouse_direction_entropy                  mean Shannon entropy (bits) of the
+                                            direction histogram over sliding windows
+
+Time-based features are NaN when the path has no timestamps. Paths with fewer
+than two (three for curvature) points give NaN as well.
+
+Usage:
+    python mouse_kinematics.py --benchmark --points 10000 50000
+"""
+
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+KINEMATIC_FEATURES = [
+    "mouse_speed_mean",
+    "mouse_speed_max",
+    "mouse_accel_mean",
+    "mouse_curvature_mean",
+    "mouse_straightness",
+    "mouse_pause_count",
+    "mouse_direction_entropy",
+]
+
+DEFAULT_WINDOW = 32
+DEFAULT_STEP = 16
+DEFAULT_BINS = 8
+DEFAULT_PAUSE_MS = 300.0
+
+
+def windowed_direction_entropy(
+    angles: np.ndarray,
+    window: int = DEFAULT_WINDOW,
+    step: int = DEFAULT_STEP,
+    n_bins: int = DEFAULT_BINS,
+) -> float:
+    """Mean entropy (bits) of direction histograms over sliding windows of segments.
+
+    Histograms for all windows come from one cumulative count table, so the
+    cost is O(n * n_bins) regardless of the window size. Paths shorter than
+    one window are treated as a single window.
+    """
+    n = len(angles)
+    if n == 0:
+        return float("nan")
+    bins = ((angles + np.pi) * (n_bins / (2 * np.pi))).astype(np.int64) % n_bins
+    onehot = np.zeros((n + 1, n_bins), dtype=np.int64)
+    onehot[np.arange(1, n + 1), bins] = 1
+    cum = np.cumsum(onehot, axis=0)
+    w = min(window, n)
+    starts = np.arange(0, n - w + 1, max(1, step))
+    counts = cum[starts + w] - cum[starts]
+    p = counts / w
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ent = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)
+    return float(ent.mean())
+
+
+def kinematic_features(
+    x: np.ndarray,
+    y: np.ndarray,
+    t: np.ndarray,
+    window: int = DEFAULT_WINDOW,
+    step: int = DEFAULT_STEP,
+    n_bins: int = DEFAULT_BINS,
+    pause_ms: float = DEFAULT_PAUSE_MS,
+) -> Dict[str, float]:
+    """Compute KINEMATIC_FEATURES for one path given coordinate and time arrays."""
+    nan = float("nan")
+    out = {k: nan for k in KINEMATIC_FEATURES}
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    t = np.asarray(t, dtype=np.float64)
+    if len(x) < 2:
+        out["mouse_pause_count"] = 0.0
+        return out
+
+    dx = np.diff(x)
+    dy = np.diff(y)
+    seg = np.hypot(dx, dy)
+    path_len = seg.sum()
+    out["mouse_straightness"] = (
+        float(np.hypot(x[-1] - x[0], y[-1] - y[0]) / path_len) if path_len > 0 else nan
+    )
+
+    moving = seg > 0
+    angles = np.arctan2(dy[moving], dx[moving])
+    if len(angles) >= 2:
+        turn = np.diff(angles)
+        turn = (turn + np.pi) % (2 * np.pi) - np.pi  # wrap to [-pi, pi)
+        out["mouse_curvature_mean"] = float(np.abs(turn).mean())
+    out["mouse_direction_entropy"] = windowed_direction_entropy(
+        angles, window=window, step=step, n_bins=n_bins
+    )
+
+    if np.isnan(t).all():
+        return out
+    dt = np.diff(t)
+    out["mouse_pause_count"] = float(np.count_nonzero(dt > pause_ms))
+    valid = dt > 0
+    if not valid.any():
+        return out
+    speed = seg[valid] / dt[valid]
+    out["mouse_speed_mean"] = float(speed.mean())
+    out["mouse_speed_max"] = float(speed.max())
+    if len(speed) >= 2:
+        t_mid = (t[1:][valid] + t[:-1][valid]) / 2
+        dtm = np.diff(t_mid)
+        ok = dtm > 0
+        if ok.any():
+            out["mouse_accel_mean"] = float(np.abs(np.diff(speed)[ok] / dtm[ok]).mean())
+    return out
+
+
+def kinematic_features_from_arrays(arrays, **kwargs) -> Dict[str, float]:
+    """KINEMATIC_FEATURES for a `SessionArrays` instance."""
+    return kinematic_features(arrays.mouse_x, arrays.mouse_y, arrays.mouse_t, **kwargs)
+
+
+def _random_path(n: int, rng: np.random.Generator):
+    x = np.cumsum(rng.normal(0, 4, n)) + 600
+    y = np.cumsum(rng.normal(0, 4, n)) + 400
+    t = np.cumsum(rng.exponential(16, n))
+    return x, y, t
+
+
+def benchmark(sizes, repeat: int = 20, seed: int = 2025):
+    """Print per-session cost of `kinematic_features` at several path lengths."""
+    rng = np.random.default_rng(seed)
+    for n in sizes:
+        x, y, t = _random_path(n, rng)
+        kinematic_features(x, y, t)  # warm-up
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            kinematic_features(x, y, t)
+            times.append(time.perf_counter() - t0)
+        times = np.array(times) * 1e3
+        print(
+            f"{n:>8d} points: median {np.median(times):.3f} ms, "
+            f"min {times.min():.3f} ms ({np.median(times) * 1e3 / n:.3f} us/point)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument(
+        "--points", type=int, nargs="+", default=[1000, 10000, 50000, 100000]
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.points, repeat=args.repeat)
+    else:
+        rng = np.random.default_rng(2025)
+        for k, v in kinematic_features(*_random_path(args.points[0], rng)).items():
+            print(f"{k:>26s}: {v:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+online_features.py
+
+Stateful, per-event feature extractor for live sessions.
+
+`OnlineFeatureExtractor` consumes interaction events one at a time and keeps
+O(1) running aggregates (counts, sums, Welford mean/variance of mouse x), so
+the current REQUIRED_FEATURES vector can be read at any point mid-task
+without rescanning the session. The running aggregates are exposed as the
+intermediates of feature_registry.py and the features are the registry
+definitions applied to them, so at session end they agree with
+`compute_features_from_raw` to floating-point tolerance. `--verify` checks
+this, and the batch engine, on a raw tree.
+
+Event types accepted by `update(event)` (a dict with a "type" key; any event
+may also carry "elapsed_ms", the time since task start):
+
+    mouse_move           x, [y], [t]
+    field_focus          focus_time_ms
+    idle                 duration_ms
+    component_switch
+    constraint_violation
+    budget_update
+    budget_overrun
+    product_view
+    hover_switch
+    filter_change        value_after     (only the first filter change is scored)
+    form_error
+    zip_code_correction
+    drag_attempt                         (first meeting)
+    outcome              success
+    tick                                 (just advances elapsed_ms)
+
+Usage:
+    python online_features.py --raw-dir ../../data/raw --verify
+"""
+
+import argparse
+import math
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from batch_features import compute_features_batch
+from compute_features import REQUIRED_FEATURES, compute_features_from_raw
+from feature_registry import evaluate, plan, task_kind
+from load_data import iter_raw
+from session_arrays import SessionArrays
+
+
+class OnlineFeatureExtractor:
+    """Running feature state for one (participant, task) session."""
+
+    __slots__ = (
+        "task",
+        "participant_id",
+        "elapsed_ms",
+        "n_mouse",
+        "mouse_mean",
+        "mouse_m2",
+        "n_fields",
+        "focus_total",
+        "idle_total",
+        "n_switches",
+        "n_violations",
+        "n_budget_updates",
+        "n_overruns",
+        "n_products",
+        "n_hover_switches",
+        "first_filter_set",
+        "n_errors",
+        "n_zip_corrections",
+        "n_drag_attempts",
+        "success",
+    )
+
+    def __init__(self, task: str, participant_id: Optional[str] = None):
+        self.task = task
+        self.participant_id = participant_id
+        self.elapsed_ms = None
+        self.n_mouse = 0
+        self.mouse_mean = 0.0
+        self.mouse_m2 = 0.0
+        self.n_fields = 0
+        self.focus_total = 0.0
+        self.idle_total = 0.0
+        self.n_switches = 0
+        self.n_violations = 0
+        self.n_budget_updates = 0
+        self.n_overruns = 0
+        self.n_products = 0
+        self.n_hover_switches = 0
+        self.first_filter_set = None
+        self.n_errors = 0
+        self.n_zip_corrections = 0
+        self.n_drag_attempts = 0
+        self.success = True
+
+    # ------------------------------------------------------------------
+    # Event handlers
+    # ------------------------------------------------------------------
+
+    def mouse_move(self, x: float, y: float = None, t: float = None):
+        # Welford update of mean / sum of squared deviations of x
+        self.n_mouse += 1
+        delta = x - self.mouse_mean
+        self.mouse_mean += delta / self.n_mouse
+        self.mouse_m2 += delta * (x - self.mouse_mean)
+
+    def field_focus(self, focus_time_ms: float = 0):
+        self.n_fields += 1
+        self.focus_total += focus_time_ms
+
+    def idle(self, duration_ms: float = 0):
+        self.idle_total += duration_ms
+
+    def filter_change(self, value_after: Any = 0):
+        if self.first_filter_set is None:
+            self.first_filter_set = value_after and 1.0 or 0.0
+
+    def update(self, event: Dict[str, Any]):
+        """Apply one event dict (see module docstring for the accepted types)."""
+        if "elapsed_ms" in event:
+            self.elapsed_ms = event["elapsed_ms"]
+        kind = event["type"]
+        if kind == "mouse_move":
+            self.mouse_move(event.get("x", 0), event.get("y"), event.get("t"))
+        elif kind == "field_focus":
+            self.field_focus(event.get("focus_time_ms", 0))
+        elif kind == "idle":
+            self.idle(event.get("duration_ms", 0))
+        elif kind == "filter_change":
+            self.filter_change(event.get("value_after", 0))
+        elif kind == "outcome":
+            self.success = event.get("success", True)
+        elif kind in _COUNTERS:
+            attr = _COUNTERS[kind]
+            setattr(self, attr, getattr(self, attr) + 1)
+        elif kind != "tick":
+            raise ValueError(f"unknown event type: {kind!r}")
+
+    # ------------------------------------------------------------------
+    # Feature vector
+    # ------------------------------------------------------------------
+
+    def intermediates(self) -> Dict[str, Any]:
+        """Registry intermediates (see feature_registry.py) from the running state."""
+        return {
+            "total_time_ms": self.elapsed_ms,
+            "n_mouse": float(self.n_mouse),
+            "mouse_entropy": (
+                math.sqrt(self.mouse_m2 / self.n_mouse) + 1e-6
+                if self.n_mouse
+                else math.nan
+            ),
+            "idle_total": float(self.idle_total),
+            "focus_total": float(self.focus_total),
+            "n_fields": float(self.n_fields),
+            "n_switches": float(self.n_switches),
+            "error_count": float(self.n_errors),
+            "succeeded": self.success and 1.0 or 0.0,
+            "zip_code_corrections": float(self.n_zip_corrections),
+            "first_filter_set": self.first_filter_set,
+            "rapid_hovers": float(self.n_hover_switches),
+            "n_products_viewed": float(self.n_products),
+            "n_violations": float(self.n_violations),
+            "budget_overruns": float(self.n_overruns),
+            "n_budget_updates": float(self.n_budget_updates),
+            "drag_attempts": float(self.n_drag_attempts),
+            # live sessions carry no computed_metrics block
+            "logged_recovery": None,
+        }
+
+    def features(self) -> Dict[str, Optional[float]]:
+        """Current REQUIRED_FEATURES values; O(1), does not change the state.
+
+        The values come from the registry definitions applied to `intermediates()`.
+        """
+        kind = task_kind(self.task)
+        if kind is None:
+            return {k: None for k in REQUIRED_FEATURES}
+        specs, _ = plan(kind, _FEATURE_NAMES, _PROVIDED)
+        return evaluate(specs, _FEATURE_NAMES, self.intermediates())
+
+
+_FEATURE_NAMES = tuple(REQUIRED_FEATURES)
+_PROVIDED = frozenset(OnlineFeatureExtractor(None).intermediates())
+
+_COUNTERS = {
+    "component_switch": "n_switches",
+    "constraint_violation": "n_violations",
+    "budget_update": "n_budget_updates",
+    "budget_overrun": "n_overruns",
+    "product_view": "n_products",
+    "hover_switch": "n_hover_switches",
+    "form_error": "n_errors",
+    "zip_code_correction": "n_zip_corrections",
+    "drag_attempt": "n_drag_attempts",
+}
+
+
+def events_from_raw(obj: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Replay a finished raw session as a stream of events (for testing/backfill).
+
+    Per-event streams go through `SessionArrays.for_session`, so slim sessions
+    whose streams live in `.npy` side files replay the same way.
+    """
+    arrays = SessionArrays.for_session(obj)
+    for x, y, t in arrays.mouse.tolist():
+        yield {"type": "mouse_move", "x": x, "y": y, "t": t}
+    for ms in arrays.fields.tolist():
+        yield {"type": "field_focus", "focus_time_ms": ms}
+    for ms in arrays.idle_duration.tolist():
+        yield {"type": "idle", "duration_ms": ms}
+    for _ in range(len(arrays.switches)):
+        yield {"type": "component_switch"}
+    for _ in obj.get("constraint_violations") or []:
+        yield {"type": "constraint_violation"}
+    budget = obj.get("budget") or {}
+    for _ in budget.get("updates", []):
+        yield {"type": "budget_update"}
+    for _ in range(int(budget.get("overrun_events", 0))):
+        yield {"type": "budget_overrun"}
+    prod = obj.get("product_exploration") or {}
+    for _ in prod.get("products_viewed", []):
+        yield {"type": "product_view"}
+    for _ in range(int(prod.get("rapid_hover_switches", 0))):
+        yield {"type": "hover_switch"}
+    for fi in obj.get("filter_interactions") or []:
+        yield {"type": "filter_change", "value_after": fi.get("value_after", 0)}
+    summary = obj.get("summary_metrics", {})
+    for _ in range(int(summary.get("error_count", 0))):
+        yield {"type": "form_error"}
+    tsm = obj.get("task_specific_metrics", {})
+    for _ in range(int(tsm.get("zip_code_corrections", 0))):
+        yield {"type": "zip_code_correction"}
+    for _ in range(int((obj.get("meetings") or [{}])[0].get("drag_attempts", 0))):
+        yield {"type": "drag_attempt"}
+    yield {"type": "outcome", "success": summary.get("success", True)}
+    if "total_time_ms" in summary:
+        yield {"type": "tick", "elapsed_ms": summary["total_time_ms"]}
+
+
+def replay(obj: Dict[str, Any]) -> OnlineFeatureExtractor:
+    """Extractor state after replaying a finished raw session (see `events_from_raw`)."""
+    ex = OnlineFeatureExtractor(
+        obj.get("task") or obj.get("task_id"), obj.get("participantId")
+    )
+    for ev in events_from_raw(obj):
+        ex.update(ev)
+    return ex
+
+
+def _vector(values: Dict[str, Any]) -> np.ndarray:
+    return np.array(
+        [np.nan if values[k] is None else values[k] for k in REQUIRED_FEATURES],
+        dtype=np.float64,
+    )
+
+
+def verify_engines(objs: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Check the online and batch engines against the per-session path.
+
+    Every session is replayed through `OnlineFeatureExtractor`, computed by
+    `compute_features_from_raw` (the registry applied to one session) and by
+    `compute_features_batch`; all three evaluate the feature_registry.py
+    definitions from their own intermediates.
+
+    Returns
+    - dict: engine name ("online", "batch") -> indices of sessions whose
+      features differ from the per-session path
+    """
+    with np.errstate(invalid="ignore"):
+        ref = np.array([_vector(compute_features_from_raw(o)) for o in objs])
+    online = [_vector(replay(obj).features()) for obj in objs]
+    engines = {
+        "online": np.array(online).reshape(ref.shape),
+        "batch": compute_features_batch(objs)[REQUIRED_FEATURES].values,
+    }
+    mismatches = {}
+    for name, values in engines.items():
+        ok = np.isclose(values, ref, rtol=1e-9, atol=1e-12, equal_nan=True).all(axis=1)
+        mismatches[name] = np.flatnonzero(~ok).tolist()
+    return mismatches
+
+
+def main():
+    """CLI: replay raw sessions through the online extractor; with --verify,
+    check the online, per-session and batch engines against each other."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw-dir", type=str, default="../../data/raw")
+    parser.add_argument("--verify", action="store_true")
+    args = parser.parse_args()
+
+    sessions = (
+        obj
+        for obj in iter_raw(args.raw_dir)
+        # a computed_metrics block (even a null one, which the per-session
+        # path reads) has no event counterpart to replay
+        if (obj.get("task") or "").lower().find("tlx") == -1
+        and "computed_metrics" not in obj
+    )
+    if not args.verify:
+        n = 0
+        for obj in sessions:
+            replay(obj).features()
+            n += 1
+        print(f"Replayed {n} sessions")
+        return
+
+    objs = list(sessions)
+    mismatches = verify_engines(objs)
+    for name, rows in mismatches.items():
+        for i in rows:
+            print(f"Mismatch ({name}):", objs[i].get("_source_file"))
+    counts = ", ".join(f"{name} {len(rows)}" for name, rows in mismatches.items())
+    print(f"Replayed {len(objs)} sessions; mismatches vs per-session: {counts}")
+    if any(mismatches.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
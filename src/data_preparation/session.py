@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+session.py
+
+Compact in-memory record of one raw session.
+
+A parsed raw JSON is a dict holding lists of small event dicts; with many
+sessions resident, those per-event dicts dominate memory. `Session` keeps the
+identifying fields in slots, the event streams as a `SessionArrays` (four
+contiguous float64 arrays) and only the remaining task-specific blocks in a
+small `extra` dict.
+
+`Session` answers the read-only dict protocol used by the feature code
+(`get`, `[]`, `in`) with the raw key names, so `compute_features_from_raw`,
+`build_feature_row` and the batch engine take either form.
+
+Usage:
+    python session.py --raw-dir ../../data/raw     # compare resident memory: dicts vs sessions
+"""
+
+import argparse
+import tracemalloc
+from typing import Any, Dict, Optional
+
+from session_arrays import STREAM_KEYS, SessionArrays
+
+_STREAM_KEYS = frozenset(STREAM_KEYS + ("mouse_data", "stream_files"))
+# raw keys held in slots (everything else goes to `extra`)
+_SLOT_KEYS = {
+    "participantId": "participant_id",
+    "task": "task",
+    "task_id": "task_id",
+    "raw_tlx": "tlx",
+    "summary_metrics": "summary",
+    "_source_file": "source_file",
+}
+_MISSING = object()
+
+
+class Session:
+    """One raw session: typed identity fields, event arrays and leftover blocks."""
+
+    __slots__ = (
+        "participant_id",
+        "task",
+        "task_id",
+        "tlx",
+        "summary",
+        "arrays",
+        "source_file",
+        "extra",
+    )
+
+    def __init__(
+        self,
+        participant_id: Optional[str] = None,
+        task: Optional[str] = None,
+        task_id: Optional[str] = None,
+        tlx: Optional[float] = None,
+        summary: Optional[Dict[str, Any]] = None,
+        arrays: Optional[SessionArrays] = None,
+        source_file: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.participant_id = participant_id
+        self.task = task
+        self.task_id = task_id
+        self.tlx = tlx
+        self.summary = summary
+        self.arrays = arrays
+        self.source_file = source_file
+        self.extra = extra or None
+
+    @classmethod
+    def from_raw(cls, obj: Dict[str, Any]) -> "Session":
+        """Convert a parsed raw JSON object (streams become arrays, slim files load `.npy`)."""
+        tlx = obj.get("raw_tlx") or (
+            obj.get("tlx_scores") and obj["tlx_scores"].get("raw_tlx")
+        )
+        has_streams = any(k in obj for k in _STREAM_KEYS)
+        extra = {
+            k: v
+            for k, v in obj.items()
+            if k not in _SLOT_KEYS and k not in _STREAM_KEYS and k != "tlx_scores"
+        }
+        return cls(
+            participant_id=obj.get("participantId"),
+            task=obj.get("task"),
+            task_id=obj.get("task_id"),
+            tlx=None if tlx is None else float(tlx),
+            summary=obj.get("summary_metrics"),
+            arrays=SessionArrays.for_session(obj) if has_streams else None,
+            source_file=obj.get("_source_file"),
+            extra=extra,
+        )
+
+    def to_raw(self) -> Dict[str, Any]:
+        """Raw-style dict (streams as lists of dicts, TLX as `raw_tlx`)."""
+        obj = {}
+        for key, attr in _SLOT_KEYS.items():
+            v = getattr(self, attr)
+            if v is not None and key != "_source_file":
+                obj[key] = v
+        obj.update(self.extra or {})
+        if self.arrays is not None:
+            obj.update(self.arrays.to_raw())
+        return obj
+
+    # -- read-only dict protocol over raw key names ------------------------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        attr = _SLOT_KEYS.get(key)
+        if attr is not None:
+            v = getattr(self, attr)
+            return default if v is None else v
+        if key in STREAM_KEYS:
+            # compatibility path; feature code reads `arrays` directly
+            if self.arrays is None:
+                return default
+            return self.arrays.to_raw()[key]
+        if self.extra is None:
+            return default
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        v = self.get(key, _MISSING)
+        if v is _MISSING:
+            raise KeyError(key)
+        return v
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __repr__(self) -> str:
+        n = 0 if self.arrays is None else len(self.arrays.mouse)
+        return (
+            f"Session({self.participant_id!r}, {self.task or self.task_id!r}, "
+            f"tlx={self.tlx}, mouse={n})"
+        )
+
+
+def main():
+    """CLI: report resident memory of a raw tree held as dicts and as `Session`s."""
+    from load_data import load_all_raw
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw-dir", type=str, default="../../data/raw")
+    args = parser.parse_args()
+
+    for as_sessions in (False, True):
+        tracemalloc.start()
+        data = load_all_raw(args.raw_dir, as_sessions=as_sessions)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        label = "sessions" if as_sessions else "dicts"
+        print(
+            f"{label:>8s}: {len(data)} objects, {current / 1e6:.2f} MB "
+            f"({current / max(1, len(data)) / 1e3:.1f} KB each)"
+        )
+        del data
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+session_archive.py
+
+Packed, indexed storage for raw sessions.
+
+Instead of one small JSON file per session, sessions are appended to sharded
+JSON-lines files. Each shard has a sidecar offset index so a single session can
+be read with one seek, without scanning the shard:
+
+    sessions-00000.jsonl        one JSON object per line
+    sessions-00000.jsonl.idx    {"compressed": false, "entries": [[pid, task, offset, length, source], ...]}
+
+With `--compress`, shards are `sessions-NNNNN.jsonl.gz` where every record is
+its own gzip member; offsets then point into the compressed file and a record
+is inflated on its own. The whole shard is still a valid .gz stream.
+
+`load_data.load_all_raw` / `iter_raw` pick up shards found under the raw
+directory automatically.
+
+Usage:
+    python session_archive.py --raw-dir ../../data/raw --out-dir ../../data/raw_packed
+    python session_archive.py --raw-dir ../../data/raw --out-dir ../../data/raw_packed --compress
+    python session_archive.py --out-dir ../../data/raw_packed --get p-0001 task_3_travel
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import discover_files  # noqa: E402
+
+DEFAULT_SHARD_SIZE = 10000
+INDEX_SUFFIX = ".idx"
+_SHARD_RE = re.compile(r"sessions-(\d+)\.jsonl(\.gz)?$")
+
+
+def session_key(obj: Dict[str, Any]) -> Tuple[Any, Any]:
+    """Index key of a raw session: (participantId, task)."""
+    return obj.get("participantId"), obj.get("task") or obj.get("task_id")
+
+
+def _gzip_member(data: bytes) -> bytes:
+    c = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    return c.compress(data) + c.flush()
+
+
+def _read_index(index_path: str) -> Dict[str, Any]:
+    with open(index_path, "r") as f:
+        return json.load(f)
+
+
+def _write_index(index_path: str, index: Dict[str, Any]):
+    tmp = index_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path)
+
+
+def list_archive_shards(root: str) -> List[str]:
+    """Return shard paths under `root` that have an index, in sorted order."""
+    return [
+        p[: -len(INDEX_SUFFIX)]
+        for p in discover_files(root, include=("*" + INDEX_SUFFIX,))
+        if _SHARD_RE.search(os.path.basename(p)[: -len(INDEX_SUFFIX)])
+    ]
+
+
+class SessionArchiveWriter:
+    """Append sessions to sharded JSONL archives under `out_dir`.
+
+    Appending resumes in the last existing shard until it holds `shard_size`
+    records. Indexes are rewritten whenever a shard is finished and on `close()`.
+    """
+
+    def __init__(
+        self, out_dir: str, shard_size: int = DEFAULT_SHARD_SIZE, compress=False
+    ):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.compress = compress
+        os.makedirs(out_dir, exist_ok=True)
+        self._fh = None
+        self._path = None
+        self._index = None
+        existing = sorted(
+            p[: -len(INDEX_SUFFIX)]
+            for p in glob.glob(os.path.join(out_dir, "sessions-*" + INDEX_SUFFIX))
+        )
+        self._next_shard = 0
+        if existing:
+            last = existing[-1]
+            self._next_shard = int(_SHARD_RE.search(last).group(1)) + 1
+            index = _read_index(last + INDEX_SUFFIX)
+            if (
+                len(index["entries"]) < shard_size
+                and bool(index["compressed"]) == compress
+            ):
+                self._open(last, index)
+
+    def _open(self, path: str, index: Dict[str, Any]):
+        self._path = path
+        self._index = index
+        self._fh = open(path, "ab")
+        # drop any bytes past the last indexed record (e.g. an interrupted write)
+        end = 0
+        if index["entries"]:
+            _, _, off, length, _ = index["entries"][-1]
+            end = off + length
+        self._fh.truncate(end)
+        self._fh.seek(end)
+
+    def _new_shard(self):
+        ext = ".jsonl.gz" if self.compress else ".jsonl"
+        path = os.path.join(self.out_dir, f"sessions-{self._next_shard:05d}{ext}")
+        self._next_shard += 1
+        self._open(path, {"compressed": self.compress, "entries": []})
+
+    def _finish_shard(self):
+        if self._fh is not None:
+            self._fh.close()
+            _write_index(self._path + INDEX_SUFFIX, self._index)
+            self._fh = None
+
+    def append(self, obj: Dict[str, Any], source: Optional[str] = None):
+        """Append one session object; `source` records where it came from."""
+        if self._fh is None or len(self._index["entries"]) >= self.shard_size:
+            self._finish_shard()
+            self._new_shard()
+        record = {k: v for k, v in obj.items() if k != "_source_file"}
+        data = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        if self.compress:
+            data = _gzip_member(data)
+        offset = self._fh.tell()
+        self._fh.write(data)
+        pid, task = session_key(obj)
+        self._index["entries"].append([pid, task, offset, len(data), source])
+
+    def close(self):
+        self._finish_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionArchive:
+    """Read access to all shards under a directory.
+
+    `get(pid, task)` seeks straight to one record via the index; iteration
+    streams every record in shard order. When a key occurs more than once the
+    most recently appended record wins for `get`.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.shards = list_archive_shards(root)
+        self._indexes = {s: _read_index(s + INDEX_SUFFIX) for s in self.shards}
+        self._lookup = {}
+        for shard, index in self._indexes.items():
+            for pid, task, off, length, source in index["entries"]:
+                self._lookup[(pid, task)] = (shard, off, length, source)
+
+    def __len__(self):
+        return sum(len(i["entries"]) for i in self._indexes.values())
+
+    def __contains__(self, key):
+        return tuple(key) in self._lookup
+
+    def keys(self):
+        return self._lookup.keys()
+
+    @staticmethod
+    def _decode(data: bytes, compressed: bool) -> Dict[str, Any]:
+        if compressed:
+            data = zlib.decompress(data, 31)
+        return json.loads(data)
+
+    def get(self, participant_id, task) -> Dict[str, Any]:
+        """Return a single session, reading only its bytes. Raises KeyError if absent."""
+        shard, off, length, source = self._lookup[(participant_id, task)]
+        with open(shard, "rb") as f:
+            f.seek(off)
+            data = f.read(length)
+        obj = self._decode(data, self._indexes[shard]["compressed"])
+        obj["_source_file"] = source or f"{shard}#{off}"
+        return obj
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for shard in self.shards:
+            yield from iter_shard(shard, self._indexes[shard])
+
+
+def iter_shard(
+    shard: str,
+    index: Optional[Dict[str, Any]] = None,
+    where: Optional[Callable[[Any, Any], bool]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Stream every session of one shard, annotated with `_source_file`.
+
+    With `where(participantId, task)`, only records whose index key passes
+    are read; the others are skipped without touching their bytes.
+    """
+    if index is None:
+        index = _read_index(shard + INDEX_SUFFIX)
+    with open(shard, "rb") as f:
+        for pid, task, off, length, source in index["entries"]:
+            if where is not None and not where(pid, task):
+                continue
+            f.seek(off)
+            obj = SessionArchive._decode(f.read(length), index["compressed"])
+            obj["_source_file"] = source or f"{shard}#{off}"
+            yield obj
+
+
+def iter_archived(
+    root: str, where: Optional[Callable[[Any, Any], bool]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Stream every archived session found under `root`, shard by shard
+    (optionally only the keys passing `where`, see `iter_shard`)."""
+    for shard in list_archive_shards(root):
+        yield from iter_shard(shard, where=where)
+
+
+def pack_sessions(
+    objects: Iterable[Dict[str, Any]],
+    out_dir: str,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    compress: bool = False,
+) -> int:
+    """Append raw session objects to the archive in `out_dir`; returns the count."""
+    n = 0
+    with SessionArchiveWriter(out_dir, shard_size=shard_size, compress=compress) as w:
+        for obj in objects:
+            w.append(obj, source=obj.get("_source_file"))
+            n += 1
+    return n
+
+
+def main():
+    """CLI: pack a raw JSON tree into archives, or fetch a single session."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw-dir", type=str, default=None, help="Raw JSON root")
+    parser.add_argument("--out-dir", type=str, required=True, help="Archive folder")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--compress", action="store_true", help="gzip records")
+    parser.add_argument(
+        "--get",
+        nargs=2,
+        metavar=("PARTICIPANT", "TASK"),
+        default=None,
+        help="Print one session from the archive",
+    )
+    args = parser.parse_args()
+
+    if args.get:
+        print(json.dumps(SessionArchive(args.out_dir).get(*args.get), indent=2))
+        return
+    if not args.raw_dir:
+        parser.error("--raw-dir is required when packing")
+
+    from load_data import iter_raw  # deferred: load_data imports this module
+
+    n = pack_sessions(
+        iter_raw(args.raw_dir, include_archives=False),
+        args.out_dir,
+        shard_size=args.shard_size,
+        compress=args.compress,
+    )
+    print(f"Packed {n} sessions into {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
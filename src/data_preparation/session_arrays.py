@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+session_arrays.py
+
+Compact array representation of the per-event streams of a raw session.
+
+Raw logs keep `mouse_path`, `idle_periods`, `field_interactions` and
+`component_switches` as lists of small dicts. `SessionArrays` holds them as
+contiguous float64 NumPy arrays instead:
+
+    mouse      (n, 3)  x, y, t          -- missing x -> 0, missing y/t -> NaN
+    idle       (n, 2)  start, duration  -- missing duration -> 0
+    fields     (n,)    focus_time_ms    -- missing -> 0
+    switches   (n,)    t                -- missing -> NaN
+
+Arrays can be written as `.npy` side files next to the raw JSON. A "slim" JSON
+whose stream lists were moved out carries a `stream_files` block naming them,
+and `SessionArrays.for_session` loads those instead of the (absent) lists.
+
+Usage:
+    python session_arrays.py --raw-dir ../../data/raw            # write side files
+    python session_arrays.py --raw-dir ../../data/raw --strip    # ... and slim the JSONs
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import COMPRESSED_SUFFIXES, read_json  # noqa: E402
+
+STREAM_KEYS = ("mouse_path", "idle_periods", "field_interactions", "component_switches")
+_SIDE_SUFFIX = {
+    "mouse": ".mouse.npy",
+    "idle": ".idle.npy",
+    "fields": ".fields.npy",
+    "switches": ".switches.npy",
+}
+
+
+def _column(items: List[Dict], key: str, default: float) -> np.ndarray:
+    out = np.empty(len(items), dtype=np.float64)
+    for i, it in enumerate(items):
+        v = it.get(key, default)
+        out[i] = default if v is None else v
+    return out
+
+
+def _py(v: float):
+    """JSON-friendly scalar: integral floats come back as ints."""
+    v = float(v)
+    return int(v) if v.is_integer() else v
+
+
+class SessionArrays:
+    """Event streams of one session as contiguous float64 arrays."""
+
+    __slots__ = ("mouse", "idle", "fields", "switches")
+
+    def __init__(self, mouse=None, idle=None, fields=None, switches=None):
+        self.mouse = np.empty((0, 3)) if mouse is None else np.asarray(mouse)
+        self.idle = np.empty((0, 2)) if idle is None else np.asarray(idle)
+        self.fields = np.empty(0) if fields is None else np.asarray(fields)
+        self.switches = np.empty(0) if switches is None else np.asarray(switches)
+
+    # convenience views
+    @property
+    def mouse_x(self) -> np.ndarray:
+        return self.mouse[:, 0]
+
+    @property
+    def mouse_y(self) -> np.ndarray:
+        return self.mouse[:, 1]
+
+    @property
+    def mouse_t(self) -> np.ndarray:
+        return self.mouse[:, 2]
+
+    @property
+    def idle_duration(self) -> np.ndarray:
+        return self.idle[:, 1]
+
+    @classmethod
+    def from_raw(cls, obj: Dict[str, Any]) -> "SessionArrays":
+        """Build arrays from the dict streams of a raw session object.
+
+        `mouse_data` is accepted as an alias of `mouse_path`; absent or null
+        streams become empty arrays.
+        """
+        mouse = obj.get("mouse_path") or obj.get("mouse_data") or []
+        idle = obj.get("idle_periods") or []
+        fields = obj.get("field_interactions") or []
+        switches = obj.get("component_switches") or []
+        return cls(
+            mouse=np.column_stack(
+                [
+                    _column(mouse, "x", 0.0),
+                    _column(mouse, "y", np.nan),
+                    _column(mouse, "t", np.nan),
+                ]
+            ).reshape(-1, 3),
+            idle=np.column_stack(
+                [_column(idle, "start", np.nan), _column(idle, "duration_ms", 0.0)]
+            ).reshape(-1, 2),
+            fields=_column(fields, "focus_time_ms", 0.0),
+            switches=_column(switches, "t", np.nan),
+        )
+
+    def to_raw(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the streams as raw-style lists of dicts (NaN fields omitted)."""
+
+        def rows(arr, names):
+            out = []
+            for rec in np.asarray(arr).reshape(-1, len(names)):
+                out.append({k: _py(v) for k, v in zip(names, rec) if not np.isnan(v)})
+            return out
+
+        return {
+            "mouse_path": rows(self.mouse, ("x", "y", "t")),
+            "idle_periods": rows(self.idle, ("start", "duration_ms")),
+            "field_interactions": rows(self.fields, ("focus_time_ms",)),
+            "component_switches": rows(self.switches, ("t",)),
+        }
+
+    def save(self, json_path: str) -> Dict[str, str]:
+        """Write `.npy` side files next to `json_path`; returns their file names."""
+        base = os.path.splitext(json_path)[0]
+        names = {}
+        for attr, suffix in _SIDE_SUFFIX.items():
+            np.save(base + suffix, np.ascontiguousarray(getattr(self, attr)))
+            names[attr] = os.path.basename(base + suffix)
+        return names
+
+    @classmethod
+    def load(
+        cls, json_path: str, names: Dict[str, str], mmap: bool = False
+    ) -> "SessionArrays":
+        """Load side files listed in `names` (relative to `json_path`'s folder)."""
+        folder = os.path.dirname(json_path)
+        mode = "r" if mmap else None
+        return cls(
+            **{
+                attr: np.load(os.path.join(folder, fname), mmap_mode=mode)
+                for attr, fname in names.items()
+            }
+        )
+
+    @classmethod
+    def for_session(cls, obj: Dict[str, Any]) -> "SessionArrays":
+        """Arrays for a loaded session: side files if it is slim, else its dict streams.
+
+        A `Session` (session.py) already holds its arrays and returns them as is.
+        """
+        arrays = getattr(obj, "arrays", None)
+        if arrays is not None:
+            return arrays
+        names = obj.get("stream_files")
+        if names and obj.get("_source_file"):
+            return cls.load(obj["_source_file"], names)
+        return cls.from_raw(obj)
+
+
+def write_side_files(json_path: str, strip: bool = False) -> Optional[str]:
+    """Write array side files for one raw JSON; with `strip`, slim the JSON too.
+
+    Returns the JSON path when side files were written, None when the file has
+    nothing to convert (already slim, or a TLX-only file). Compressed JSONs
+    (`.json.gz` / `.json.zst`) are not converted: a slim JSON is only read in
+    place of a plain one, and rewriting it would drop the compression.
+    """
+    if json_path.endswith(COMPRESSED_SUFFIXES):
+        raise ValueError(f"{json_path}: compressed JSONs are not converted")
+    obj = read_json(json_path)
+    if obj.get("stream_files") or not any(k in obj for k in STREAM_KEYS):
+        return None
+    names = SessionArrays.from_raw(obj).save(json_path)
+    if strip:
+        for k in STREAM_KEYS + ("mouse_data",):
+            obj.pop(k, None)
+        obj["stream_files"] = names
+        tmp = json_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(obj, f)
+        os.replace(tmp, json_path)
+    return json_path
+
+
+def main():
+    """CLI: convert every raw JSON under --raw-dir to array side files."""
+    from load_data import list_raw_files
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw-dir", type=str, default="../../data/raw")
+    parser.add_argument(
+        "--strip",
+        action="store_true",
+        help="Remove converted streams from the JSONs (they then read from .npy)",
+    )
+    args = parser.parse_args()
+
+    n = skipped = 0
+    for p in list_raw_files(args.raw_dir):
+        if p.endswith(COMPRESSED_SUFFIXES):
+            skipped += 1
+            continue
+        try:
+            if write_side_files(p, strip=args.strip):
+                n += 1
+        except Exception as e:
+            print(f"Warning: failed converting {p}: {e}")
+    print(f"Wrote array side files for {n} sessions under {args.raw_dir}")
+    if skipped:
+        print(f"Skipped {skipped} compressed JSONs (left unchanged)")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,17 +15,29 @@ Usage:
 
 import argparse
 import os
+import sys
 
-import joblib
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "modeling")
+)
+from model_artifact import ModelArtifact, load_model  # noqa: E402
+
 
 def main():
     """Extract and save Random Forest feature importances and a horizontal bar plot.
 
-    Expects a fitted `Pipeline` with a `rf` step accessible via `named_steps`.
+    `--model` is a fitted `Pipeline` with a `rf` step accessible via
+    `named_steps`, or its memory-mapped artifact directory (model_artifact.py),
+    whose importances are read from the node arrays without rebuilding trees.
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", type=str, required=True)
@@ -35,14 +47,14 @@ def main():
 
     os.makedirs(args.outdir, exist_ok=True)
 
-    df = pd.read_csv(args.csv)
-    drop_cols = {"participantId", "task_id", "tlx", "High_Load"}
-    feature_cols = [c for c in df.columns if c not in drop_cols]
-
-    model = joblib.load(args.model)
-    rf = model.named_steps["rf"]
+    df = load_modeling_csv(args.csv)
+    feature_cols = modeling_feature_cols(df)
 
-    importances = rf.feature_importances_
+    model = load_model(args.model)
+    if isinstance(model, ModelArtifact):
+        importances = model.feature_importances_
+    else:
+        importances = model.named_steps["rf"].feature_importances_
     fi = pd.DataFrame({"feature": feature_cols, "importance": importances}).sort_values(
         "importance", ascending=False
     )
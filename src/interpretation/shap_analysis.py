@@ -18,18 +18,28 @@ Usage:
 import argparse
 import json
 import os
+import sys
 
-import joblib
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import shap
 
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "modeling")
+)
+from model_artifact import ModelArtifact, load_model  # noqa: E402
+
 
 def main():
     """Compute and save SHAP values and summary plots for a trained RF pipeline.
 
-    Expects a scikit-learn `Pipeline` with steps `imputer`, `scaler`, and `rf`.
+    Expects a scikit-learn `Pipeline` with steps `imputer`, `scaler`, and `rf`
+    (joblib file or memory-mapped artifact directory, see model_artifact.py).
     Saves raw SHAP arrays and common summary visualizations into `--outdir`.
     """
     parser = argparse.ArgumentParser()
@@ -40,12 +50,13 @@ def main():
 
     os.makedirs(args.outdir, exist_ok=True)
 
-    df = pd.read_csv(args.csv)
-    drop_cols = {"participantId", "task_id", "tlx", "High_Load"}
-    feature_cols = [c for c in df.columns if c not in drop_cols]
+    df = load_modeling_csv(args.csv)
+    feature_cols = modeling_feature_cols(df)
     X = df[feature_cols]
 
-    model = joblib.load(args.model)
+    model = load_model(args.model)
+    if isinstance(model, ModelArtifact):  # trees rebuilt from the mapped arrays
+        model = model.estimator()
 
     print("Computing SHAP values (TreeExplainer)...")
     # TreeExplainer accepts the underlying fitted tree model (RandomForest estimator).
@@ -19,13 +19,18 @@ Usage:
 import argparse
 import json
 import os
+import sys
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv  # noqa: E402
+
 
 def main():
     """Load SHAP arrays and cluster SHAP vectors (KMeans), saving labels and a PCA plot.
@@ -42,7 +47,7 @@ def main():
     os.makedirs(args.outdir, exist_ok=True)
 
     shap_values = np.load(args.shap_values)
-    df = pd.read_csv(args.csv)
+    df = load_modeling_csv(args.csv)
 
     # K-means clustering on SHAP vectors (simple 2-cluster separation)
     kmeans = KMeans(n_clusters=2, random_state=2025)
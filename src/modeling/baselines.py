@@ -7,16 +7,20 @@ Provides baseline models and LOUO evaluation utilities:
  - logistic regression baseline
 
 Functions:
- - run_baselines_louo(df, feature_cols, group_col='participantId', target_col='High_Load')
+ - run_baselines_louo(df, feature_cols, group_col='participantId', target_col='High_Load', n_jobs=1)
 
 Returns a dict with fold-level metrics and aggregated summary.
 """
 
 import os
-from typing import Any, Dict, List
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import pandas as pd
+from fold_plan import FoldPlan, resolve_fold_plan
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import (
     accuracy_score,
@@ -25,7 +29,11 @@ from sklearn.metrics import (
     recall_score,
     roc_auc_score,
 )
-from sklearn.model_selection import LeaveOneGroupOut
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
 
 
 def evaluate_fold(y_true, y_pred, y_score=None):
@@ -81,71 +89,112 @@ def majority_baseline_predict(train_y, test_X):
     ), np.full(shape=(test_X.shape[0],), fill_value=float(majority_label))
 
 
+# Per-process data for parallel folds (set once by the pool initializer, so
+# X/y are not re-pickled for every fold)
+_FOLD_DATA = {}
+
+
+def _init_fold_worker(X, y, plan):
+    # test rows are read as views of the participant-sorted copies
+    _FOLD_DATA.update(
+        X=X, y=y, plan=plan, X_sorted=plan.sort_rows(X), y_sorted=plan.sort_rows(y)
+    )
+
+
+def _run_baseline_fold(fold_idx):
+    """Fit and score both baselines on one LOUO fold; returns (majority, logreg) records."""
+    X, y, plan = _FOLD_DATA["X"], _FOLD_DATA["y"], _FOLD_DATA["plan"]
+    left_out = plan.left_out(fold_idx)
+    train_idx = plan.train_rows(fold_idx)
+    test = plan.test_slice(fold_idx)
+    X_train, X_test = X[train_idx], _FOLD_DATA["X_sorted"][test]
+    y_train, y_test = y[train_idx], _FOLD_DATA["y_sorted"][test]
+
+    # Majority baseline
+    t0 = time.perf_counter()
+    y_pred_maj, y_score_maj = majority_baseline_predict(y_train, X_test)
+    maj_m = evaluate_fold(y_test, y_pred_maj, y_score_maj)
+    maj_m.update(
+        {"left_out": left_out, "fold": fold_idx, "time_s": time.perf_counter() - t0}
+    )
+
+    # Logistic regression baseline (simple L2 solver, class_weight balanced)
+    t0 = time.perf_counter()
+    lr = LogisticRegression(max_iter=2000, class_weight="balanced", solver="liblinear")
+    try:
+        lr.fit(X_train, y_train)
+        y_pred_lr = lr.predict(X_test)
+        # for roc_auc, need positive probability
+        if hasattr(lr, "predict_proba"):
+            y_score_lr = lr.predict_proba(X_test)[:, 1]
+        else:
+            y_score_lr = lr.decision_function(X_test)
+        lr_m = evaluate_fold(y_test, y_pred_lr, y_score_lr)
+    except Exception as e:
+        # In degenerate cases (e.g., single-class train), fallback to majority
+        y_pred_lr = np.full_like(y_test, fill_value=int(np.round(np.mean(y_train))))
+        y_score_lr = np.full_like(y_test, fill_value=float(np.round(np.mean(y_train))))
+        lr_m = evaluate_fold(y_test, y_pred_lr, y_score_lr)
+    lr_m.update(
+        {"left_out": left_out, "fold": fold_idx, "time_s": time.perf_counter() - t0}
+    )
+    return maj_m, lr_m
+
+
 def run_baselines_louo(
     df: pd.DataFrame,
     feature_cols: List[str],
     group_col: str = "participantId",
     target_col: str = "High_Load",
+    n_jobs: int = 1,
+    fold_plan: Optional[FoldPlan] = None,
 ) -> Dict[str, Any]:
     """
     Run majority baseline and logistic regression baseline under Leave-One-Group-Out (LOUO).
     Returns dict containing fold-level metrics for each baseline and aggregate summaries.
+
+    With `n_jobs` > 1 (-1 = all CPUs) folds run in a process pool. Fold records
+    come back in fold order either way; each carries its wall time (`time_s`).
+    Folds come from `fold_plan` (see fold_plan.py), built from `group_col` if omitted.
     """
     X = df[feature_cols].values
     y = df[target_col].values
-    groups = df[group_col].values
-
-    logo = LeaveOneGroupOut()
-    folds = []
-    fold_idx = 0
-
-    maj_records = []
-    lr_records = []
-
-    for train_idx, test_idx in logo.split(X, y, groups):
-        left_out = groups[test_idx[0]]
-        X_train, X_test = X[train_idx], X[test_idx]
-        y_train, y_test = y[train_idx], y[test_idx]
-
-        # Majority baseline
-        y_pred_maj, y_score_maj = majority_baseline_predict(y_train, X_test)
-        maj_m = evaluate_fold(y_test, y_pred_maj, y_score_maj)
-        maj_m.update({"left_out": left_out, "fold": fold_idx})
-        maj_records.append(maj_m)
-
-        # Logistic regression baseline (simple L2 solver, class_weight balanced)
-        lr = LogisticRegression(
-            max_iter=2000, class_weight="balanced", solver="liblinear"
-        )
-        try:
-            lr.fit(X_train, y_train)
-            y_pred_lr = lr.predict(X_test)
-            # for roc_auc, need positive probability
-            if hasattr(lr, "predict_proba"):
-                y_score_lr = lr.predict_proba(X_test)[:, 1]
-            else:
-                y_score_lr = lr.decision_function(X_test)
-            lr_m = evaluate_fold(y_test, y_pred_lr, y_score_lr)
-        except Exception as e:
-            # In degenerate cases (e.g., single-class train), fallback to majority
-            y_pred_lr = np.full_like(y_test, fill_value=int(np.round(np.mean(y_train))))
-            y_score_lr = np.full_like(
-                y_test, fill_value=float(np.round(np.mean(y_train)))
+    plan = resolve_fold_plan(fold_plan, df[group_col].values)
+    folds = range(plan.n_folds)
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+
+    if not n_jobs or n_jobs <= 1 or len(folds) <= 1:
+        _init_fold_worker(X, y, plan)
+        results = [_run_baseline_fold(f) for f in folds]
+    else:
+        # executor.map returns results in submission (= fold) order; workers
+        # receive only fold numbers and derive the rows from the plan
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_fold_worker,
+            initargs=(X, y, plan),
+        ) as ex:
+            results = list(
+                ex.map(
+                    _run_baseline_fold,
+                    folds,
+                    chunksize=max(1, len(folds) // (4 * n_jobs)),
+                )
             )
-            lr_m = evaluate_fold(y_test, y_pred_lr, y_score_lr)
-        lr_m.update({"left_out": left_out, "fold": fold_idx})
-        lr_records.append(lr_m)
 
-        fold_idx += 1
-
-    maj_df = pd.DataFrame(maj_records)
-    lr_df = pd.DataFrame(lr_records)
+    maj_df = pd.DataFrame([r[0] for r in results])
+    lr_df = pd.DataFrame([r[1] for r in results])
 
     summary = {
         "majority_fold_metrics": maj_df,
         "logreg_fold_metrics": lr_df,
-        "majority_summary": maj_df.mean(numeric_only=True).to_dict(),
-        "logreg_summary": lr_df.mean(numeric_only=True).to_dict(),
+        "majority_summary": maj_df.drop(columns="time_s")
+        .mean(numeric_only=True)
+        .to_dict(),
+        "logreg_summary": lr_df.drop(columns="time_s")
+        .mean(numeric_only=True)
+        .to_dict(),
     }
     return summary
 
@@ -159,13 +208,15 @@ if __name__ == "__main__":
         "--csv", type=str, default="../../data/processed/modeling_dataset.csv"
     )
     parser.add_argument("--outdir", type=str, default="../../results/modeling")
+    parser.add_argument(
+        "--n-jobs", type=int, default=1, help="Parallel fold workers (-1 = all CPUs)"
+    )
     args = parser.parse_args()
 
-    df = pd.read_csv(args.csv)
-    # infer feature columns (drop known metadata)
-    drop_cols = {"participantId", "task_id", "tlx", "High_Load"}
-    feature_cols = [c for c in df.columns if c not in drop_cols]
-    res = run_baselines_louo(df, feature_cols)
+    df = load_modeling_csv(args.csv)
+    feature_cols = modeling_feature_cols(df)
+    plan = FoldPlan.for_csv(args.csv, df)
+    res = run_baselines_louo(df, feature_cols, n_jobs=args.n_jobs, fold_plan=plan)
     os.makedirs(args.outdir, exist_ok=True)
     res["majority_fold_metrics"].to_csv(
         os.path.join(args.outdir, "baseline_majority_fold_metrics.csv"), index=False
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+compiled_forest.py
+
+Flatten a fitted RandomForest (bare, or behind the imputer/scaler
+pipeline) into contiguous NumPy node arrays and score rows with a
+vectorized evaluator: no sklearn input validation, no per-tree Python
+dispatch.
+
+Preprocessing is folded into the node thresholds, so the evaluator works
+directly on raw float64 feature rows:
+
+  - Scaling: sklearn trees test `float32((x - mean) / scale) <= t`. That
+    is a monotone function of x, so each test equals `x <= x*` with x* the
+    largest float64 that passes. x* is found exactly by bisection over the
+    float64 bit order. A plain `t * scale + mean` would disagree with the
+    float32 rounding near the threshold.
+  - Median imputation: a missing value takes the branch its median would,
+    precomputed per node as `nan_left`. Without an imputer the tree's own
+    `missing_go_to_left` is used.
+
+Leaf class fractions are normalized as in DecisionTreeClassifier and
+summed over trees in tree order, so `predict_proba` matches the sklearn
+model bit for bit. With `n_jobs` > 1 the sklearn forest sums trees in
+thread completion order; it may then differ from itself in the last ulp.
+
+Usage:
+    python compiled_forest.py --model ../../models/tuned_random_forest_model.joblib --csv ../../data/processed/modeling_dataset.csv --benchmark
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict
+
+import joblib
+import numpy as np
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
+
+_SIGN = np.uint64(1 << 63)
+
+
+# ------------------------------------------------------------------
+# Exact threshold folding
+# ------------------------------------------------------------------
+
+
+def _ordered_key(x: np.ndarray) -> np.ndarray:
+    """Map float64 to uint64 so that integer order equals float order."""
+    u = np.ascontiguousarray(x, dtype=np.float64).view(np.uint64)
+    return np.where(u & _SIGN, ~u, u | _SIGN)
+
+
+def _from_key(k: np.ndarray) -> np.ndarray:
+    return np.where(k & _SIGN, k ^ _SIGN, ~k).view(np.float64)
+
+
+def _scaled32(x, mean, scale):
+    # what the pipeline hands to the trees: float64 scaling, then float32
+    with np.errstate(over="ignore", invalid="ignore"):
+        return ((x - mean) / scale).astype(np.float32).astype(np.float64)
+
+
+def _fold_thresholds(threshold, mean, scale):
+    """Largest raw float64 x with `float32((x - mean) / scale) <= threshold`, per node."""
+    lo = _ordered_key(np.full(threshold.shape, -np.inf))
+    hi = _ordered_key(np.full(threshold.shape, np.inf))
+    # invariant: the test passes at lo (-inf) and fails at hi (+inf)
+    while True:
+        open_ = hi - lo > 1
+        if not open_.any():
+            return _from_key(lo)
+        mid = lo + (hi - lo) // np.uint64(2)
+        passes = _scaled32(_from_key(mid), mean, scale) <= threshold
+        lo = np.where(open_ & passes, mid, lo)
+        hi = np.where(open_ & ~passes, mid, hi)
+
+
+def _split_pipeline(model):
+    """(imputer or None, scaler or None, forest) of a supported model."""
+    if not isinstance(model, Pipeline):
+        return None, None, model
+    imputer = scaler = None
+    for name, step in model.steps[:-1]:
+        if step is None or step == "passthrough":
+            continue
+        if isinstance(step, SimpleImputer) and imputer is None and scaler is None:
+            if step.add_indicator or not (
+                isinstance(step.missing_values, float) and np.isnan(step.missing_values)
+            ):
+                raise ValueError(f"cannot compile imputer step {name!r}: {step}")
+            imputer = step
+        elif isinstance(step, StandardScaler) and scaler is None:
+            scaler = step
+        else:
+            raise ValueError(f"cannot compile pipeline step {name!r}: {step}")
+    return imputer, scaler, model.steps[-1][1]
+
+
+# ------------------------------------------------------------------
+# Compiled forest
+# ------------------------------------------------------------------
+
+
+class CompiledForest:
+    """A forest as flat node arrays over all trees (global node ids).
+
+    Arrays (one entry per node unless noted):
+    - feature: int32 -- raw input column tested (0 at leaves)
+    - threshold: float64 -- folded raw-space threshold (go left if x <= threshold)
+    - nan_left: bool -- branch taken by a missing value
+    - left / right: int32 -- children (a leaf points to itself)
+    - proba: float64 (n_nodes, n_classes) -- normalized class fractions
+    - roots: int32 (n_trees,) -- root node of each tree
+    """
+
+    ARRAYS = ("feature", "threshold", "nan_left", "left", "right", "proba", "roots")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = int(meta["n_features_in"])
+        self.depth = int(meta["max_depth"])
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_model(cls, model) -> "CompiledForest":
+        """Compile a fitted RandomForest / ExtraTrees classifier or imputer/scaler pipeline."""
+        imputer, scaler, forest = _split_pipeline(model)
+        if not hasattr(forest, "estimators_") or forest.n_outputs_ != 1:
+            raise ValueError(f"cannot compile {type(forest).__name__}")
+
+        first = next(s for s in (imputer, scaler, forest) if s is not None)
+        n_raw = int(first.n_features_in_)
+        # raw column of each column the forest sees (the imputer drops all-NaN columns)
+        columns = np.arange(n_raw)
+        fill = None
+        if imputer is not None:
+            keep = ~np.isnan(imputer.statistics_)
+            if not imputer.keep_empty_features:
+                columns = columns[keep]
+            fill = imputer.statistics_[columns]
+        mean = np.zeros(len(columns))
+        scale = np.ones(len(columns))
+        if scaler is not None:
+            if scaler.mean_ is not None:
+                mean = scaler.mean_
+            if scaler.scale_ is not None:
+                scale = scaler.scale_
+
+        parts = {name: [] for name in cls.ARRAYS}
+        offset = 0
+        for est in forest.estimators_:
+            t = est.tree_
+            n = t.node_count
+            is_leaf = t.children_left < 0
+            f = np.where(is_leaf, 0, t.feature)
+            ids = np.arange(n)
+            parts["feature"].append(np.where(is_leaf, 0, columns[f]))
+            thr = np.full(n, np.inf)
+            internal = ~is_leaf
+            thr[internal] = _fold_thresholds(
+                t.threshold[internal], mean[f[internal]], scale[f[internal]]
+            )
+            parts["threshold"].append(thr)
+            if fill is not None:
+                nan_left = fill[f] <= thr
+            else:
+                nan_left = np.asarray(t.missing_go_to_left, dtype=bool)
+            parts["nan_left"].append(nan_left & internal)
+            parts["left"].append(np.where(is_leaf, ids, t.children_left) + offset)
+            parts["right"].append(np.where(is_leaf, ids, t.children_right) + offset)
+            value = t.value[:, 0, : forest.n_classes_].copy()
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+            parts["proba"].append(value)
+            parts["roots"].append(np.array([offset]))
+            offset += n
+
+        arrays = {
+            "feature": np.concatenate(parts["feature"]).astype(np.int32),
+            "threshold": np.concatenate(parts["threshold"]),
+            "nan_left": np.concatenate(parts["nan_left"]),
+            "left": np.concatenate(parts["left"]).astype(np.int32),
+            "right": np.concatenate(parts["right"]).astype(np.int32),
+            "proba": np.ascontiguousarray(np.concatenate(parts["proba"])),
+            "roots": np.concatenate(parts["roots"]).astype(np.int32),
+        }
+        meta = {
+            "classes": forest.classes_.tolist(),
+            "n_features_in": n_raw,
+            "max_depth": int(max(e.tree_.max_depth for e in forest.estimators_)),
+            "n_nodes": int(offset),
+            "source": type(model).__name__,
+        }
+        return cls(arrays, meta)
+
+    # -- evaluation --------------------------------------------------------
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node id of every (row, tree); X is raw features, shape (n, n_features)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, model expects {self.n_features_in_}"
+            )
+        rows = np.arange(len(X))[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = (x <= self.threshold[node]) | (np.isnan(x) & self.nan_left[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, shape (n, n_classes); equal to the source model's."""
+        leaf_proba = self.proba[self.apply(X)]  # (n, n_trees, n_classes)
+        # sequential sum over trees, in tree order, as the sklearn forest does
+        total = np.cumsum(leaf_proba, axis=1)[:, -1, :]
+        return total / self.n_trees
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path: str) -> str:
+        """Write arrays + metadata as one uncompressed `.npz`."""
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            meta=np.array(json.dumps(self.meta)),
+            **{name: getattr(self, name) for name in self.ARRAYS},
+        )
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {name: z[name] for name in cls.ARRAYS}
+            meta = json.loads(str(z["meta"]))
+        return cls(arrays, meta)
+
+
+def compile_model(model_or_path) -> CompiledForest:
+    """Compile a fitted model object or a joblib model file."""
+    model = model_or_path
+    if isinstance(model_or_path, str):
+        model = joblib.load(model_or_path)
+    return CompiledForest.from_model(model)
+
+
+# ------------------------------------------------------------------
+# Latency benchmark
+# ------------------------------------------------------------------
+
+
+def _latency(fn, rows, repeats):
+    times = np.empty(repeats)
+    for i in range(repeats):
+        row = rows[i % len(rows)]
+        t0 = time.perf_counter()
+        fn(row)
+        times[i] = time.perf_counter() - t0
+    return np.percentile(times, 50) * 1e3, np.percentile(times, 99) * 1e3
+
+
+def benchmark(model, compiled: CompiledForest, X, repeats: int = 200):
+    """Single-row p50/p99 latency (ms) and full-batch time of both scorers."""
+    single = X[:, np.newaxis, :]
+    report = {}
+    for label, fn, n in (
+        ("sklearn", model.predict_proba, max(1, repeats // 10)),
+        ("compiled", compiled.predict_proba, repeats),
+    ):
+        fn(single[0])  # warm up
+        p50, p99 = _latency(fn, single, n)
+        t0 = time.perf_counter()
+        fn(X)
+        batch = (time.perf_counter() - t0) * 1e3
+        report[label] = {"p50_ms": p50, "p99_ms": p99, "batch_ms": batch}
+        print(
+            f"{label:>9s}: single row p50 {p50:.3f} ms, p99 {p99:.3f} ms "
+            f"({n} calls); batch of {len(X)} {batch:.2f} ms"
+        )
+    return report
+
+
+def main():
+    """CLI: compile a joblib model, check it against predict_proba and benchmark it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model", type=str, default="../../models/tuned_random_forest_model.joblib"
+    )
+    parser.add_argument(
+        "--csv", type=str, default="../../data/processed/modeling_dataset.csv"
+    )
+    parser.add_argument(
+        "--out", type=str, default=None, help="Compiled .npz (default: <model>.npz)"
+    )
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--repeats", type=int, default=1000)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    compiled = CompiledForest.from_model(model)
+    out = args.out or os.path.splitext(args.model)[0] + ".npz"
+    compiled.save(out)
+    print(
+        f"Compiled {compiled.n_trees} trees, {compiled.meta['n_nodes']} nodes "
+        f"(depth {compiled.depth}) to {out}"
+    )
+
+    df = load_modeling_csv(args.csv)
+    X = df[modeling_feature_cols(df)].to_numpy(dtype=np.float64)
+    if X.shape[1] != compiled.n_features_in_:
+        print(
+            f"Warning: CSV has {X.shape[1]} features, model expects "
+            f"{compiled.n_features_in_}; skipping the check"
+        )
+        return
+    ref = model.predict_proba(X)
+    got = CompiledForest.load(out).predict_proba(X)
+    print(
+        "predict_proba identical:",
+        bool(np.array_equal(ref, got)),
+        f"(max abs diff {np.abs(ref - got).max():.3g})",
+    )
+    if args.benchmark:
+        benchmark(model, compiled, X, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
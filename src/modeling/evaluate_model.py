@@ -7,15 +7,21 @@ Saves fold-level metrics and an aggregate summary, and can save feature importan
 
 Functions:
  - evaluate_louo(model, df, feature_cols, group_col='participantId', target_col='High_Load')
+ - evaluate_louo_refit(estimator, df, feature_cols, ..., n_jobs=1) -- refits per fold
  - save_fold_metrics_csv(metrics_df, out_path)
 """
 
 import os
-from typing import Any, Dict, List
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
 
 import joblib
 import numpy as np
 import pandas as pd
+from fold_plan import FoldPlan, resolve_fold_plan
+from sklearn.base import clone
 from sklearn.metrics import (
     accuracy_score,
     f1_score,
@@ -23,7 +29,11 @@ from sklearn.metrics import (
     recall_score,
     roc_auc_score,
 )
-from sklearn.model_selection import LeaveOneGroupOut
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
 
 
 def fold_metrics(y_true, y_pred, y_score=None):
@@ -58,25 +68,29 @@ def evaluate_louo(
     feature_cols: List[str],
     group_col: str = "participantId",
     target_col: str = "High_Load",
+    fold_plan: Optional[FoldPlan] = None,
 ):
     """
     Evaluate a fitted sklearn-like model under LOUO.
     model: fitted estimator with predict and predict_proba or decision_function
     returns (folds_df, summary_dict, misclassifications_list)
+
+    A model fitted on the full dataset has seen every left-out participant, so
+    these numbers measure training fit; use `evaluate_louo_refit` for held-out
+    performance.
     """
     X = df[feature_cols].values
     y = df[target_col].values
-    groups = df[group_col].values
-
-    logo = LeaveOneGroupOut()
+    plan = resolve_fold_plan(fold_plan, df[group_col].values)
+    X_sorted, y_sorted = plan.sort_rows(X), plan.sort_rows(y)
     records = []
     mis_list = []
 
-    fold = 0
-    for train_idx, test_idx in logo.split(X, y, groups):
-        left_out = groups[test_idx[0]]
-        X_train, X_test = X[train_idx], X[test_idx]
-        y_train, y_test = y[train_idx], y[test_idx]
+    for fold in range(plan.n_folds):
+        left_out = plan.left_out(fold)
+        train_idx = plan.train_rows(fold)
+        X_train, X_test = X[train_idx], X_sorted[plan.test_slice(fold)]
+        y_train, y_test = y[train_idx], y_sorted[plan.test_slice(fold)]
 
         # If model isn't fitted yet, fit (but normally model should be pre-fit on full train set)
         try:
@@ -115,13 +129,147 @@ def evaluate_louo(
                     }
                 )
 
-        fold += 1
-
     folds_df = pd.DataFrame(records)
     summary = folds_df.mean(numeric_only=True).to_dict()
     return folds_df, summary, mis_list
 
 
+# Per-process fold data, set once by the pool initializer
+_FOLD_DATA = {}
+
+
+def _init_fold_worker(X, y, plan, estimator):
+    _FOLD_DATA.update(
+        X=X,
+        y=y,
+        plan=plan,
+        estimator=estimator,
+        X_sorted=plan.sort_rows(X),
+        y_sorted=plan.sort_rows(y),
+    )
+
+
+def _new_estimator(estimator):
+    """Unfitted estimator from a factory (called) or an estimator (cloned)."""
+    return estimator() if callable(estimator) else clone(estimator)
+
+
+def _positive_score(model, X_test):
+    if hasattr(model, "predict_proba"):
+        return model.predict_proba(X_test)[:, 1]
+    if hasattr(model, "decision_function"):
+        return model.decision_function(X_test)
+    return None
+
+
+def _refit_fold(fold):
+    """Fit a fresh estimator without the left-out participant and score it."""
+    X, y, plan = _FOLD_DATA["X"], _FOLD_DATA["y"], _FOLD_DATA["plan"]
+    train_idx = plan.train_rows(fold)
+    X_test = _FOLD_DATA["X_sorted"][plan.test_slice(fold)]
+    y_test = _FOLD_DATA["y_sorted"][plan.test_slice(fold)]
+    t0 = time.perf_counter()
+    model = _new_estimator(_FOLD_DATA["estimator"])
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - t0
+    y_pred = model.predict(X_test)
+    y_score = _positive_score(model, X_test)
+    m = fold_metrics(y_test, y_pred, y_score)
+    m.update(
+        {
+            "left_out": plan.left_out(fold),
+            "fold": fold,
+            "fit_time_s": fit_time,
+            "time_s": time.perf_counter() - t0,
+        }
+    )
+    return m, y_pred, y_score
+
+
+def evaluate_louo_refit(
+    estimator,
+    df: pd.DataFrame,
+    feature_cols: List[str],
+    group_col: str = "participantId",
+    target_col: str = "High_Load",
+    n_jobs: int = 1,
+    fold_plan: Optional[FoldPlan] = None,
+):
+    """Honest LOUO: fit a fresh estimator per left-out participant.
+
+    Parameters
+    - estimator: callable or estimator -- factory returning an unfitted estimator
+      (e.g. `functools.partial(build_pipeline_from_params, params)`) or an
+      estimator to `clone`; must be picklable when n_jobs != 1
+    - df: DataFrame -- modeling dataset
+    - feature_cols: list[str] -- feature columns
+    - group_col / target_col: str -- participant and label columns
+    - n_jobs: int -- parallel fold workers (-1 = all CPUs)
+    - fold_plan: FoldPlan or None -- precomputed folds (built from `group_col` if None)
+
+    Returns
+    - (folds_df, summary_dict, misclassifications_list, oof_df): fold metrics in
+      fold order (with fit/total time), their mean, misclassified test rows, and
+      out-of-fold predictions (one row per dataset row, in dataset order)
+    """
+    X = df[feature_cols].values
+    y = df[target_col].values
+    groups = df[group_col].values
+    plan = resolve_fold_plan(fold_plan, groups)
+
+    folds = range(plan.n_folds)
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if not n_jobs or n_jobs <= 1 or len(folds) <= 1:
+        _init_fold_worker(X, y, plan, estimator)
+        results = [_refit_fold(f) for f in folds]
+    else:
+        # map keeps submission order, so results line up with `folds`
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_fold_worker,
+            initargs=(X, y, plan, estimator),
+        ) as ex:
+            results = list(ex.map(_refit_fold, folds))
+
+    records = []
+    mis_list = []
+    oof_pred = np.zeros(len(y), dtype=int)
+    oof_score = np.full(len(y), np.nan)
+    oof_fold = np.zeros(len(y), dtype=int)
+    for fold, (m, y_pred, y_score) in zip(folds, results):
+        test_idx = plan.test_rows(fold)
+        records.append(m)
+        oof_pred[test_idx] = y_pred
+        oof_fold[test_idx] = fold
+        if y_score is not None:
+            oof_score[test_idx] = y_score
+        for i, (yi, pi) in enumerate(zip(y[test_idx], y_pred)):
+            if yi != int(pi):
+                mis_list.append(
+                    {
+                        "left_out": m["left_out"],
+                        "test_idx_in_group": i,
+                        "row": int(test_idx[i]),
+                        "true": int(yi),
+                        "pred": int(pi),
+                    }
+                )
+
+    folds_df = pd.DataFrame(records)
+    summary = folds_df.drop(columns=["fit_time_s", "time_s"]).mean(numeric_only=True)
+    oof_df = pd.DataFrame(
+        {
+            group_col: groups,
+            "fold": oof_fold,
+            "true": y,
+            "pred": oof_pred,
+            "proba": oof_score,
+        }
+    )
+    return folds_df, summary.to_dict(), mis_list, oof_df
+
+
 def save_fold_metrics_csv(metrics_df: pd.DataFrame, out_path: str):
     """Save a fold-level metrics DataFrame to CSV, creating directories as needed."""
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
@@ -168,15 +316,27 @@ if __name__ == "__main__":
         "--csv", type=str, default="../../data/processed/modeling_dataset.csv"
     )
     parser.add_argument("--outdir", type=str, default="../../results/modeling")
+    parser.add_argument(
+        "--refit",
+        action="store_true",
+        help="Refit a clone of the model per left-out participant (held-out scores)",
+    )
+    parser.add_argument("--n-jobs", type=int, default=1)
     args = parser.parse_args()
 
-    df = pd.read_csv(os.path.abspath(args.csv))
-    drop_cols = {"participantId", "task_id", "tlx", "High_Load"}
-    feature_cols = [c for c in df.columns if c not in drop_cols]
+    df = load_modeling_csv(os.path.abspath(args.csv))
+    feature_cols = modeling_feature_cols(df)
 
     model = joblib.load(os.path.abspath(args.model))
-    folds_df, summary, mis = evaluate_louo(model, df, feature_cols)
+    plan = FoldPlan.for_csv(os.path.abspath(args.csv), df)
     os.makedirs(args.outdir, exist_ok=True)
+    if args.refit:
+        folds_df, summary, mis, oof = evaluate_louo_refit(
+            model, df, feature_cols, n_jobs=args.n_jobs, fold_plan=plan
+        )
+        oof.to_csv(os.path.join(args.outdir, "rf_oof_predictions.csv"), index=False)
+    else:
+        folds_df, summary, mis = evaluate_louo(model, df, feature_cols, fold_plan=plan)
     folds_df.to_csv(
         os.path.join(args.outdir, "rf_fold_metrics_ultrarealistic.csv"), index=False
     )
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+fold_plan.py
+
+Precomputed Leave-One-User-Out fold plan shared by baselines, hyperparameter
+search and evaluation.
+
+Rows are stably sorted by participant once; each fold is then just a row
+range `[start, stop)` of that order, so the plan stores one permutation, one
+int32 group code per row and two offsets per participant instead of
+per-fold index arrays. Folds come out in the same order, with the same
+(ascending) train/test row indices, as `LeaveOneGroupOut().split`, and the
+plan is itself a scikit-learn CV splitter (`split`, `get_n_splits`).
+
+Test rows of a fold are contiguous in participant order, so for data permuted
+once with `sort_rows`, `data[plan.test_slice(i)]` is a view (no copy).
+
+The plan is persisted next to the modeling CSV as `<csv>.folds.npz` and
+reused while the participant column is unchanged.
+
+Usage:
+    python fold_plan.py --csv ../../data/processed/modeling_dataset.csv
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv  # noqa: E402
+
+FOLD_PLAN_SUFFIX = ".folds.npz"
+
+
+def _groups_digest(groups: np.ndarray) -> str:
+    h = hashlib.sha1()
+    for g in groups:
+        h.update(str(g).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class FoldPlan:
+    """LOUO folds as participant row ranges over one stable sort of the rows."""
+
+    __slots__ = ("labels", "codes", "order", "starts", "stops", "digest")
+
+    def __init__(self, labels, codes, order, starts, stops, digest=""):
+        self.labels = labels  # participant of each fold, sorted
+        self.codes = codes  # fold (participant) index of each row
+        self.order = order  # row permutation sorting rows by participant
+        self.starts = starts
+        self.stops = stops
+        self.digest = digest
+
+    @classmethod
+    def from_groups(cls, groups) -> "FoldPlan":
+        """Build the plan from the participant column (any hashable labels)."""
+        groups = np.asarray(groups)
+        labels, codes = np.unique(groups, return_inverse=True)
+        codes = codes.astype(np.int32)
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=len(labels))
+        stops = np.cumsum(counts)
+        starts = stops - counts
+        return cls(labels, codes, order, starts, stops, _groups_digest(groups))
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path: str) -> str:
+        """Write the plan as an `.npz` archive (labels stored as text)."""
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            labels=self.labels.astype(str),
+            codes=self.codes,
+            order=self.order,
+            starts=self.starts,
+            stops=self.stops,
+            digest=np.array(self.digest),
+        )
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "FoldPlan":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(
+                z["labels"],
+                z["codes"],
+                z["order"],
+                z["starts"],
+                z["stops"],
+                str(z["digest"]),
+            )
+
+    @classmethod
+    def for_csv(
+        cls, csv_path: str, df: pd.DataFrame, group_col: str = "participantId"
+    ) -> "FoldPlan":
+        """Plan stored next to `csv_path`; rebuilt (and re-saved) if the groups changed."""
+        path = str(csv_path) + FOLD_PLAN_SUFFIX
+        groups = df[group_col].values
+        if os.path.exists(path):
+            try:
+                plan = cls.load(path)
+                if len(plan.codes) == len(groups) and plan.digest == _groups_digest(
+                    groups
+                ):
+                    return plan
+            except (OSError, ValueError, KeyError):
+                pass
+        plan = cls.from_groups(groups)
+        try:
+            plan.save(path)
+        except OSError as e:
+            print(f"Warning: could not save fold plan {path}: {e}")
+        return plan
+
+    # -- folds -------------------------------------------------------------
+
+    @property
+    def n_folds(self) -> int:
+        return len(self.labels)
+
+    def left_out(self, fold: int):
+        return self.labels[fold]
+
+    def test_slice(self, fold: int) -> slice:
+        """Row range of `fold` in participant order (see `sort_rows`)."""
+        return slice(int(self.starts[fold]), int(self.stops[fold]))
+
+    def test_rows(self, fold: int) -> np.ndarray:
+        """Original row indices of the left-out participant (ascending, a view)."""
+        return self.order[self.test_slice(fold)]
+
+    def train_rows(self, fold: int) -> np.ndarray:
+        """Original row indices of every other participant (ascending)."""
+        return np.flatnonzero(self.codes != fold)
+
+    def sort_rows(self, data):
+        """Permute rows of an array / DataFrame into participant order (one copy)."""
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            return data.iloc[self.order]
+        return np.asarray(data)[self.order]
+
+    def folds(self) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        for fold in range(self.n_folds):
+            yield fold, self.train_rows(fold), self.test_rows(fold)
+
+    # -- scikit-learn CV splitter protocol ---------------------------------
+
+    def split(self, X=None, y=None, groups=None):
+        for _, train, test in self.folds():
+            yield train, test
+
+    def get_n_splits(self, X=None, y=None, groups=None) -> int:
+        return self.n_folds
+
+
+def resolve_fold_plan(fold_plan: Optional[FoldPlan], groups) -> FoldPlan:
+    """Use `fold_plan` if given (checking it was built from `groups`), else build one."""
+    if fold_plan is None:
+        return FoldPlan.from_groups(groups)
+    if len(fold_plan.codes) != len(groups):
+        raise ValueError(
+            f"fold plan covers {len(fold_plan.codes)} rows, data has {len(groups)}"
+        )
+    if fold_plan.digest != _groups_digest(groups):
+        raise ValueError("fold plan was built from different groups than the data")
+    return fold_plan
+
+
+def main():
+    """CLI: build (or validate) the fold plan stored next to a modeling CSV."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--csv", type=str, default="../../data/processed/modeling_dataset.csv"
+    )
+    parser.add_argument("--group-col", type=str, default="participantId")
+    args = parser.parse_args()
+
+    csv_path = os.path.abspath(args.csv)
+    df = load_modeling_csv(csv_path)
+    plan = FoldPlan.for_csv(csv_path, df, group_col=args.group_col)
+    sizes = plan.stops - plan.starts
+    print(f"Fold plan: {plan.n_folds} folds over {len(plan.codes)} rows")
+    print(f"Test rows per fold: min {sizes.min()}, max {sizes.max()}")
+    print("Saved to", csv_path + FOLD_PLAN_SUFFIX)
+
+
+if __name__ == "__main__":
+    main()
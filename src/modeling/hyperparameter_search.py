@@ -3,80 +3,285 @@
 hyperparameter_search.py
 
 Performs hyperparameter tuning for RandomForestClassifier using grouped CV
-(LeaveOneGroupOut) so that participant groups are respected.
+(LeaveOneGroupOut folds from a shared FoldPlan, see fold_plan.py) so that
+participant groups are respected.
 
-Saves best parameters to JSON and returns best estimator.
+Four modes:
+ - grid:    exhaustive GridSearchCV over PARAM_GRID
+ - halving: successive halving (HalvingGridSearchCV) with the tree count as
+            the budget, for large cohorts where the full grid is too slow
+ - warm_start: the full grid, but each fold / parameter combination grows a
+            single forest through the tree counts (same scores as grid)
+ - binned:  features quantized to uint8 bins once per fold and shared by all
+            candidates, with a histogram (--engine hist) or RF engine
+
+Saves best parameters to JSON and returns best estimator; reports the number
+of model fits and the wall time of the search.
 
 Usage:
     python hyperparameter_search.py --csv ../../data/processed/modeling_dataset.csv --out models/rf_tuned_params.json
+    python hyperparameter_search.py --mode halving --n-jobs -1
 """
 
 import argparse
 import json
 import os
+import sys
+import time
 
 import numpy as np
-import pandas as pd
+from binned_search import MAX_BINS, BinnedFoldSearch, QuantileBinner
+from fold_plan import FoldPlan, resolve_fold_plan
 from joblib import dump
-from sklearn.ensemble import RandomForestClassifier
+from preprocess_cache import preprocess_memory
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
 from sklearn.impute import SimpleImputer
-from sklearn.model_selection import GridSearchCV, LeaveOneGroupOut
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
+from warm_start_search import WarmStartForestSearch
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
+
+PARAM_GRID = {
+    "rf__n_estimators": [100, 300, 600],
+    "rf__max_depth": [None, 6, 12],
+    "rf__min_samples_split": [2, 5],
+    "rf__min_samples_leaf": [1, 2],
+}
+# grid of the histogram engine of the binned search
+HIST_PARAM_GRID = {
+    "hgb__learning_rate": [0.05, 0.1],
+    "hgb__max_iter": [100, 300],
+    "hgb__max_leaf_nodes": [15, 31],
+    "hgb__min_samples_leaf": [5, 20],
+}
+
+
+def _search_pipeline(random_state=2025, memory=None):
+    """Pipeline: imputer -> scaler -> RF (tree count and depth left to the search).
+
+    With a `memory` (see preprocess_cache.py) the imputer/scaler fit of a
+    fold is computed once and reused by every candidate.
+    """
+    return Pipeline(
+        [
+            ("imputer", SimpleImputer(strategy="median")),
+            ("scaler", StandardScaler()),
+            (
+                "rf",
+                RandomForestClassifier(
+                    random_state=random_state, class_weight="balanced"
+                ),
+            ),
+        ],
+        memory=memory,
+    )
+
+
+def _drop_memory(search):
+    # the preprocessing cache only serves fitting; keep saved searches
+    # loadable without it
+    search.estimator.set_params(memory=None)
+    search.best_estimator_.set_params(memory=None)
+    return search
 
 
 def run_grouped_grid_search(
-    df, feature_cols, group_col="participantId", n_jobs=1, random_state=2025
+    df,
+    feature_cols,
+    group_col="participantId",
+    n_jobs=1,
+    random_state=2025,
+    fold_plan=None,
+    memory=None,
 ):
     """Run a grouped GridSearchCV over RandomForest hyperparameters.
 
     Parameters
     - df: pandas.DataFrame -- dataset containing features and `High_Load` target
     - feature_cols: list[str] -- feature column names
-    - group_col: str -- grouping column for LeaveOneGroupOut
+    - group_col: str -- grouping column for the LOUO folds
     - n_jobs: int -- parallel jobs
     - random_state: int -- RNG seed
+    - fold_plan: FoldPlan or None -- precomputed LOUO folds (see fold_plan.py)
+    - memory: None, LRUMemory, joblib.Memory or path -- cache of the per-fold
+      imputer/scaler fits (see preprocess_cache.py)
 
     Returns
     - fitted GridSearchCV object
     """
     X = df[feature_cols].values
     y = df["High_Load"].values
-    groups = df[group_col].values
+    plan = resolve_fold_plan(fold_plan, df[group_col].values)
 
-    # Pipeline: imputer -> scaler -> RF
-    pipe = Pipeline(
-        [
-            ("imputer", SimpleImputer(strategy="median")),
-            ("scaler", StandardScaler()),
-            (
-                "rf",
-                RandomForestClassifier(
-                    random_state=random_state, class_weight="balanced"
-                ),
-            ),
-        ]
+    grid = GridSearchCV(
+        _search_pipeline(random_state, memory),
+        PARAM_GRID,
+        cv=plan,
+        scoring="f1",
+        n_jobs=n_jobs,
+        verbose=1,
     )
+    grid.fit(X, y)
 
-    param_grid = {
-        "rf__n_estimators": [100, 300, 600],
-        "rf__max_depth": [None, 6, 12],
-        "rf__min_samples_split": [2, 5],
-        "rf__min_samples_leaf": [1, 2],
-    }
+    return _drop_memory(grid)
 
-    logo = LeaveOneGroupOut()
-    grid = GridSearchCV(
-        pipe,
+
+def run_grouped_halving_search(
+    df,
+    feature_cols,
+    group_col="participantId",
+    n_jobs=1,
+    random_state=2025,
+    fold_plan=None,
+    factor=3,
+    memory=None,
+):
+    """Successive-halving search over the same grid, with trees as the budget.
+
+    Every candidate (depth / split / leaf combination) starts with a small
+    forest on all LOUO folds; after each round only the best 1/`factor` move
+    on, with `factor` times more trees, so the last round uses (close to)
+    the largest `rf__n_estimators` of PARAM_GRID. Folds stay whole
+    participants. Rows are not used as the budget because halving would
+    subsample the few test rows of each fold.
+
+    Parameters
+    - df / feature_cols / group_col / n_jobs / random_state / fold_plan -- as
+      for `run_grouped_grid_search`
+    - factor: int -- halving rate (candidates kept and tree growth per round)
+    - memory -- imputer/scaler fit cache, as for `run_grouped_grid_search`
+
+    Returns
+    - fitted HalvingGridSearchCV object (`best_params_` includes the tree count)
+    """
+    X = df[feature_cols].values
+    y = df["High_Load"].values
+    plan = resolve_fold_plan(fold_plan, df[group_col].values)
+
+    param_grid = {k: v for k, v in PARAM_GRID.items() if k != "rf__n_estimators"}
+    search = HalvingGridSearchCV(
+        _search_pipeline(random_state, memory),
         param_grid,
-        cv=logo.split(X, y, groups),
+        cv=plan,
         scoring="f1",
+        resource="rf__n_estimators",
+        max_resources=max(PARAM_GRID["rf__n_estimators"]),
+        min_resources="exhaust",
+        factor=factor,
         n_jobs=n_jobs,
+        random_state=random_state,
         verbose=1,
     )
-    grid.fit(X, y)
+    search.fit(X, y)
 
-    return grid
+    return _drop_memory(search)
+
+
+def run_grouped_warm_start_search(
+    df,
+    feature_cols,
+    group_col="participantId",
+    n_jobs=1,
+    random_state=2025,
+    fold_plan=None,
+):
+    """Grid search where each forest is grown once through the tree-count checkpoints.
+
+    Parameters
+    - df / feature_cols / group_col / n_jobs / random_state / fold_plan -- as
+      for `run_grouped_grid_search` (`n_jobs` parallelises over folds)
+
+    Returns
+    - fitted WarmStartForestSearch
+    """
+    X = df[feature_cols].values
+    y = df["High_Load"].values
+    plan = resolve_fold_plan(fold_plan, df[group_col].values)
+    search = WarmStartForestSearch(_search_pipeline(random_state), PARAM_GRID, n_jobs)
+    return search.fit(X, y, plan)
+
+
+def binned_engine(engine="hist", random_state=2025, max_bins=MAX_BINS):
+    """(pipeline, param grid) of a binned-search engine: "hist" or "rf"."""
+    if engine == "hist":
+        step, model, grid = (
+            "hgb",
+            HistGradientBoostingClassifier(
+                class_weight="balanced", random_state=random_state
+            ),
+            HIST_PARAM_GRID,
+        )
+    elif engine == "rf":
+        step, model, grid = (
+            "rf",
+            RandomForestClassifier(random_state=random_state, class_weight="balanced"),
+            PARAM_GRID,
+        )
+    else:
+        raise ValueError(f"unknown engine: {engine!r} (expected 'hist' or 'rf')")
+    return Pipeline([("binner", QuantileBinner(max_bins)), (step, model)]), grid
+
+
+def run_grouped_binned_search(
+    df,
+    feature_cols,
+    group_col="participantId",
+    n_jobs=1,
+    random_state=2025,
+    fold_plan=None,
+    engine="hist",
+    max_bins=MAX_BINS,
+):
+    """Grid search on uint8 quantile bins computed once per fold (binned_search.py).
+
+    Parameters
+    - df / feature_cols / group_col / n_jobs / random_state / fold_plan -- as
+      for `run_grouped_grid_search` (`n_jobs` parallelises over folds)
+    - engine: str -- "hist" (HistGradientBoosting over HIST_PARAM_GRID) or
+      "rf" (RandomForest over PARAM_GRID) fitted on the bin codes
+    - max_bins: int -- bins per feature (<= 255)
+
+    Returns
+    - fitted BinnedFoldSearch (`best_estimator_` starts with the binner)
+    """
+    X = df[feature_cols].values
+    y = df["High_Load"].values
+    plan = resolve_fold_plan(fold_plan, df[group_col].values)
+    pipe, grid = binned_engine(engine, random_state, max_bins)
+    return BinnedFoldSearch(pipe, grid, n_jobs).fit(X, y, plan)
+
+
+def search_report(search, wall_time_s):
+    """Best params, best score, number of model fits and wall time of a search."""
+    n_fits = getattr(search, "n_fits_", None)
+    if n_fits is None:
+        n_candidates = getattr(search, "n_candidates_", None)
+        n_candidates = (
+            sum(n_candidates) if n_candidates else len(search.cv_results_["params"])
+        )
+        n_fits = n_candidates * search.n_splits_
+    return {
+        "best_params": search.best_params_,
+        "best_score": float(search.best_score_),
+        "n_fits": int(n_fits),
+        "wall_time_s": round(wall_time_s, 3),
+    }
+
+
+SEARCH_MODES = {
+    "grid": run_grouped_grid_search,
+    "halving": run_grouped_halving_search,
+    "warm_start": run_grouped_warm_start_search,
+    "binned": run_grouped_binned_search,
+}
+# modes fitting the full pipeline per candidate (the others preprocess once per fold)
+CACHED_MODES = ("grid", "halving")
 
 
 def main():
@@ -87,21 +292,56 @@ def main():
     )
     parser.add_argument("--out", type=str, default="../../models/rf_grid_search.joblib")
     parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument(
+        "--mode",
+        choices=sorted(SEARCH_MODES),
+        default="grid",
+        help="Exhaustive grid, successive halving, grid with warm-started forests, "
+        "or binned features shared across candidates",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["hist", "rf"],
+        default="hist",
+        help="Model fitted on the bin codes in --mode binned",
+    )
+    parser.add_argument("--max-bins", type=int, default=MAX_BINS)
+    parser.add_argument(
+        "--preprocess-cache",
+        type=str,
+        default="memory",
+        help="Imputer/scaler fit cache for grid and halving: none, memory or a directory",
+    )
     args = parser.parse_args()
 
-    df = pd.read_csv(os.path.abspath(args.csv))
-    drop_cols = {"participantId", "task_id", "tlx", "High_Load"}
-    feature_cols = [c for c in df.columns if c not in drop_cols]
+    df = load_modeling_csv(os.path.abspath(args.csv))
+    feature_cols = modeling_feature_cols(df)
 
-    grid = run_grouped_grid_search(df, feature_cols, n_jobs=args.n_jobs)
+    plan = FoldPlan.for_csv(os.path.abspath(args.csv), df)
+    t0 = time.perf_counter()
+    kwargs = {}
+    if args.mode == "binned":
+        kwargs = {"engine": args.engine, "max_bins": args.max_bins}
+    elif args.mode in CACHED_MODES:
+        kwargs = {"memory": preprocess_memory(args.preprocess_cache, args.n_jobs)}
+    grid = SEARCH_MODES[args.mode](
+        df, feature_cols, n_jobs=args.n_jobs, fold_plan=plan, **kwargs
+    )
+    report = search_report(grid, time.perf_counter() - t0)
+    print(
+        f"{args.mode} search: {report['n_fits']} fits in {report['wall_time_s']:.1f}s"
+    )
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
     dump(grid, os.path.abspath(args.out))
-    print("Saved GridSearchCV object to", args.out)
+    print("Saved search object to", args.out)
     # Save best params
     best = grid.best_params_
-    with open(os.path.join(os.path.dirname(args.out), "rf_best_params.json"), "w") as f:
+    # rf_best_params.json, or hgb_best_params.json for the histogram engine
+    # (the saved model's own params go to <model>_params.json, see train)
+    params_name = f"{next(iter(best)).split('__')[0]}_best_params.json"
+    with open(os.path.join(os.path.dirname(args.out), params_name), "w") as f:
         json.dump(best, f, indent=2)
-    print("Best params saved to rf_best_params.json")
+    print("Best params saved to", params_name)
     print("Best score (CV f1):", grid.best_score_)
 
 
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+model_artifact.py
+
+Memory-mapped model artifact for the fitted random forest (bare or behind
+the imputer/scaler pipeline).
+
+`joblib.load` rebuilds every tree from the pickle: each process parses and
+copies all node arrays into fresh Tree objects, so startup grows with the
+forest and every worker holds a private copy. An artifact is a directory
+of uncompressed `.npy` files that are opened with `mmap_mode="r"`:
+
+  <name>.artifact/manifest.json       format, sklearn version, shapes, classes
+  <name>.artifact/shell.joblib        the model with its trees detached (small)
+  <name>.artifact/nodes.npy           all trees' nodes (sklearn NODE_DTYPE)
+  <name>.artifact/values.npy          all trees' node values
+  <name>.artifact/tree_offsets.npy    first node of each tree (+ total)
+  <name>.artifact/compiled/*.npy      CompiledForest arrays (compiled_forest.py)
+
+Nothing is read until it is needed: `ModelArtifact.open` parses only the
+manifest, scoring touches only the compiled arrays, `feature_importances_`
+only the node arrays, and `estimator()` (sklearn model, e.g. for SHAP)
+loads the shell and reattaches the trees. Read-only mapped pages live in
+the page cache, so worker processes on one machine share them.
+
+Usage:
+    python model_artifact.py --model ../../models/tuned_random_forest_model.joblib
+    python model_artifact.py --model ../../models/tuned_random_forest_model.joblib --benchmark --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import sklearn
+from compiled_forest import CompiledForest, _split_pipeline
+from sklearn.tree._tree import NODE_DTYPE, Tree
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import ensure_dir  # noqa: E402
+
+ARTIFACT_VERSION = 1
+ARTIFACT_SUFFIX = ".artifact"
+MANIFEST = "manifest.json"
+
+
+def _node_layout():
+    # NODE_DTYPE as it reads back from the JSON manifest
+    return json.loads(json.dumps(np.lib.format.dtype_to_descr(NODE_DTYPE)))
+
+
+def default_artifact_path(model_path: str) -> str:
+    """`<model>.artifact` next to a `<model>.joblib` file."""
+    return os.path.splitext(model_path)[0] + ARTIFACT_SUFFIX
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+# ------------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------------
+
+
+def save_artifact(model, path: str) -> str:
+    """Write a fitted forest / forest pipeline as an artifact directory.
+
+    The directory is built next to `path` and moved into place, replacing a
+    previous artifact; readers never see a half-written one.
+    """
+    _, _, forest = _split_pipeline(model)
+    if not hasattr(forest, "estimators_") or forest.n_outputs_ != 1:
+        raise ValueError(f"cannot export {type(forest).__name__} as an artifact")
+    compiled = CompiledForest.from_model(model)
+
+    path = os.path.abspath(path)
+    tmp = ensure_dir(path + ".tmp")
+    trees = [est.tree_ for est in forest.estimators_]
+    states = [t.__getstate__() for t in trees]
+    counts = np.array([s["node_count"] for s in states], dtype=np.int64)
+    arrays = {
+        "nodes": np.concatenate([s["nodes"] for s in states]),
+        "values": np.concatenate([s["values"] for s in states]),
+        "tree_offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        "tree_max_depth": np.array([s["max_depth"] for s in states], np.int64),
+    }
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr)
+    ensure_dir(os.path.join(tmp, "compiled"))
+    for name in CompiledForest.ARRAYS:
+        np.save(os.path.join(tmp, "compiled", f"{name}.npy"), getattr(compiled, name))
+
+    # the shell keeps every parameter and fitted attribute except the trees
+    for est in forest.estimators_:
+        del est.tree_
+    try:
+        joblib.dump(model, os.path.join(tmp, "shell.joblib"))
+    finally:
+        for est, tree in zip(forest.estimators_, trees):
+            est.tree_ = tree
+
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "sklearn_version": sklearn.__version__,
+        "model_class": type(model).__name__,
+        "forest_class": type(forest).__name__,
+        "n_trees": len(trees),
+        "n_nodes": int(counts.sum()),
+        "n_features_in": int(compiled.n_features_in_),
+        "forest_n_features_in": int(forest.n_features_in_),
+        "n_classes": int(forest.n_classes_),
+        "classes": forest.classes_.tolist(),
+        "node_dtype": _node_layout(),
+        "compiled": compiled.meta,
+    }
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return path
+
+
+# ------------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------------
+
+
+class ModelArtifact:
+    """Lazily resolved, memory-mapped view of an artifact directory.
+
+    Parameters
+    - path: str -- artifact directory
+    - mmap_mode: str or None -- passed to np.load ("r" shares pages; None
+      reads private copies)
+    """
+
+    def __init__(self, path: str, mmap_mode: Optional[str] = "r"):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != ARTIFACT_VERSION:
+            raise ValueError(
+                f"{path}: artifact version {self.manifest.get('version')}, "
+                f"expected {ARTIFACT_VERSION}; re-export it"
+            )
+        self.classes_ = np.asarray(self.manifest["classes"])
+        self.n_features_in_ = int(self.manifest["n_features_in"])
+        self._arrays = {}
+        self._compiled = None
+        self._estimator = None
+
+    @classmethod
+    def open(cls, path: str, mmap_mode: Optional[str] = "r") -> "ModelArtifact":
+        return cls(path, mmap_mode)
+
+    def array(self, name: str) -> np.ndarray:
+        """One stored array (e.g. "nodes", "compiled/threshold"), mapped on first use."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(
+                os.path.join(self.path, f"{name}.npy"),
+                mmap_mode=self.mmap_mode,
+                allow_pickle=False,
+            )
+        return self._arrays[name]
+
+    @property
+    def compiled(self) -> CompiledForest:
+        """Evaluator over the mapped compiled arrays (no trees are built)."""
+        if self._compiled is None:
+            arrays = {n: self.array(f"compiled/{n}") for n in CompiledForest.ARRAYS}
+            self._compiled = CompiledForest(arrays, self.manifest["compiled"])
+        return self._compiled
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.compiled.predict_proba(X)
+
+    def predict(self, X) -> np.ndarray:
+        return self.compiled.predict(X)
+
+    def _tree_slices(self):
+        offsets = self.array("tree_offsets")
+        return [slice(int(a), int(b)) for a, b in zip(offsets[:-1], offsets[1:])]
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        """Impurity importances of the forest, computed from the mapped nodes
+        exactly as `forest.feature_importances_` is."""
+        nodes = self.array("nodes")
+        n_features = int(self.manifest["forest_n_features_in"])
+        per_tree = []
+        for sl in self._tree_slices():
+            t = nodes[sl]
+            if len(t) <= 1:
+                continue  # sklearn skips single-leaf trees
+            left, right = t["left_child"], t["right_child"]
+            internal = np.flatnonzero(left != -1)
+            w, imp = t["weighted_n_node_samples"], t["impurity"]
+            l, r = left[internal], right[internal]
+            gain = (
+                w[internal] * imp[internal] - w[l] * imp[l] - w[r] * imp[r]
+            )  # same node order as the Cython accumulation
+            tree_imp = np.zeros(n_features)
+            np.add.at(tree_imp, t["feature"][internal], gain)
+            tree_imp /= w[0]
+            total = np.sum(tree_imp)
+            if total > 0.0:
+                tree_imp /= total
+            per_tree.append(tree_imp)
+        if not per_tree:
+            return np.zeros(n_features)
+        importances = np.mean(per_tree, axis=0, dtype=np.float64)
+        return importances / np.sum(importances)
+
+    def estimator(self):
+        """The sklearn model: the shell with its trees rebuilt from the mapped arrays."""
+        if self._estimator is not None:
+            return self._estimator
+        if self.manifest["node_dtype"] != _node_layout():
+            raise ValueError(
+                f"{self.path} was written with scikit-learn "
+                f"{self.manifest['sklearn_version']} (different tree layout); re-export it"
+            )
+        model = joblib.load(os.path.join(self.path, "shell.joblib"))
+        _, _, forest = _split_pipeline(model)
+        nodes, values = self.array("nodes"), self.array("values")
+        depths = self.array("tree_max_depth")
+        n_classes = np.atleast_1d(np.asarray(forest.n_classes_, dtype=np.intp))
+        for est, sl, depth in zip(forest.estimators_, self._tree_slices(), depths):
+            tree = Tree(est.n_features_in_, n_classes, est.n_outputs_)
+            tree.__setstate__(
+                {
+                    "max_depth": int(depth),
+                    "node_count": sl.stop - sl.start,
+                    "nodes": np.ascontiguousarray(nodes[sl]),
+                    "values": np.ascontiguousarray(values[sl]),
+                }
+            )
+            est.tree_ = tree
+        self._estimator = model
+        return model
+
+
+def load_model(path: str, mmap_mode: Optional[str] = "r"):
+    """A ModelArtifact for an artifact directory, else the joblib model at `path`."""
+    if is_artifact(path):
+        return ModelArtifact(path, mmap_mode)
+    return joblib.load(path)
+
+
+# ------------------------------------------------------------------
+# Startup benchmark
+# ------------------------------------------------------------------
+
+
+def _memory_kb() -> Dict[str, int]:
+    """Rss / Pss / Private_* of this process (Linux smaps_rollup; {} elsewhere)."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    out = {}
+    for line in lines[1:]:
+        key, _, rest = line.partition(":")
+        if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+            out[key] = int(rest.split()[0])
+    return out
+
+
+def _startup(fmt: str, path: str, X: np.ndarray):
+    """Load the model in one format and score the rows; (seconds, model)."""
+    t0 = time.perf_counter()
+    if fmt == "joblib":
+        model = joblib.load(path)
+    else:
+        model = ModelArtifact(path, mmap_mode="r" if fmt == "artifact" else None)
+    model.predict_proba(X)
+    return time.perf_counter() - t0, model
+
+
+def _worker(fmt, path, X, barrier, results):
+    before = _memory_kb()
+    seconds, model = _startup(fmt, path, X)
+    barrier.wait()  # every worker holds its model while memory is read
+    after = _memory_kb()
+    results.put(
+        (seconds, {k: after[k] - before.get(k, 0) for k in after}),
+    )
+    barrier.wait()
+
+
+def benchmark_startup(
+    joblib_path: str,
+    artifact_path: str,
+    X: np.ndarray,
+    repeats: int = 5,
+    workers: int = 4,
+) -> List[Dict[str, Any]]:
+    """Startup (load + first predict_proba) of the joblib model and the
+    artifact (mapped and fully read), in-process and in `workers` concurrent
+    fresh processes; memory columns are per-worker kB added by the load.
+    Worker times include the imports each format needs (sklearn.ensemble
+    for joblib)."""
+    formats = {
+        "joblib": joblib_path,
+        "artifact": artifact_path,
+        "artifact_nommap": artifact_path,
+    }
+    ctx = mp.get_context("spawn")  # no inherited model pages
+    rows = []
+    for fmt, path in formats.items():
+        times = [_startup(fmt, path, X)[0] for _ in range(repeats)]
+        row = {"format": fmt, "in_process_ms": float(np.median(times)) * 1e3}
+        barrier, results = ctx.Barrier(workers), ctx.Queue()
+        procs = [
+            ctx.Process(target=_worker, args=(fmt, path, X, barrier, results))
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        got = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        row["worker_ms"] = float(np.median([g[0] for g in got])) * 1e3
+        for key in got[0][1]:
+            row[f"{key}_kb"] = float(np.mean([g[1][key] for g in got]))
+        rows.append(row)
+    return rows
+
+
+def main():
+    """CLI: export a joblib model as an artifact, verify it and benchmark startup."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model", type=str, default="../../models/tuned_random_forest_model.joblib"
+    )
+    parser.add_argument(
+        "--out", type=str, default=None, help="Artifact dir (default: <model>.artifact)"
+    )
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    out = save_artifact(model, args.out or default_artifact_path(args.model))
+    artifact = ModelArtifact(out)
+    print(
+        f"Saved {artifact.manifest['n_trees']} trees, "
+        f"{artifact.manifest['n_nodes']} nodes to {out}"
+    )
+
+    _, _, forest = _split_pipeline(model)
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(256, artifact.n_features_in_))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    rebuilt = artifact.estimator()
+    checks = {
+        "predict_proba": np.array_equal(
+            artifact.predict_proba(X), model.predict_proba(X)
+        ),
+        "estimator().predict_proba": np.array_equal(
+            rebuilt.predict_proba(X), model.predict_proba(X)
+        ),
+        "feature_importances_": np.array_equal(
+            artifact.feature_importances_, forest.feature_importances_
+        ),
+    }
+    for name, ok in checks.items():
+        print(f"{name} identical: {bool(ok)}")
+
+    if args.benchmark:
+        del model, forest, rebuilt, artifact
+        rows = benchmark_startup(args.model, out, X[:1], args.repeats, args.workers)
+        for row in rows:
+            print(
+                "  ".join(
+                    f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}"
+                    for k, v in row.items()
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
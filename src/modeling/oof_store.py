@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+oof_store.py
+
+Out-of-fold (OOF) prediction stage with a persisted, keyed store.
+
+Every configured model is refitted once per LOUO fold (see
+`evaluate_model.evaluate_louo_refit`) and its per-row out-of-fold positive
+probabilities are saved under a key made of
+
+  - a config hash: the model name plus the unfitted estimator's parameters, and
+  - a dataset hash: feature names, feature matrix, labels and participants.
+
+Later stages (threshold tuning, calibration, the dataset-with-OOF CSV) read
+the stored probabilities instead of rerunning the LOUO loop; an entry is
+recomputed only when the model configuration or the data changes.
+
+Store layout:
+
+  <store>/index.json              key -> model, hashes, file, LOUO summary
+  <store>/<model>-<cfg>-<data>.npz  fold, pred, proba (dataset row order)
+
+Usage:
+    python oof_store.py --csv ../../data/processed/modeling_dataset.csv --out ../../results/modeling_dataset_with_oof_probs.csv
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from evaluate_model import _new_estimator, evaluate_louo_refit
+from fold_plan import FoldPlan, resolve_fold_plan
+from preprocess_cache import preprocess_memory
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from train_louo_random_forest import DEFAULT_PARAMS, build_pipeline_from_params
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import (  # noqa: E402
+    ensure_dir,
+    load_modeling_csv,
+    modeling_feature_cols,
+    read_json,
+    save_df,
+)
+
+OOF_STORE_VERSION = 1
+# OOF column of the primary model in the dataset-with-OOF CSV
+PRIMARY_MODEL = "random_forest"
+PRIMARY_COLUMN = "pred_proba_highload"
+
+
+def _logreg_baseline(memory=None):
+    # the logistic baseline of baselines.py, behind the RF pipeline's
+    # preprocessing so rows with missing features are scored too (with a
+    # shared `memory` it reuses the RF's imputer/scaler fits)
+    return Pipeline(
+        [
+            ("imputer", SimpleImputer(strategy="median")),
+            ("scaler", StandardScaler()),
+            (
+                "lr",
+                LogisticRegression(
+                    max_iter=2000, class_weight="balanced", solver="liblinear"
+                ),
+            ),
+        ],
+        memory=memory,
+    )
+
+
+def configured_models(
+    rf_params: Optional[Dict[str, Any]] = None, memory=None
+) -> Dict[str, Callable]:
+    """Model name -> factory returning an unfitted estimator.
+
+    `memory` (see preprocess_cache.py) is shared by all models, so their
+    identical imputer/scaler fits per fold are computed once.
+    """
+    return {
+        PRIMARY_MODEL: partial(
+            build_pipeline_from_params, rf_params or DEFAULT_PARAMS, memory=memory
+        ),
+        "logreg": partial(_logreg_baseline, memory),
+    }
+
+
+# ------------------------------------------------------------------
+# Keys
+# ------------------------------------------------------------------
+
+
+def _params_for_hash(estimator) -> Dict[str, Any]:
+    """Flat parameters of an (unfitted) estimator, nested estimators by class name."""
+    params = {"__class__": type(estimator).__name__}
+    for k, v in estimator.get_params(deep=True).items():
+        if k == "memory":
+            continue  # a cache, not part of the model
+        if k == "steps":
+            v = [name for name, _ in v]
+        elif hasattr(v, "get_params"):
+            v = type(v).__name__
+        params[k] = v
+    return params
+
+
+def config_hash(name: str, estimator) -> str:
+    """sha1 of the model name and the canonical JSON parameters of `estimator`
+    (a factory or an estimator, as accepted by `evaluate_louo_refit`)."""
+    estimator = _new_estimator(estimator)
+    blob = json.dumps(
+        {"model": name, "params": _params_for_hash(estimator)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def dataset_hash(
+    df: pd.DataFrame,
+    feature_cols: List[str],
+    group_col: str = "participantId",
+    target_col: str = "High_Load",
+) -> str:
+    """sha1 of feature names, float64 feature matrix, labels and participant column."""
+    h = hashlib.sha1()
+    h.update(json.dumps(list(feature_cols)).encode("utf-8"))
+    X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float64))
+    h.update(str(X.shape).encode("utf-8"))
+    h.update(X.tobytes())
+    h.update(np.ascontiguousarray(df[target_col].to_numpy(dtype=np.int64)).tobytes())
+    h.update(FoldPlan.from_groups(df[group_col].values).digest.encode("utf-8"))
+    return h.hexdigest()
+
+
+# ------------------------------------------------------------------
+# Store
+# ------------------------------------------------------------------
+
+
+class OOFStore:
+    """Directory of OOF prediction arrays indexed by (config hash, dataset hash)."""
+
+    def __init__(self, root: str):
+        self.root = ensure_dir(root)
+        self.index_path = os.path.join(self.root, "index.json")
+        self.index = self._read_index()
+
+    def _read_index(self) -> Dict[str, Any]:
+        if os.path.exists(self.index_path):
+            try:
+                index = read_json(self.index_path)
+                if index.get("version") == OOF_STORE_VERSION:
+                    return index
+            except (OSError, ValueError):
+                pass
+            print(f"Warning: ignoring unreadable OOF index {self.index_path}")
+        return {"version": OOF_STORE_VERSION, "entries": {}}
+
+    def _write_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    @staticmethod
+    def key(cfg_hash: str, data_hash: str) -> str:
+        return f"{cfg_hash}:{data_hash}"
+
+    def get(self, cfg_hash: str, data_hash: str) -> Optional[Dict[str, np.ndarray]]:
+        """Stored arrays (fold, pred, proba) for the key, or None if missing."""
+        entry = self.index["entries"].get(self.key(cfg_hash, data_hash))
+        if entry is None:
+            return None
+        path = os.path.join(self.root, entry["file"])
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as z:
+            return {k: z[k] for k in ("fold", "pred", "proba")}
+
+    def put(
+        self,
+        name: str,
+        cfg_hash: str,
+        data_hash: str,
+        oof_df: pd.DataFrame,
+        summary: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Save the OOF columns of `evaluate_louo_refit` output under the key."""
+        fname = f"{name}-{cfg_hash[:12]}-{data_hash[:12]}.npz"
+        path = os.path.join(self.root, fname)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            fold=oof_df["fold"].to_numpy(dtype=np.int32),
+            pred=oof_df["pred"].to_numpy(dtype=np.int8),
+            proba=oof_df["proba"].to_numpy(dtype=np.float64),
+        )
+        os.replace(tmp, path)
+        self.index["entries"][self.key(cfg_hash, data_hash)] = {
+            "model": name,
+            "config_hash": cfg_hash,
+            "dataset_hash": data_hash,
+            "file": fname,
+            "n_rows": int(len(oof_df)),
+            "summary": {k: float(v) for k, v in (summary or {}).items()},
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        self._write_index()
+        return path
+
+
+def oof_probabilities(
+    store: OOFStore,
+    name: str,
+    estimator,
+    df: pd.DataFrame,
+    feature_cols: List[str],
+    group_col: str = "participantId",
+    target_col: str = "High_Load",
+    n_jobs: int = 1,
+    fold_plan: Optional[FoldPlan] = None,
+    data_hash: Optional[str] = None,
+    refresh: bool = False,
+) -> np.ndarray:
+    """Out-of-fold positive probabilities of one model, from the store or computed.
+
+    Parameters
+    - store: OOFStore
+    - name: str -- model name (part of the config hash)
+    - estimator: callable or estimator -- as for `evaluate_louo_refit`
+    - df / feature_cols / group_col / target_col -- modeling dataset
+    - n_jobs: int -- parallel fold workers when the entry has to be computed
+    - fold_plan: FoldPlan or None -- precomputed folds
+    - data_hash: str or None -- `dataset_hash(df, ...)`, computed if omitted
+    - refresh: bool -- recompute even if the store has the entry
+
+    Returns
+    - np.ndarray: one probability per row of `df`, in dataset order
+    """
+    cfg = config_hash(name, estimator)
+    data = data_hash or dataset_hash(df, feature_cols, group_col, target_col)
+    cached = None if refresh else store.get(cfg, data)
+    if cached is not None:
+        print(f"{name}: OOF reused from store ({cfg[:12]}/{data[:12]})")
+        return cached["proba"]
+
+    plan = resolve_fold_plan(fold_plan, df[group_col].values)
+    _, summary, _, oof = evaluate_louo_refit(
+        estimator, df, feature_cols, group_col, target_col, n_jobs, fold_plan=plan
+    )
+    store.put(name, cfg, data, oof, summary)
+    print(f"{name}: OOF computed over {plan.n_folds} folds and stored")
+    return oof["proba"].to_numpy()
+
+
+def oof_column(name: str) -> str:
+    return PRIMARY_COLUMN if name == PRIMARY_MODEL else f"pred_proba_{name}"
+
+
+def main():
+    """CLI: fill the OOF store for every configured model and write the dataset with OOF probabilities."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--csv", type=str, default="../../data/processed/modeling_dataset.csv"
+    )
+    parser.add_argument("--store", type=str, default="../../results/oof_store")
+    parser.add_argument(
+        "--out",
+        type=str,
+        default="../../results/modeling_dataset_with_oof_probs.csv",
+    )
+    parser.add_argument(
+        "--rf-params",
+        type=str,
+        default="../../models/tuned_random_forest_model_params.json",
+        help="Params of the saved RF model, written next to it by "
+        "train_louo_random_forest.py (DEFAULT_PARAMS if the file does not exist)",
+    )
+    parser.add_argument(
+        "--models", nargs="+", default=None, help="Subset of configured models"
+    )
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument(
+        "--preprocess-cache",
+        type=str,
+        default="memory",
+        help="Imputer/scaler fit cache shared by the models: none, memory or a directory",
+    )
+    parser.add_argument(
+        "--refresh", action="store_true", help="Recompute even if stored"
+    )
+    args = parser.parse_args()
+
+    csv_path = os.path.abspath(args.csv)
+    df = load_modeling_csv(csv_path)
+    feature_cols = modeling_feature_cols(df)
+    plan = FoldPlan.for_csv(csv_path, df)
+
+    rf_params = None
+    if os.path.exists(args.rf_params):
+        rf_params = read_json(args.rf_params)
+    models = configured_models(
+        rf_params, preprocess_memory(args.preprocess_cache, args.n_jobs)
+    )
+    names = args.models or list(models)
+    unknown = [n for n in names if n not in models]
+    if unknown:
+        raise ValueError(f"unknown models: {unknown} (configured: {list(models)})")
+
+    store = OOFStore(args.store)
+    data = dataset_hash(df, feature_cols)
+    out = df.copy()
+    for name in names:
+        out[oof_column(name)] = oof_probabilities(
+            store,
+            name,
+            models[name],
+            df,
+            feature_cols,
+            n_jobs=args.n_jobs,
+            fold_plan=plan,
+            data_hash=data,
+            refresh=args.refresh,
+        )
+    save_df(out, os.path.abspath(args.out))
+    print("Saved dataset with OOF probabilities to", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+preprocess_cache.py
+
+Fold-keyed memoization of the imputer / scaler steps of the modeling
+pipelines.
+
+`SimpleImputer(median)` and `StandardScaler` depend only on the training
+rows of a fold, yet the grid search refits them for every candidate and
+the LOUO refit, the OOF stage and the logistic baseline fit them again.
+scikit-learn pipelines accept a joblib.Memory-like `memory` and then look
+every non-final step up by (transformer parameters, input rows) before
+fitting it. This module provides the in-memory variant:
+
+  - `LRUMemory`: process-local cache with least-recently-used eviction
+    within a byte budget (DEFAULT_MAX_BYTES; each entry is roughly one
+    fold's training matrix). It survives `clone` (GridSearchCV,
+    evaluate_louo_refit), so all candidates and refits in one process share
+    it; pickled copies (process pool workers) start empty.
+  - `preprocess_memory(spec)`: "none", "memory" (LRUMemory) or a directory
+    (on-disk joblib.Memory, shared across workers and runs).
+
+Usage:
+    python preprocess_cache.py --csv ../../data/processed/modeling_dataset.csv
+"""
+
+import argparse
+import inspect
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
+
+# Default byte budget of the in-memory cache
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+
+def _nbytes(obj, depth: int = 0) -> int:
+    """Approximate array memory held by a cached result (arrays, containers,
+    fitted transformers' attributes); other objects count as 0."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(o, depth) for o in obj)
+    if isinstance(obj, dict):
+        return sum(_nbytes(o, depth) for o in obj.values())
+    if hasattr(obj, "memory_usage"):  # pandas
+        return int(np.sum(obj.memory_usage(index=True)))
+    if hasattr(obj, "__dict__") and depth < 3:
+        return sum(_nbytes(o, depth + 1) for o in vars(obj).values())
+    return 0
+
+
+class LRUMemory:
+    """joblib.Memory-compatible in-memory cache with LRU eviction.
+
+    Parameters
+    - maxsize: int -- cached results kept (one per fold and pipeline step)
+    - max_bytes: int -- memory budget of the cached results
+
+    Memory cost: one entry per (fold, preprocessing step) holds that step's
+    output on the fold's training rows (about n_train x n_features x 8 bytes,
+    i.e. nearly the whole float64 feature matrix) plus the small fitted
+    transformer. The imputer -> scaler pipelines over LOUO folds therefore
+    need about 2 x n_folds x (feature matrix size); least recently used
+    entries are evicted beyond `max_bytes`, and a single result larger than
+    the budget is returned without being cached.
+    """
+
+    def __init__(self, maxsize: int = 256, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._store = OrderedDict()  # key -> (result, nbytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def cache(self, func, ignore=()):
+        """Wrap `func` so calls with equal (hashed) arguments are computed once."""
+        signature = inspect.signature(func)
+        ignore = frozenset(ignore)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def cached(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            key = joblib.hash(
+                (
+                    name,
+                    {k: v for k, v in bound.arguments.items() if k not in ignore},
+                )
+            )
+            if key in self._store:
+                self.hits += 1
+                self._store.move_to_end(key)
+                return self._store[key][0]
+            self.misses += 1
+            result = func(*args, **kwargs)
+            self._put(key, result)
+            return result
+
+        return cached
+
+    def _put(self, key, result):
+        size = _nbytes(result)
+        if size > self.max_bytes:
+            return
+        self._store[key] = (result, size)
+        self.nbytes += size
+        while len(self._store) > self.maxsize or self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._store.popitem(last=False)
+            self.nbytes -= evicted
+
+    def clear(self):
+        self._store.clear()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    # clone() deep-copies parameters: keep one shared cache per process
+    def __deepcopy__(self, memo):
+        return self
+
+    # process pool workers get an empty cache with the same limits
+    def __getstate__(self):
+        return {"maxsize": self.maxsize, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["maxsize"], state.get("max_bytes", DEFAULT_MAX_BYTES))
+
+    def __repr__(self) -> str:
+        return (
+            f"LRUMemory(maxsize={self.maxsize}, entries={len(self)}, "
+            f"nbytes={self.nbytes}/{self.max_bytes}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
+
+
+def preprocess_memory(
+    spec="memory",
+    n_jobs: int = 1,
+    maxsize: int = 256,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+):
+    """Pipeline `memory` for a CLI spec: "none", "memory" or a cache directory.
+
+    An in-memory cache is per process, so with `n_jobs` != 1 only work done
+    inside one worker is shared; pass a directory to share across workers.
+    The in-memory cache holds at most `max_bytes` of fold matrices (see
+    LRUMemory for the per-entry cost).
+    """
+    if spec is None or spec == "none":
+        return None
+    if spec == "memory":
+        if n_jobs != 1:
+            print(
+                "Warning: in-memory preprocessing cache is per process; "
+                "pass a directory to share it across parallel workers"
+            )
+        return LRUMemory(maxsize, max_bytes)
+    return joblib.Memory(location=spec, verbose=0)
+
+
+def main():
+    """CLI: time LOUO refits of the default RF pipeline with and without the cache."""
+    from evaluate_model import evaluate_louo_refit
+    from fold_plan import FoldPlan
+    from train_louo_random_forest import DEFAULT_PARAMS, build_pipeline_from_params
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--csv", type=str, default="../../data/processed/modeling_dataset.csv"
+    )
+    parser.add_argument("--n-estimators", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    csv_path = os.path.abspath(args.csv)
+    df = load_modeling_csv(csv_path)
+    feature_cols = modeling_feature_cols(df)
+    plan = FoldPlan.for_csv(csv_path, df)
+    params = dict(DEFAULT_PARAMS, rf__n_estimators=args.n_estimators)
+
+    for label, memory in (("no cache", None), ("LRU cache", LRUMemory())):
+        t0 = time.perf_counter()
+        for _ in range(args.repeats):
+            evaluate_louo_refit(
+                lambda: build_pipeline_from_params(params, memory=memory),
+                df,
+                feature_cols,
+                fold_plan=plan,
+            )
+        print(f"{label:>9s}: {time.perf_counter() - t0:.2f}s", memory or "")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+scoring_service.py
+
+Long-running local scoring service for the tuned random forest.
+
+The model is loaded once at startup (and compiled to node arrays, see
+compiled_forest.py, unless `--engine sklearn`); `--model` may also be a
+memory-mapped artifact directory (model_artifact.py). Requests are HTTP/JSON over
+TCP on localhost or over a Unix socket; nothing leaves the machine.
+
+  POST /score   {"features": [[...], ...]}           raw feature vectors, or
+                {"features": [{"name": value}, ...]}  vectors by feature name, or
+                {"sessions": [{raw session}, ...]}    raw session JSON objects
+                -> {"proba": [...], "pred": [...], "n_rows": n}
+  GET  /stats   throughput / latency / batching counters
+  GET  /health  model summary
+
+Concurrent requests are not scored one by one: a `MicroBatcher` thread
+collects them for at most `--max-wait-ms` after the first one arrives (or
+until `--max-batch` rows), scores the stacked rows in one call and hands
+each request its slice. Missing features (null, absent names, features a
+raw session does not define) are NaN and handled as the model handles them.
+
+Raw sessions go through `compute_features_from_raw` (data_preparation);
+feature names come from `models/model_metadata.json` when it matches the
+model, otherwise REQUIRED_FEATURES.
+
+Usage:
+    python scoring_service.py --port 8765
+    python scoring_service.py --unix-socket /tmp/highload.sock --max-wait-ms 2
+    python scoring_service.py --self-test --csv ../../data/processed/modeling_dataset.csv --clients 16
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from compiled_forest import CompiledForest
+from model_artifact import ModelArtifact, load_model
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols, read_json  # noqa: E402
+
+DATA_PREP_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data_preparation"
+)
+
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_MAX_BATCH = 256
+LATENCY_WINDOW = 10000
+
+
+# ------------------------------------------------------------------
+# Micro-batching
+# ------------------------------------------------------------------
+
+
+class _Pending:
+    __slots__ = ("X", "future", "t0")
+
+    def __init__(self, X: np.ndarray):
+        self.X = X
+        self.future = Future()
+        self.t0 = time.perf_counter()
+
+
+class MicroBatcher:
+    """Group concurrent scoring calls into batches on one worker thread.
+
+    Parameters
+    - score_fn: callable -- (n, n_features) float64 -> (n, n_classes) probabilities
+    - max_wait_ms: float -- longest a request waits for others to join its batch
+    - max_batch: int -- rows that close a batch early
+    - latency_window: int -- recent requests kept for the latency percentiles
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[np.ndarray], np.ndarray],
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        latency_window: int = LATENCY_WINDOW,
+    ):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1e3
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latency = deque(maxlen=latency_window)
+        self._thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.started_at = time.perf_counter()
+            self.requests = 0
+            self.rows = 0
+            self.batches = 0
+            self.errors = 0
+            self.max_batch_rows = 0
+            self.compute_s = 0.0
+            self._latency.clear()
+
+    def start(self) -> "MicroBatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="micro-batcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, X: np.ndarray) -> Future:
+        """Queue rows for scoring; the future resolves to their probabilities."""
+        if self._thread is None:
+            raise RuntimeError("MicroBatcher is not running; call start()")
+        item = _Pending(X)
+        self._queue.put(item)
+        return item.future
+
+    def score(self, X: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(X).result(timeout)
+
+    def _collect(self, first: _Pending) -> List[Optional[_Pending]]:
+        batch = [first]
+        rows = len(first.X)
+        deadline = first.t0 + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is None:
+                break
+            rows += len(item.X)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            self._score_batch(batch)
+            if stopping:
+                return
+
+    def _score_batch(self, batch: List[_Pending]):
+        t0 = time.perf_counter()
+        try:
+            proba = self.score_fn(np.concatenate([item.X for item in batch]))
+        except Exception as e:  # reported to every caller of the batch
+            for item in batch:
+                item.future.set_exception(e)
+            with self._lock:
+                self.errors += len(batch)
+            return
+        done = time.perf_counter()
+        start = 0
+        latencies = []
+        for item in batch:
+            n = len(item.X)
+            item.future.set_result(proba[start : start + n])
+            start += n
+            latencies.append(done - item.t0)
+        with self._lock:
+            self.requests += len(batch)
+            self.rows += start
+            self.batches += 1
+            self.max_batch_rows = max(self.max_batch_rows, start)
+            self.compute_s += done - t0
+            self._latency.extend(latencies)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters since start / `reset_stats`; latencies (ms) cover queueing and scoring."""
+        with self._lock:
+            uptime = time.perf_counter() - self.started_at
+            lat = np.asarray(self._latency) * 1e3
+            out = {
+                "uptime_s": uptime,
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "requests_per_s": self.requests / uptime if uptime else 0.0,
+                "rows_per_s": self.rows / uptime if uptime else 0.0,
+                "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+                "max_batch_rows": self.max_batch_rows,
+                "compute_ms_total": self.compute_s * 1e3,
+                "max_wait_ms": self.max_wait * 1e3,
+            }
+        for p in (50, 95, 99):
+            out[f"latency_p{p}_ms"] = float(np.percentile(lat, p)) if len(lat) else 0.0
+        out["latency_max_ms"] = float(lat.max()) if len(lat) else 0.0
+        return out
+
+
+# ------------------------------------------------------------------
+# Scoring
+# ------------------------------------------------------------------
+
+
+def model_feature_names(
+    n_features: int, metadata_path: Optional[str] = None
+) -> List[str]:
+    """Feature names the model was trained on, in column order."""
+    if metadata_path and os.path.exists(metadata_path):
+        names = read_json(metadata_path).get("feature_names") or []
+        if len(names) == n_features:
+            return list(names)
+        print(
+            f"Warning: {metadata_path} lists {len(names)} features, model has "
+            f"{n_features}; ignoring it"
+        )
+    if DATA_PREP_DIR not in sys.path:
+        sys.path.insert(0, DATA_PREP_DIR)
+    from compute_features import REQUIRED_FEATURES
+
+    if len(REQUIRED_FEATURES) == n_features:
+        return list(REQUIRED_FEATURES)
+    return [f"x{i}" for i in range(n_features)]
+
+
+class ScoringService:
+    """The loaded model, its micro-batcher and the request-payload parsing.
+
+    Parameters
+    - model_path: str -- joblib model (bare forest or pipeline) or its
+      memory-mapped artifact directory (model_artifact.py)
+    - engine: str -- "compiled" (CompiledForest, same probabilities) or "sklearn"
+    - metadata_path: str or None -- JSON with "feature_names"
+    - max_wait_ms / max_batch: micro-batching limits (see MicroBatcher)
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        engine: str = "compiled",
+        metadata_path: Optional[str] = None,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        t0 = time.perf_counter()
+        self.model_path = model_path
+        self.model = load_model(model_path)
+        if engine not in ("compiled", "sklearn"):
+            raise ValueError(f"unknown engine {engine!r} (compiled, sklearn)")
+        if isinstance(self.model, ModelArtifact):
+            # workers serving one artifact share its mapped pages
+            self.scorer = (
+                self.model.compiled if engine == "compiled" else self.model.estimator()
+            )
+        elif engine == "compiled":
+            self.scorer = CompiledForest.from_model(self.model)
+        else:
+            self.scorer = self.model
+        self.engine = engine
+        self.classes_ = np.asarray(self.model.classes_)
+        self.n_features = int(self.model.n_features_in_)
+        self.feature_names = model_feature_names(self.n_features, metadata_path)
+        self._feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        self.load_s = time.perf_counter() - t0
+        self.batcher = MicroBatcher(self.scorer.predict_proba, max_wait_ms, max_batch)
+
+    def start(self) -> "ScoringService":
+        self.batcher.start()
+        return self
+
+    def stop(self):
+        self.batcher.stop()
+
+    def rows_from_features(self, features) -> np.ndarray:
+        """(n, n_features) float64 from vectors (lists) or name -> value dicts."""
+        if isinstance(features, dict) or (
+            len(features) and not isinstance(features[0], (list, dict))
+        ):
+            features = [features]  # a single vector
+        X = np.full((len(features), self.n_features), np.nan)
+        for i, row in enumerate(features):
+            if isinstance(row, dict):
+                unknown = [k for k in row if k not in self._feature_index]
+                if unknown:
+                    raise ValueError(f"unknown features: {unknown}")
+                for k, v in row.items():
+                    X[i, self._feature_index[k]] = np.nan if v is None else float(v)
+            else:
+                if len(row) != self.n_features:
+                    raise ValueError(
+                        f"feature vector {i} has {len(row)} values, "
+                        f"model expects {self.n_features}"
+                    )
+                X[i] = np.asarray(row, dtype=np.float64)
+        return X
+
+    def rows_from_sessions(self, sessions) -> np.ndarray:
+        """Engineered-feature rows of raw session objects (see compute_features.py)."""
+        if DATA_PREP_DIR not in sys.path:
+            sys.path.insert(0, DATA_PREP_DIR)
+        from compute_features import compute_features_from_raw
+
+        if isinstance(sessions, dict):
+            sessions = [sessions]
+        rows = []
+        for obj in sessions:
+            feats = compute_features_from_raw(obj)
+            rows.append({k: feats.get(k) for k in self.feature_names})
+        return self.rows_from_features(rows)
+
+    def handle_score(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if "features" in payload:
+            X = self.rows_from_features(payload["features"])
+        elif "sessions" in payload:
+            X = self.rows_from_sessions(payload["sessions"])
+        else:
+            raise ValueError('payload needs "features" or "sessions"')
+        proba = self.batcher.score(X)
+        return {
+            "proba": proba[:, -1].tolist(),
+            "pred": self.classes_.take(np.argmax(proba, axis=1)).tolist(),
+            "n_rows": len(X),
+        }
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "model": self.model_path,
+            "engine": self.engine,
+            "n_features": self.n_features,
+            "feature_names": self.feature_names,
+            "classes": self.classes_.tolist(),
+            "load_s": self.load_s,
+        }
+
+
+# ------------------------------------------------------------------
+# HTTP front end (TCP or Unix socket)
+# ------------------------------------------------------------------
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/stats":
+            self._reply(200, service.batcher.stats())
+        elif self.path == "/health":
+            self._reply(200, service.health())
+        else:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/score":
+            self._reply(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            body = self.server.service.handle_score(payload)
+        except (ValueError, TypeError, KeyError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._reply(200, body)
+
+    def address_string(self) -> str:
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):  # no per-request access log
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(
+    service: ScoringService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_socket: Optional[str] = None,
+):
+    """HTTP server bound to host:port, or to `unix_socket` when given."""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = _UnixHTTPServer(unix_socket, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float = 30.0):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class ScoringClient:
+    """Minimal local client; one keep-alive connection (not thread-safe).
+
+    Parameters
+    - address: str -- "host:port" or the path of a Unix socket
+    """
+
+    def __init__(self, address: str, timeout: float = 30.0):
+        if os.sep in address or not address.rpartition(":")[2].isdigit():
+            self.conn = _UnixHTTPConnection(address, timeout)
+        else:
+            host, _, port = address.rpartition(":")
+            self.conn = http.client.HTTPConnection(host, int(port), timeout=timeout)
+
+    def _request(self, method: str, path: str, payload=None) -> Dict[str, Any]:
+        body = None if payload is None else json.dumps(payload)
+        headers = {"Content-Type": "application/json"} if body else {}
+        self.conn.request(method, path, body=body, headers=headers)
+        resp = self.conn.getresponse()
+        data = json.loads(resp.read())
+        if resp.status != 200:
+            raise RuntimeError(f"{method} {path}: {resp.status} {data.get('error')}")
+        return data
+
+    def score(self, features=None, sessions=None) -> Dict[str, Any]:
+        payload = {"features": features} if sessions is None else {"sessions": sessions}
+        return self._request("POST", "/score", payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/stats")
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def close(self):
+        self.conn.close()
+
+
+# ------------------------------------------------------------------
+# Self-test: server + concurrent local clients in one process
+# ------------------------------------------------------------------
+
+
+def _client_worker(address: str, rows: Sequence[list]) -> List[float]:
+    client = ScoringClient(address)
+    try:
+        return [client.score(row)["proba"][0] for row in rows]
+    finally:
+        client.close()
+
+
+def self_test(
+    service: ScoringService,
+    X: np.ndarray,
+    clients: int = 8,
+    requests_per_client: int = 100,
+    unix_socket: bool = False,
+    sessions: Optional[list] = None,
+) -> Dict[str, Any]:
+    """Serve on a free local port (or a temporary Unix socket), fire one-row
+    requests from `clients` concurrent clients and check every answer
+    against the model's own predict_proba. Returns the service stats."""
+    tmpdir = None
+    if unix_socket:
+        tmpdir = tempfile.mkdtemp(prefix="scoring-")
+        address = os.path.join(tmpdir, "scoring.sock")
+        server = make_server(service, unix_socket=address)
+    else:
+        server = make_server(service, port=0)
+        address = "%s:%d" % server.server_address[:2]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        n = clients * requests_per_client
+        idx = np.arange(n) % len(X)
+        rows = [[None if np.isnan(v) else float(v) for v in X[i]] for i in idx]
+        reference = service.model
+        if isinstance(reference, ModelArtifact):
+            reference = reference.estimator()
+        expected = reference.predict_proba(X[idx])[:, -1]
+        service.batcher.reset_stats()
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as ex:
+            chunks = [rows[c::clients] for c in range(clients)]
+            results = list(ex.map(_client_worker, [address] * clients, chunks))
+        wall = time.perf_counter() - t0
+        got = np.empty(n)
+        for c, res in enumerate(results):
+            got[c::clients] = res
+        client = ScoringClient(address)
+        stats = client.stats()
+        if sessions:
+            scored = client.score(sessions=sessions)
+            print(f"Scored {scored['n_rows']} raw sessions: {scored['pred']}")
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        if tmpdir:
+            os.remove(address)
+            os.rmdir(tmpdir)
+
+    print(
+        f"{n} requests from {clients} clients in {wall:.2f}s "
+        f"({n / wall:.0f} req/s) over {'unix socket' if unix_socket else address}"
+    )
+    print(
+        f"batches {stats['batches']} (mean {stats['mean_batch_rows']:.1f} rows, "
+        f"max {stats['max_batch_rows']}), latency p50 {stats['latency_p50_ms']:.2f} ms, "
+        f"p99 {stats['latency_p99_ms']:.2f} ms"
+    )
+    print(
+        "Probabilities identical to predict_proba:", bool(np.array_equal(got, expected))
+    )
+    return stats
+
+
+def main():
+    """CLI: run the scoring service, or a local self-test with concurrent clients."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model", type=str, default="../../models/tuned_random_forest_model.joblib"
+    )
+    parser.add_argument(
+        "--metadata", type=str, default="../../models/model_metadata.json"
+    )
+    parser.add_argument(
+        "--engine", type=str, default="compiled", choices=["compiled", "sklearn"]
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--unix-socket", type=str, default=None, help="Serve on a Unix socket path"
+    )
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--self-test", action="store_true")
+    parser.add_argument(
+        "--csv", type=str, default="../../data/processed/modeling_dataset.csv"
+    )
+    parser.add_argument(
+        "--raw-dir", type=str, default=None, help="Self-test: also score raw sessions"
+    )
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Per client")
+    args = parser.parse_args()
+
+    service = ScoringService(
+        args.model, args.engine, args.metadata, args.max_wait_ms, args.max_batch
+    ).start()
+    print(
+        f"Loaded {args.model} ({args.engine}, {service.n_features} features) "
+        f"in {service.load_s:.2f}s"
+    )
+
+    if args.self_test:
+        df = load_modeling_csv(args.csv)
+        cols = [c for c in service.feature_names if c in df.columns]
+        if len(cols) == service.n_features:
+            X = df[cols].to_numpy(dtype=np.float64)
+        else:
+            X = df[modeling_feature_cols(df)].to_numpy(dtype=np.float64)
+            if X.shape[1] != service.n_features:
+                print(
+                    f"Warning: CSV has {X.shape[1]} features, model expects "
+                    f"{service.n_features}; using random rows"
+                )
+                X = np.random.default_rng(0).normal(size=(256, service.n_features))
+        sessions = None
+        if args.raw_dir:
+            if DATA_PREP_DIR not in sys.path:
+                sys.path.insert(0, DATA_PREP_DIR)
+            from compute_features import is_tlx_only
+            from load_data import iter_raw
+
+            raw = (o for o in iter_raw(args.raw_dir) if not is_tlx_only(o))
+            sessions = list(itertools.islice(raw, 8))
+        self_test(
+            service,
+            X,
+            args.clients,
+            args.requests,
+            unix_socket=bool(args.unix_socket),
+            sessions=sessions,
+        )
+        service.stop()
+        return
+
+    server = make_server(service, args.host, args.port, args.unix_socket)
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Serving on {where} (max wait {args.max_wait_ms} ms); Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        print(json.dumps(service.batcher.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,10 @@ train_louo_random_forest.py
 
 1) Optionally run hyperparameter search (calls hyperparameter_search.py)
 2) Trains a RandomForest on the full dataset using best params (or defaults)
-3) Evaluates with LOUO using evaluate_model.evaluate_louo()
-4) Saves model and results to models/ and results/
+3) Evaluates with LOUO using evaluate_model.evaluate_louo_refit() (a fresh
+   pipeline is fitted for every left-out participant, folds run in parallel)
+4) Saves model and results to models/ and results/, and registers the
+   out-of-fold probabilities in the OOF store (oof_store.py)
 
 Usage:
     python train_louo_random_forest.py --csv ../../data/processed/modeling_dataset.csv --model-out ../../models/tuned_random_forest_model.joblib
@@ -14,17 +16,28 @@ Usage:
 import argparse
 import json
 import os
+import sys
+import time
+from functools import partial
 
 import joblib
 import numpy as np
 import pandas as pd
-from evaluate_model import evaluate_louo, save_feature_importances
-from hyperparameter_search import run_grouped_grid_search
+from evaluate_model import evaluate_louo_refit, save_feature_importances
+from fold_plan import FoldPlan
+from hyperparameter_search import CACHED_MODES, SEARCH_MODES, search_report
+from model_artifact import default_artifact_path, save_artifact
+from preprocess_cache import preprocess_memory
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")
+)
+from io_utils import load_modeling_csv, modeling_feature_cols  # noqa: E402
+
 DEFAULT_PARAMS = {
     "rf__n_estimators": 300,
     "rf__max_depth": 12,
@@ -33,12 +46,19 @@ DEFAULT_PARAMS = {
 }
 
 
-def build_pipeline_from_params(params, random_state=2025):
+def model_params_path(model_path: str) -> str:
+    """`<model>_params.json` next to a saved model: the parameters it was trained with."""
+    return os.path.splitext(model_path)[0] + "_params.json"
+
+
+def build_pipeline_from_params(params, random_state=2025, memory=None):
     """Construct a preprocessing + RandomForest pipeline from parameter dict.
 
     Parameters
     - params: dict -- keys use scikit-learn pipeline parameter names, e.g. 'rf__n_estimators'
     - random_state: int
+    - memory: None, LRUMemory, joblib.Memory or path -- cache of the imputer/scaler
+      fits, shared across folds' refits and searches (see preprocess_cache.py)
 
     Returns
     - sklearn.Pipeline instance
@@ -58,7 +78,8 @@ def build_pipeline_from_params(params, random_state=2025):
                     min_samples_leaf=params.get("rf__min_samples_leaf", 1),
                 ),
             ),
-        ]
+        ],
+        memory=memory,
     )
     return pipe
 
@@ -82,23 +103,52 @@ def main():
         action="store_true",
         help="Run grouped hyperparameter search before training",
     )
+    parser.add_argument(
+        "--search-mode",
+        # the binned search tunes its own binner + engine pipeline
+        choices=sorted(m for m in SEARCH_MODES if m != "binned"),
+        default="grid",
+        help="grid, halving or warm_start (see hyperparameter_search.py)",
+    )
     parser.add_argument(
         "--grid-out", type=str, default="../../models/rf_grid_search.joblib"
     )
     parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument(
+        "--preprocess-cache",
+        type=str,
+        default="memory",
+        help="Imputer/scaler fit cache for search and LOUO refits: none, memory or a directory",
+    )
+    parser.add_argument(
+        "--oof-store",
+        type=str,
+        default="../../results/oof_store",
+        help="OOF store receiving the LOUO probabilities (see oof_store.py)",
+    )
     args = parser.parse_args()
 
-    df = pd.read_csv(os.path.abspath(args.csv))
-    drop_cols = {"participantId", "task_id", "tlx", "High_Load"}
-    feature_cols = [c for c in df.columns if c not in drop_cols]
+    df = load_modeling_csv(os.path.abspath(args.csv))
+    feature_cols = modeling_feature_cols(df)
+    plan = FoldPlan.for_csv(os.path.abspath(args.csv), df)
 
     os.makedirs(os.path.dirname(os.path.abspath(args.model_out)), exist_ok=True)
     os.makedirs(os.path.abspath(args.results_outdir), exist_ok=True)
 
+    memory = preprocess_memory(args.preprocess_cache, args.n_jobs)
     best_params = DEFAULT_PARAMS.copy()
     if args.do_search:
         print("Running grouped hyperparameter search (this may take time)...")
-        grid = run_grouped_grid_search(df, feature_cols, n_jobs=args.n_jobs)
+        t0 = time.perf_counter()
+        kwargs = {"memory": memory} if args.search_mode in CACHED_MODES else {}
+        grid = SEARCH_MODES[args.search_mode](
+            df, feature_cols, n_jobs=args.n_jobs, fold_plan=plan, **kwargs
+        )
+        report = search_report(grid, time.perf_counter() - t0)
+        print(
+            f"{args.search_mode} search: {report['n_fits']} fits "
+            f"in {report['wall_time_s']:.1f}s"
+        )
         # extract best params (GridSearchCV returns keys like 'rf__n_estimators')
         best_params = {k: v for k, v in grid.best_params_.items()}
         # save grid object
@@ -117,12 +167,35 @@ def main():
     X = df[feature_cols].values
     y = df["High_Load"].values
     pipeline.fit(X, y)
-    # save model
+    # save model, and the parameters it was built with (read by oof_store)
     joblib.dump(pipeline, os.path.abspath(args.model_out))
     print("Saved fitted model to", args.model_out)
-
-    # Evaluate under LOUO
-    folds_df, summary, mis = evaluate_louo(pipeline, df, feature_cols)
+    with open(model_params_path(os.path.abspath(args.model_out)), "w") as f:
+        json.dump(best_params, f, indent=2)
+    # memory-mapped copy for fast-starting readers (see model_artifact.py)
+    artifact = save_artifact(pipeline, default_artifact_path(args.model_out))
+    print("Saved model artifact to", artifact)
+
+    # Evaluate under LOUO, refitting per left-out participant
+    # fold refits reuse the search's imputer/scaler fits of the same rows
+    folds_df, summary, mis, oof = evaluate_louo_refit(
+        partial(build_pipeline_from_params, best_params, memory=memory),
+        df,
+        feature_cols,
+        n_jobs=args.n_jobs,
+        fold_plan=plan,
+    )
+    oof.to_csv(os.path.join(args.results_outdir, "rf_oof_predictions.csv"), index=False)
+    # register the OOF probabilities so later stages need not refit
+    from oof_store import PRIMARY_MODEL, OOFStore, config_hash, dataset_hash
+
+    OOFStore(args.oof_store).put(
+        PRIMARY_MODEL,
+        config_hash(PRIMARY_MODEL, partial(build_pipeline_from_params, best_params)),
+        dataset_hash(df, feature_cols),
+        oof,
+        summary,
+    )
     folds_df.to_csv(
         os.path.join(args.results_outdir, "rf_fold_metrics_ultrarealistic.csv"),
         index=False,
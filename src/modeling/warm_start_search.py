@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+warm_start_search.py
+
+Grouped grid search that grows each random forest once through its tree
+counts instead of refitting it for every `n_estimators` value.
+
+For every fold and every combination of the other parameters, a single
+`warm_start` forest is grown through the sorted `<step>__n_estimators`
+values (e.g. 100 -> 300 -> 600) and scored (F1) at each checkpoint, so the
+tree-count dimension of the grid costs about as much as its largest value.
+With a fixed `random_state`, warm start adds exactly the trees a fresh fit
+of the larger forest would build, so scores, ranks and the best candidate
+are those of GridSearchCV on the same folds.
+
+The preprocessing steps of the pipeline do not depend on the searched
+parameters and are fitted once per fold.
+
+Used by hyperparameter_search.py (`--mode warm_start`).
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid
+
+
+def _warm_start_fold(fold: int, data: Dict[str, Any]) -> List[List[float]]:
+    """F1 of every (combo, checkpoint) on one fold; one growing forest per combo."""
+    X, y, cv = data["X"], data["y"], data["cv"]
+    estimator = data["estimator"]
+    train_idx, test_idx = cv.train_rows(fold), cv.test_rows(fold)
+    step, forest = estimator.steps[-1]
+
+    prep = clone(estimator[:-1])
+    X_train = prep.fit_transform(X[train_idx], y[train_idx])
+    X_test = prep.transform(X[test_idx])
+    y_train, y_test = y[train_idx], y[test_idx]
+
+    scores = []
+    for combo in data["combos"]:
+        rf = clone(forest).set_params(
+            warm_start=True,
+            **{k[len(step) + 2 :]: v for k, v in combo.items()},
+        )
+        row = []
+        with warnings.catch_warnings():
+            # "balanced" weights are recomputed from the same y_train at every
+            # checkpoint, so the warm_start/class_weight caveat does not apply
+            warnings.filterwarnings("ignore", message="class_weight presets")
+            for n_trees in data["checkpoints"]:
+                # fit() only builds the trees missing up to n_trees
+                rf.set_params(n_estimators=n_trees)
+                rf.fit(X_train, y_train)
+                row.append(f1_score(y_test, rf.predict(X_test), zero_division=0))
+        scores.append(row)
+    return scores
+
+
+def _combo_key(params: Dict[str, Any], n_key: str):
+    """Hashable key of a candidate's parameters other than the tree count."""
+    return tuple(sorted((k, v) for k, v in params.items() if k != n_key))
+
+
+# Per-process fold data, set once by the pool initializer of `map_folds`
+_FOLD_DATA = {}
+
+
+def _init_worker(data: Dict[str, Any]):
+    _FOLD_DATA.update(data)
+
+
+def _call_fold(fold_fn, fold: int):
+    return fold_fn(fold, _FOLD_DATA)
+
+
+def map_folds(
+    fold_fn: Callable[[int, Dict[str, Any]], Any],
+    n_folds: int,
+    n_jobs: Optional[int] = 1,
+    **data,
+) -> List[Any]:
+    """Return `[fold_fn(fold, data) for fold in range(n_folds)]`.
+
+    With `n_jobs` > 1 (-1 = all CPUs) the folds run in a process pool and
+    `data` is sent to each worker once, by the pool initializer, instead of
+    with every fold. `fold_fn` must be a module-level function.
+    """
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if not n_jobs or n_jobs <= 1 or n_folds <= 1:
+        return [fold_fn(fold, data) for fold in range(n_folds)]
+    # map keeps submission order, so results follow the folds
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_init_worker, initargs=(data,)
+    ) as ex:
+        return list(ex.map(partial(_call_fold, fold_fn), range(n_folds)))
+
+
+def set_search_results(search, params: List[Dict[str, Any]], test_scores: np.ndarray):
+    """Fill GridSearchCV-style result attributes from a (candidate, fold) score matrix.
+
+    Sets `cv_results_` (params, mean/std/rank and per-split test scores),
+    `best_index_`, `best_params_`, `best_score_` and `n_splits_`. Keep
+    `test_scores` C-contiguous so the reductions match GridSearchCV exactly.
+    """
+    mean = test_scores.mean(axis=1)
+    search.cv_results_ = {
+        "params": params,
+        "mean_test_score": mean,
+        "std_test_score": test_scores.std(axis=1),
+        "rank_test_score": rankdata(-mean, method="min").astype(np.int32),
+    }
+    for i in range(test_scores.shape[1]):
+        search.cv_results_[f"split{i}_test_score"] = test_scores[:, i]
+    search.best_index_ = int(np.argmin(search.cv_results_["rank_test_score"]))
+    search.best_params_ = params[search.best_index_]
+    search.best_score_ = float(mean[search.best_index_])
+    search.n_splits_ = test_scores.shape[1]
+
+
+class WarmStartForestSearch:
+    """GridSearchCV-like search over a pipeline ending in a random forest.
+
+    Parameters
+    - estimator: Pipeline -- preprocessing steps followed by a forest step
+      supporting `warm_start` (RandomForestClassifier, ExtraTreesClassifier)
+    - param_grid: dict -- parameter grid with `<step>__` keys; must include
+      `<step>__n_estimators`, other keys must address the forest step
+    - n_jobs: int -- parallel fold workers (-1 = all CPUs)
+
+    After `fit(X, y, cv)` (cv: a FoldPlan) the object exposes `cv_results_`
+    (params, mean/std/rank and per-split test scores, in ParameterGrid
+    order), `best_index_`, `best_params_`, `best_score_`, `best_estimator_`
+    (refitted on all rows), `n_splits_` and `n_fits_` (forests grown).
+    """
+
+    def __init__(self, estimator, param_grid: Dict[str, list], n_jobs: int = 1):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y, cv):
+        step = self.estimator.steps[-1][0]
+        n_key = f"{step}__n_estimators"
+        checkpoints = sorted(self.param_grid[n_key])
+        combos = list(
+            ParameterGrid({k: v for k, v in self.param_grid.items() if k != n_key})
+        )
+        n_folds = cv.get_n_splits()
+        per_fold = map_folds(
+            _warm_start_fold,
+            n_folds,
+            self.n_jobs,
+            X=X,
+            y=y,
+            cv=cv,
+            estimator=self.estimator,
+            combos=combos,
+            checkpoints=checkpoints,
+        )
+
+        # (fold, combo, checkpoint) -> (candidate, fold), candidates in
+        # ParameterGrid order; rows are contiguous so mean/std reduce in the
+        # same order as GridSearchCV and give bit-identical results
+        scores = np.asarray(per_fold, dtype=float)
+        combo_pos = {_combo_key(c, n_key): i for i, c in enumerate(combos)}
+        params = list(ParameterGrid(self.param_grid))
+        test_scores = np.array(
+            [
+                scores[:, combo_pos[_combo_key(p, n_key)], checkpoints.index(p[n_key])]
+                for p in params
+            ]
+        )
+
+        set_search_results(self, params, test_scores)
+        self.n_fits_ = len(combos) * n_folds
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+        return self
@@ -13,13 +13,18 @@ Import examples:
 """
 
 from .io_utils import (
+    discover_files,
     ensure_dir,
     list_json_files,
     load_all_json,
+    load_feature_matrix,
     load_modeling_csv,
+    modeling_feature_cols,
     read_json,
+    read_modeling_table,
     save_df,
     write_json,
+    write_modeling_cache,
 )
 from .metrics import aggregate_metrics, collect_misclassifications, compute_fold_metrics
 from .plot_utils import plot_bar, plot_confusion_matrix, plot_scatter, save_fig
@@ -31,6 +36,11 @@ __all__ = [
     "write_json",
     "save_df",
     "load_modeling_csv",
+    "read_modeling_table",
+    "modeling_feature_cols",
+    "write_modeling_cache",
+    "load_feature_matrix",
+    "discover_files",
     "list_json_files",
     "load_all_json",
     # plot_utils
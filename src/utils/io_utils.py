@@ -10,11 +10,27 @@ Used by:
  - interpretation
 """
 
+import gzip
+import io
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+try:  # optional: .json.zst input
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Non-feature columns of the modeling dataset
+MODELING_META_COLS = ("participantId", "task_id", "tlx", "High_Load")
+
+MODELING_CACHE_VERSION = 1
 
 # ------------------------------------------------------------------
 # Directory helpers
@@ -33,12 +49,46 @@ def ensure_dir(path: str):
 # ------------------------------------------------------------------
 
 
+def open_text(path: str):
+    """Open a text file for reading, decompressing `.gz` / `.zst` on the fly.
+
+    Decompression is streamed (no temporary file, no compressed copy held in
+    memory). `.zst` needs the optional `zstandard` package.
+    """
+    path = str(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"reading {path} requires the 'zstandard' package")
+        raw = open(path, "rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r")
+
+
 def read_json(path: str):
-    """Safe JSON loader."""
-    with open(path, "r") as f:
+    """Safe JSON loader (plain, `.json.gz` or `.json.zst`)."""
+    with open_text(path) as f:
         return json.load(f)
 
 
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def decode_json_bytes(data: bytes, path: str):
+    """Parse the raw bytes of a JSON file, decompressing by `path` suffix as
+    `open_text` does (for callers that also hash the bytes)."""
+    path = str(path)
+    if path.endswith(".gz"):
+        data = gzip.decompress(data)
+    elif path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"reading {path} requires the 'zstandard' package")
+        data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    return json.loads(data)
+
+
 def write_json(path: str, obj, indent=2):
     """Write Python object to JSON file, creating parent directory if needed.
 
@@ -64,9 +114,27 @@ def save_df(df: pd.DataFrame, path: str):
     return path
 
 
-def load_modeling_csv(path: str):
-    """Load modeling dataset + basic checks."""
-    df = pd.read_csv(path)
+def modeling_feature_cols(df: pd.DataFrame):
+    """Feature columns of a modeling DataFrame (everything except metadata)."""
+    return [c for c in df.columns if c not in MODELING_META_COLS]
+
+
+def read_modeling_table(path: str, use_cache: bool = True):
+    """Read the modeling dataset, preferring a fresh columnar cache over the CSV."""
+    if use_cache:
+        schema = _modeling_cache_schema(path)
+        if schema is not None:
+            return _read_modeling_cache(path, schema)
+    return pd.read_csv(path)
+
+
+def load_modeling_csv(path: str, use_cache: bool = True):
+    """Load modeling dataset + basic checks.
+
+    Reads the columnar cache written by `write_modeling_cache` when it is
+    up to date with `path`, otherwise parses the CSV.
+    """
+    df = read_modeling_table(path, use_cache=use_cache)
     if "participantId" not in df.columns:
         raise ValueError("modeling CSV missing 'participantId'")
     if "High_Load" not in df.columns:
@@ -74,30 +142,266 @@ def load_modeling_csv(path: str):
     return df
 
 
+# ------------------------------------------------------------------
+# Columnar modeling cache
+# ------------------------------------------------------------------
+#
+# <csv>.cache/
+#   schema.json    column order + dtypes, feature list, CSV size/mtime
+#   features.npy   float64 (n_rows, n_features) C-contiguous matrix
+#   col_<i>.npy    one array per metadata column (+ col_<i>_na.npy for strings)
+
+
+def modeling_cache_dir(csv_path: str):
+    """Directory holding the columnar cache for `csv_path`."""
+    return str(csv_path) + ".cache"
+
+
+def _csv_stamp(csv_path: str):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def write_modeling_cache(df: pd.DataFrame, csv_path: str):
+    """Write a typed columnar cache of `df` next to the already-saved `csv_path`.
+
+    The cache is tied to the CSV's size and mtime, so it is ignored as soon as
+    the CSV is rewritten by anything else.
+    """
+    cache = ensure_dir(modeling_cache_dir(csv_path))
+    schema_path = os.path.join(cache, "schema.json")
+    if os.path.exists(schema_path):
+        os.remove(schema_path)
+
+    feature_cols = [
+        c
+        for c in modeling_feature_cols(df)
+        if is_numeric_dtype(df[c]) and not is_bool_dtype(df[c])
+    ]
+    X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float64))
+    np.save(os.path.join(cache, "features.npy"), X)
+
+    columns = []
+    for i, c in enumerate(df.columns):
+        s = df[c]
+        col = {"name": c, "dtype": str(s.dtype)}
+        if c in feature_cols:
+            col["feature_index"] = feature_cols.index(c)
+        elif is_numeric_dtype(s):
+            col["file"] = f"col_{i}.npy"
+            np.save(os.path.join(cache, col["file"]), s.to_numpy())
+        else:
+            na = s.isna().to_numpy()
+            col["file"] = f"col_{i}.npy"
+            col["na_file"] = f"col_{i}_na.npy"
+            values = np.array(["" if m else str(v) for v, m in zip(s, na)], dtype=str)
+            np.save(os.path.join(cache, col["file"]), values)
+            np.save(os.path.join(cache, col["na_file"]), na)
+        columns.append(col)
+
+    schema = {
+        "version": MODELING_CACHE_VERSION,
+        "n_rows": int(len(df)),
+        "columns": columns,
+        "feature_cols": feature_cols,
+        "source": _csv_stamp(csv_path),
+    }
+    # schema.json is written last: its presence marks a complete cache
+    write_json(schema_path, schema)
+    return cache
+
+
+def _modeling_cache_schema(csv_path: str):
+    """Return the cache schema if a cache exists and matches the CSV, else None."""
+    schema_path = os.path.join(modeling_cache_dir(csv_path), "schema.json")
+    if not os.path.exists(schema_path) or not os.path.exists(csv_path):
+        return None
+    schema = read_json(schema_path)
+    if schema.get("version") != MODELING_CACHE_VERSION:
+        return None
+    if schema.get("source") != _csv_stamp(csv_path):
+        return None
+    return schema
+
+
+def _read_modeling_cache(csv_path: str, schema):
+    cache = modeling_cache_dir(csv_path)
+    X = np.load(os.path.join(cache, "features.npy"), mmap_mode="r")
+    # columns are copied out of the memmap so the DataFrame stays writable
+    data = {}
+    for col in schema["columns"]:
+        name, dtype = col["name"], col["dtype"]
+        if "feature_index" in col:
+            data[name] = pd.Series(np.array(X[:, col["feature_index"]]), dtype=dtype)
+        elif "na_file" in col:
+            values = np.load(os.path.join(cache, col["file"])).astype(object)
+            values[np.load(os.path.join(cache, col["na_file"]))] = np.nan
+            data[name] = pd.Series(values, dtype=dtype)
+        else:
+            data[name] = pd.Series(np.load(os.path.join(cache, col["file"])))
+    return pd.DataFrame(data, columns=[c["name"] for c in schema["columns"]])
+
+
+def load_feature_matrix(csv_path: str, mmap: bool = True):
+    """Return (X, feature_cols) straight from the columnar cache.
+
+    With `mmap=True` X is a read-only memory-mapped float64 array, so several
+    processes share the same pages and nothing is parsed. Raises
+    FileNotFoundError if there is no up-to-date cache for `csv_path`.
+    """
+    schema = _modeling_cache_schema(csv_path)
+    if schema is None:
+        raise FileNotFoundError(f"no up-to-date modeling cache for {csv_path}")
+    X = np.load(
+        os.path.join(modeling_cache_dir(csv_path), "features.npy"),
+        mmap_mode="r" if mmap else None,
+    )
+    return X, list(schema["feature_cols"])
+
+
 # ------------------------------------------------------------------
 # Raw file discovery
 # ------------------------------------------------------------------
 
 
-def list_json_files(directory: str):
-    """Recursively list all JSON files."""
+JSON_PATTERNS = ("*.json", "*.json.gz", "*.json.zst")
+LISTING_CACHE_VERSION = 1
+
+
+def _scan_dir(path: str):
+    """One `os.scandir` pass: (file names, subdirectory names), both sorted."""
+    files, subdirs = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            # symlinked directories are listed but not followed, as os.walk does
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif not entry.is_dir():
+                files.append(entry.name)
+    return sorted(files), sorted(subdirs)
+
+
+def _match(name: str, patterns) -> bool:
+    return any(fnmatch(name, pat) for pat in patterns)
+
+
+def discover_files(
+    root: str,
+    include=JSON_PATTERNS,
+    exclude=(),
+    cache_path: str = None,
+):
+    """Recursively list files under `root` whose name matches `include`.
+
+    Parameters
+    - root: str -- directory to scan
+    - include: tuple[str] -- fnmatch patterns on the file name (e.g. "*.json.gz")
+    - exclude: tuple[str] -- patterns that drop a file, or prune a directory
+      whose name matches (e.g. "*_tlx.json")
+    - cache_path: str or None -- persisted listing cache; a directory whose
+      mtime is unchanged since the last scan is not listed again
+
+    Returns
+    - list[str]: sorted file paths
+    """
+    root = str(root)
+    cached = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            c = read_json(cache_path)
+            if c.get("version") == LISTING_CACHE_VERSION and c.get(
+                "root"
+            ) == os.path.abspath(root):
+                cached = c["dirs"]
+        except (OSError, ValueError, KeyError):
+            cached = {}
+    skip = os.path.abspath(cache_path) if cache_path else None
+
+    dirs = {}
     files = []
-    for root, _, f in os.walk(directory):
-        for x in f:
-            if x.endswith(".json"):
-                files.append(os.path.join(root, x))
+    stack = ["."]
+    while stack:
+        rel = stack.pop()
+        path = root if rel == "." else os.path.join(root, rel)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        hit = cached.get(rel)
+        if hit is not None and hit[0] == mtime:
+            names, subdirs = hit[1], hit[2]
+        else:
+            try:
+                names, subdirs = _scan_dir(path)
+            except OSError:
+                continue
+        dirs[rel] = [mtime, names, subdirs]
+        for name in names:
+            if _match(name, include) and not _match(name, exclude):
+                full = os.path.join(path, name)
+                if os.path.abspath(full) != skip:
+                    files.append(full)
+        for d in subdirs:
+            if not _match(d, exclude):
+                stack.append(d if rel == "." else os.path.join(rel, d))
+
+    if cache_path and dirs != cached:
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "version": LISTING_CACHE_VERSION,
+                    "root": os.path.abspath(root),
+                    "dirs": dirs,
+                },
+                f,
+            )
+        os.replace(tmp, cache_path)
     return sorted(files)
 
 
-def load_all_json(directory: str):
-    """Load all JSON files under a root directory."""
-    file_list = list_json_files(directory)
-    data = []
-    for p in file_list:
+def list_json_files(directory: str, exclude=(), cache_path: str = None):
+    """Recursively list all JSON files (see `discover_files`)."""
+    return discover_files(
+        directory, include=JSON_PATTERNS, exclude=exclude, cache_path=cache_path
+    )
+
+
+def _read_json_batch(paths):
+    """Parse a batch of JSON files, returning (path, obj, error) triples."""
+    out = []
+    for p in paths:
         try:
-            x = read_json(p)
-            x["_source_file"] = p
-            data.append(x)
+            out.append((p, read_json(p), None))
         except Exception as e:
-            print(f"WARNING: couldn't read {p}: {e}")
+            out.append((p, None, str(e)))
+    return out
+
+
+def load_all_json(directory: str, workers: int = 1, chunk_size: int = 256):
+    """Load all JSON files under a root directory.
+
+    With `workers` > 1 (0 = all CPUs) files are parsed in batches of
+    `chunk_size` by a process pool; output and warnings keep file order.
+    """
+    file_list = list_json_files(directory)
+    chunk_size = max(1, chunk_size)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(file_list) <= chunk_size:
+        results = _read_json_batch(file_list)
+    else:
+        chunks = [
+            file_list[i : i + chunk_size] for i in range(0, len(file_list), chunk_size)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = [r for batch in ex.map(_read_json_batch, chunks) for r in batch]
+
+    data = []
+    for p, x, err in results:
+        if err is not None:
+            print(f"WARNING: couldn't read {p}: {err}")
+            continue
+        x["_source_file"] = p
+        data.append(x)
     return data